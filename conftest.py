@@ -7,6 +7,8 @@ from django.contrib.auth import get_user_model
 
 from core.models import Community, CommunityMember, Post
 
+pytest_plugins = ["core.tests.query_budget"]
+
 User = get_user_model()
 
 
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.db import models
 from django.http import HttpRequest
 
+from . import search
 from .models import AdminAction, Community, Image, Post, PostReport, PostVote, Tag
 
 
@@ -17,12 +18,22 @@ class CommunityAdmin(admin.ModelAdmin):
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
     list_display = ("id", "title", "community", "score", "display_counter", "author", "created_at", "updated_at")
-    search_fields = ("title", "author__email", "community__name")
+    search_fields = ("author__email", "community__name")
     readonly_fields = ("version", "display_counter", "up_votes", "down_votes")
 
     def get_queryset(self: "PostAdmin", _request: HttpRequest) -> models.QuerySet:
         return Post.all_objects.all()
 
+    def get_search_results(
+        self: "PostAdmin", request: HttpRequest, queryset: models.QuerySet, search_term: str
+    ) -> tuple[models.QuerySet, bool]:
+        # titles and content are matched through the search index instead of scanning them with icontains
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        terms = search.terms_of(search_term)
+        if terms:
+            results |= search.get_backend().filter(queryset, terms)
+        return results, may_have_duplicates
+
 
 @admin.register(PostVote)
 class PostVoteAdmin(admin.ModelAdmin):
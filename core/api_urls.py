@@ -1,10 +1,23 @@
 from rest_framework.urls import path
 
-from .api_views import CommunitiesAPIList, CommunityDetailAPIView, CommunityPostsListAPIView, PostAPIListView
+from .api_views import (
+    CommentTreeAPIView,
+    CommunitiesAPIList,
+    CommunityDetailAPIView,
+    CommunityMembersAPIView,
+    CommunityPostsListAPIView,
+    PostAPIListView,
+    SearchAPIView,
+    TrendingTagsAPIView,
+)
 
 urlpatterns = [
     path("communities/", CommunitiesAPIList.as_view(), name="api-communities-list"),
     path("communities/<slug:slug>/", CommunityDetailAPIView.as_view(), name="api-community-detail"),
+    path("communities/<slug:slug>/members/", CommunityMembersAPIView.as_view(), name="api-community-members"),
     path("communities/<slug:slug>/posts/", CommunityPostsListAPIView.as_view(), name="api-communities-posts-list"),
     path("posts/", PostAPIListView.as_view(), name="api-posts-list-view"),
+    path("posts/<int:pk>/comments/", CommentTreeAPIView.as_view(), name="api-comment-tree"),
+    path("search/", SearchAPIView.as_view(), name="api-search"),
+    path("tags/trending/", TrendingTagsAPIView.as_view(), name="api-trending-tags"),
 ]
@@ -1,34 +1,152 @@
-from django.db.models import QuerySet
+import hashlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from django.db.models import Count, Max, QuerySet
+from django.http import HttpResponseBase
 from django.shortcuts import get_object_or_404
-from rest_framework.exceptions import PermissionDenied
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework.generics import ListAPIView, RetrieveAPIView
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from core import comment_tree, ranking, search, trending
+from core.models import Community, CommunityMember, Post
+from core.pagination import KeysetPagination, PostPagination
+from core.serializers import (
+    CommentTreeSerializer,
+    CommunityMemberSerializer,
+    CommunitySerializer,
+    MinimalCommunitySerializer,
+    MinimalCommunityValuesSerializer,
+    PostSerializer,
+    PostValuesSerializer,
+    SearchResultSerializer,
+    TrendingTagSerializer,
+)
+
+
+class ConditionalGetMixin(ABC):
+    """Answer ``If-None-Match`` and ``If-Modified-Since`` with a 304 before anything is serialized.
+
+    ``get_validators`` returns the state the payload depends on, read with an aggregate query or the page rows
+    alone, and the time of its latest change. The ETag is a digest of the state, the URL and the media type. Counters
+    changed without a timestamp, like view counts, memberships or rows leaving a page, only move the ETag, so views
+    showing them return no time and send no ``Last-Modified``.
+    """
+
+    @abstractmethod
+    def get_validators(self: "ConditionalGetMixin") -> tuple[tuple, datetime | None]:
+        """Return the state the payload depends on and the time of its latest change, if every change has one."""
 
-from core.models import Community, Post
-from core.serializers import CommunitySerializer, MinimalCommunitySerializer, PostSerializer
+    def get(self: "ConditionalGetMixin", request: Request, *args: str, **kwargs: str) -> HttpResponseBase:
+        state, last_modified = self.get_validators()
+        key = repr((request.get_full_path(), request.accepted_media_type, state))
+        etag = quote_etag(hashlib.sha256(key.encode()).hexdigest()[:32])
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in {200, 304}:
+            response.headers["ETag"] = etag
+            if timestamp is not None:
+                response.headers["Last-Modified"] = http_date(timestamp)
+        return response
 
 
-class CommunitiesAPIList(ListAPIView):
+class CommunitiesAPIList(ConditionalGetMixin, ListAPIView):
     queryset = Community.objects.exclude(privacy=Community.PRIVATE).order_by("name")
     serializer_class = MinimalCommunitySerializer
+    values_serializer = MinimalCommunityValuesSerializer()
 
+    def get_validators(self: "CommunitiesAPIList") -> tuple[tuple, datetime | None]:
+        state = self.get_queryset().aggregate(count=Count("pk"), updated_at=Max("updated_at"))
+        # a deleted community leaves the latest updated_at as it was
+        return (state["count"], state["updated_at"]), None
+
+    def list(self: "CommunitiesAPIList", request: Request, *args: str, **kwargs: str) -> Response:  # noqa: ARG002
+        page = self.paginate_queryset(self.get_queryset().values(*self.values_serializer.columns))
+        return self.get_paginated_response(self.values_serializer.serialize(page))
+
+
+class CommunityDetailAPIView(ConditionalGetMixin, RetrieveAPIView):
+    """A community with its member and online counts, members are listed by ``CommunityMembersAPIView``."""
 
-class CommunityDetailAPIView(RetrieveAPIView):
-    queryset = Community.objects.all()
     serializer_class = CommunitySerializer
     lookup_field = "slug"
 
+    def get_queryset(self: "CommunityDetailAPIView") -> QuerySet[Community]:
+        # built per request, the online cutoff moves with the clock
+        return Community.objects.with_member_stats()
+
+    def get_object(self: "CommunityDetailAPIView") -> Community:
+        # looked up once for the validators, the serializer class and the payload
+        if not hasattr(self, "community"):
+            self.community = super().get_object()
+        return self.community
+
+    def get_validators(self: "CommunityDetailAPIView") -> tuple[tuple, datetime | None]:
+        community = self.get_object()
+        if community.privacy == Community.PRIVATE:
+            return (community.pk, community.updated_at), community.updated_at
+        state = (community.pk, community.updated_at, community.member_count, community.count_online_users())
+        return state, None
+
     def get_serializer_class(self: "CommunityDetailAPIView") -> CommunitySerializer:
         if self.get_object().privacy == Community.PRIVATE:
             return MinimalCommunitySerializer
         return super().get_serializer_class()
 
 
-class PostAPIListView(ListAPIView):
-    queryset = Post.objects.exclude(community__privacy=Community.PRIVATE).order_by("-id")
+class CommunityMembersAPIView(ListAPIView):
+    """Members of a community, newest first, in keyset pages continued with a ``cursor``."""
+
+    serializer_class = CommunityMemberSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self: "CommunityMembersAPIView") -> QuerySet[CommunityMember]:
+        community = get_object_or_404(Community, slug=self.kwargs["slug"])
+        if community.privacy == Community.PRIVATE:
+            msg = "Private community is not accessible."
+            raise PermissionDenied(msg)
+        return CommunityMember.objects.filter(community=community).select_related("user__profile").order_by("-id")
+
+
+class RankedPostsMixin:
+    pagination_class = PostPagination
+    values_serializer = PostValuesSerializer()
+
+    def rank(self: "RankedPostsMixin", queryset: QuerySet[Post]) -> QuerySet[Post]:
+        params = self.request.query_params
+        return ranking.rank_posts(queryset, params.get("sort"), params.get("t"), default=ranking.NEW)
+
+    def get_validators(self: "RankedPostsMixin") -> tuple[tuple, datetime | None]:
+        queryset = self.filter_queryset(self.get_queryset())
+        # the cursor of a keyset page is read from the ordering columns of its last row
+        ordering = [field.lstrip("-") for field in queryset.query.order_by]
+        columns = dict.fromkeys([*self.values_serializer.columns, "score_changed_at", *ordering])
+        # the page is fetched anyway, a 304 only saves serializing it and a miss serializes it without a refetch
+        self.validated_page = self.paginate_queryset(queryset.values(*columns))
+        # votes only touch score_changed_at, views only display_counter
+        rows = [(post["id"], post["score_changed_at"], post["display_counter"]) for post in self.validated_page]
+        return (self.paginator.page_state(), rows), None
+
+    def list(self: "RankedPostsMixin", request: Request, *args: str, **kwargs: str) -> Response:  # noqa: ARG002
+        return self.get_paginated_response(self.values_serializer.serialize(self.validated_page))
+
+
+class PostAPIListView(RankedPostsMixin, ConditionalGetMixin, ListAPIView):
+    queryset = Post.objects.exclude(community__privacy=Community.PRIVATE)
     serializer_class = PostSerializer
 
+    def get_queryset(self: "PostAPIListView") -> QuerySet[Post]:
+        return self.rank(super().get_queryset())
 
-class CommunityPostsListAPIView(ListAPIView):
+
+class CommunityPostsListAPIView(RankedPostsMixin, ConditionalGetMixin, ListAPIView):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
     lookup_field = "slug"
@@ -38,4 +156,61 @@ class CommunityPostsListAPIView(ListAPIView):
         if community.privacy == Community.PRIVATE:
             msg = "Private community is not accessible."
             raise PermissionDenied(msg)
-        return Post.objects.filter(community=community).order_by("-id")
+        return self.rank(Post.objects.filter(community=community))
+
+
+class TrendingTagsAPIView(ListAPIView):
+    serializer_class = TrendingTagSerializer
+    pagination_class = None
+    max_limit = 100
+
+    def get_queryset(self: "TrendingTagsAPIView") -> list[trending.TrendingTag]:
+        window = self.request.query_params.get("window", trending.DEFAULT_WINDOW)
+        if window not in trending.WINDOWS:
+            raise ValidationError({"window": f"Choose one of {', '.join(trending.WINDOWS)}."})
+        try:
+            limit = min(int(self.request.query_params.get("limit", 10)), self.max_limit)
+        except ValueError:
+            raise ValidationError({"limit": "A whole number is required."}) from None
+        return trending.trending_tags(window, max(limit, 1))
+
+
+class SearchAPIView(ListAPIView):
+    """Posts and comments matching every term of ``q`` ranked by BM25, optionally within the ``community`` slug."""
+
+    serializer_class = SearchResultSerializer
+
+    def get_queryset(self: "SearchAPIView") -> search.SearchResults:
+        query = self.request.query_params.get("q", "")
+        if not search.terms_of(query):
+            raise ValidationError({"q": "Enter words to search for."})
+        community = None
+        if slug := self.request.query_params.get("community"):
+            community = get_object_or_404(Community, slug=slug)
+        return search.search(query, self.request.user, community)
+
+
+class CommentTreeAPIView(ListAPIView):
+    """The comments below a post or comment, depth and breadth limited, continued with ``after`` cursors."""
+
+    serializer_class = CommentTreeSerializer
+    pagination_class = None
+
+    def get_queryset(self: "CommentTreeAPIView") -> list[Post]:
+        self.parent = get_object_or_404(Post.objects.select_related("community"), pk=self.kwargs["pk"])
+        if self.parent.community.privacy == Community.PRIVATE:
+            msg = "Private community is not accessible."
+            raise PermissionDenied(msg)
+        try:
+            return comment_tree.load(self.parent, self.request.query_params.get("after"))
+        except ValueError:
+            msg = "Invalid cursor"
+            raise NotFound(msg) from None
+
+    def list(self: "CommentTreeAPIView", request: Request, *args: str, **kwargs: str) -> Response:
+        response = super().list(request, *args, **kwargs)
+        next_link = None
+        if self.parent.has_more_replies:
+            next_link = replace_query_param(request.build_absolute_uri(), "after", self.parent.replies_cursor)
+        response.data = {"next": next_link, "results": response.data}
+        return response
@@ -0,0 +1,84 @@
+"""Depth and breadth limited comment trees with "load more replies" continuations.
+
+``load`` returns the best ``COMMENT_TREE_MAX_COMMENTS`` comments below a post or comment, level by level and at most
+``COMMENT_TREE_MAX_DEPTH`` levels deep, in one query on the indexed ``Post.path``. Children are ordered by score,
+newest first on ties. Every node whose replies were cut short gets ``has_more_replies`` and a ``replies_cursor``;
+passing the cursor back as ``after`` loads the next slice of its subtree, starting after the last reply shown.
+"""
+
+import base64
+import binascii
+
+from django.conf import settings
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Substr
+
+from core.models import PATH_SEGMENT_WIDTH, Post
+
+SEGMENT_LENGTH = PATH_SEGMENT_WIDTH + 1
+
+
+def encode_cursor(comment: Post) -> str:
+    return base64.urlsafe_b64encode(f"{comment.top_rank}|{comment.pk}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    """Return the position encoded by ``encode_cursor``, raise ValueError for a malformed cursor."""
+    try:
+        top_rank, comment_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return int(top_rank), int(comment_id)
+    except (binascii.Error, UnicodeError) as error:
+        raise ValueError(cursor) from error
+
+
+def mark_more_replies(node: Post, replies: list[Post], *, has_more: bool) -> None:
+    node.has_more_replies = has_more
+    node.replies_cursor = encode_cursor(replies[-1]) if has_more and replies else ""
+
+
+def ancestor_path(depth: int) -> Substr:
+    """Path of the ancestor at ``depth`` of the outer post, its own path when it is not deeper."""
+    return Substr(OuterRef("path"), 1, (depth + 1) * SEGMENT_LENGTH)
+
+
+def load(
+    root: Post, after: str | None = None, max_comments: int | None = None, max_depth: int | None = None
+) -> list[Post]:
+    """Load the comments below ``root`` and nest them under ``replies``, return the first level.
+
+    Inactive comments hide their whole subtree, same as walking ``children.all()`` level by level.
+    """
+    max_comments = max_comments or settings.COMMENT_TREE_MAX_COMMENTS
+    max_depth = max_depth or settings.COMMENT_TREE_MAX_DEPTH
+    subtree = root.get_descendants().filter(is_active=True, depth__lte=root.depth + max_depth)
+    # the ancestors between the root and a comment are prefixes of its path, an inactive one hides it
+    hidden = Post.all_objects.filter(
+        is_active=False, path__in=[ancestor_path(root.depth + level) for level in range(1, max_depth)]
+    )
+    subtree = subtree.exclude(Exists(hidden))
+    if after:
+        top_rank, comment_id = decode_cursor(after)
+        # a reply of the root only after the cursor, deeper comments below one of those
+        later = Q(top_rank__lt=top_rank) | Q(top_rank=top_rank, id__lt=comment_id)
+        subtree = subtree.filter(Exists(Post.all_objects.filter(later, path=ancestor_path(root.depth + 1))))
+    # breadth first, one extra row tells whether the first level was cut
+    limited_ids = subtree.order_by("depth", "-top_rank", "-id").values("id")[: max_comments + 1]
+    active_children = (
+        Post.objects.filter(parent=OuterRef("pk")).order_by().values("parent").annotate(n=Count("pk")).values("n")
+    )
+    comments = (
+        Post.objects.filter(id__in=limited_ids).annotate(active_children=Coalesce(Subquery(active_children), 0)).cards()
+    )
+
+    ordered = sorted(comments, key=lambda comment: (comment.depth, -comment.top_rank, -comment.pk))
+    cut = ordered[max_comments:]
+    ordered = ordered[:max_comments]
+
+    replies = {comment.pk: [] for comment in [root, *ordered]}
+    for comment in ordered:
+        replies[comment.parent_id].append(comment)
+    for comment in ordered:
+        comment.replies = replies[comment.pk]
+        mark_more_replies(comment, comment.replies, has_more=len(comment.replies) < comment.active_children)
+    mark_more_replies(root, replies[root.pk], has_more=bool(cut) and cut[0].parent_id == root.pk)
+    return replies[root.pk]
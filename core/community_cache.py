@@ -0,0 +1,85 @@
+"""Read-through cache of community rows and member roles.
+
+With ``COMMUNITY_CACHE_ENABLED`` community lookups by slug and the role of a user in a community are kept
+in process memory for ``COMMUNITY_CACHE_TIMEOUT_SECONDS``, the least recently used entries evicted beyond
+``COMMUNITY_CACHE_MAX_ENTRIES``. The signals in ``core.signals`` drop entries when a community or a
+membership is saved or deleted in this process; changes made by other processes or with ``QuerySet.update``
+are picked up once the entry times out.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Model
+
+MISSING = object()
+
+
+class LRUCache:
+    def __init__(self: "LRUCache") -> None:
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self: "LRUCache", key: Hashable, load: Callable[[], object]) -> object:
+        """Return the cached value of the key, calling ``load`` on a miss or an expired entry."""
+        with self.lock:
+            expires_at, value = self.entries.get(key, (0, MISSING))
+            if expires_at > time.monotonic():
+                self.entries.move_to_end(key)
+                return value
+        value = load()
+        with self.lock:
+            self.entries[key] = (time.monotonic() + settings.COMMUNITY_CACHE_TIMEOUT_SECONDS, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.COMMUNITY_CACHE_MAX_ENTRIES:
+                self.entries.popitem(last=False)
+        return value
+
+    def delete(self: "LRUCache", key: Hashable) -> None:
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self: "LRUCache") -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+communities = LRUCache()
+roles = LRUCache()
+
+
+def get_community(slug: str) -> Model:
+    """Active community by slug, raises ``Community.DoesNotExist`` like ``Community.objects.get``."""
+    community_model = apps.get_model("core", "Community")
+    queryset = community_model.objects.select_related("author")
+    if not settings.COMMUNITY_CACHE_ENABLED:
+        return queryset.get(slug=slug)
+    community = communities.get(slug, lambda: queryset.filter(slug=slug).first())
+    if community is None:
+        communities.delete(slug)  # not cached, the community may be created any moment
+        raise community_model.DoesNotExist
+    # every caller gets its own instance to modify
+    return copy.copy(community)
+
+
+def get_role(community_id: int, user_id: int | None) -> str | None:
+    """Role of the user in the community, None when they are not a member."""
+    if user_id is None:
+        return None
+
+    def load() -> str | None:
+        return (
+            apps.get_model("core", "CommunityMember")
+            .objects.filter(community_id=community_id, user_id=user_id)
+            .values_list("role", flat=True)
+            .first()
+        )
+
+    if not settings.COMMUNITY_CACHE_ENABLED:
+        return load()
+    return roles.get((community_id, user_id), load)
@@ -0,0 +1,120 @@
+"""Personal home feed of the root posts in the communities a user joined.
+
+Posts are fanned out on write: creating a root post stores a ``FeedItem`` for every member of its community,
+so reading a feed page is one query on the ``(user, -created_at, -post)`` index. Communities with more than
+``HOME_FEED_FANOUT_MAX_MEMBERS`` members are fanned out on read instead, their latest posts are merged into the
+page with a second query. Joining a community copies its latest ``HOME_FEED_BACKFILL_ITEMS`` posts into the
+feed, leaving removes them. ``manage.py trim_home_feeds`` bounds every feed to ``HOME_FEED_MAX_ITEMS``.
+
+Pages are ordered newest first and continue from an opaque cursor, the position of the last post shown.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q, QuerySet, Window
+from django.db.models.functions import RowNumber
+
+from core.models import Community, CommunityMember, FeedItem, Post
+from users.models import User
+
+PAGE_SIZE = 25
+
+
+def encode_cursor(post: Post) -> str:
+    return base64.urlsafe_b64encode(f"{post.created_at.isoformat()}|{post.pk}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int] | None:
+    """Return the position encoded by ``encode_cursor``, None for a malformed cursor."""
+    try:
+        created_at, post_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(post_id)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+
+
+def after(position: tuple[datetime, int] | None, created_at: str, post_id: str) -> Q:
+    if position is None:
+        return Q()
+    # the redundant bound on created_at alone keeps the range scan on the index
+    return Q(**{f"{created_at}__lte": position[0]}) & (
+        Q(**{f"{created_at}__lt": position[0]}) | Q(**{created_at: position[0], f"{post_id}__lt": position[1]})
+    )
+
+
+def fanout_communities() -> QuerySet[Community]:
+    return Community.objects.filter(member_count__lte=settings.HOME_FEED_FANOUT_MAX_MEMBERS)
+
+
+def fan_out(post: Post, batch_size: int = 1000) -> int:
+    """Push a new root post to the feeds of the members of its community, return the number of feeds."""
+    if post.parent_id is not None or not post.is_active:
+        return 0
+    members = CommunityMember.objects.filter(
+        community_id=post.community_id, community__in=fanout_communities()
+    ).values_list("user_id", flat=True)
+    items = [
+        FeedItem(user_id=user_id, post_id=post.pk, community_id=post.community_id, created_at=post.created_at)
+        for user_id in members
+    ]
+    return len(FeedItem.objects.bulk_create(items, batch_size=batch_size, ignore_conflicts=True))
+
+
+def join(user_id: int, community_id: int) -> None:
+    posts = (
+        Post.objects.filter(community_id=community_id, community__in=fanout_communities(), parent=None, is_active=True)
+        .order_by("-created_at", "-pk")
+        .values_list("pk", "created_at")[: settings.HOME_FEED_BACKFILL_ITEMS]
+    )
+    FeedItem.objects.bulk_create(
+        [
+            FeedItem(user_id=user_id, post_id=post_id, community_id=community_id, created_at=created_at)
+            for post_id, created_at in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def leave(user_id: int, community_id: int) -> None:
+    FeedItem.objects.filter(user_id=user_id, community_id=community_id).delete()
+
+
+def read(user: User, cursor: str | None = None, limit: int = PAGE_SIZE) -> tuple[list[Post], str | None]:
+    """Return a page of the feed of the user and the cursor of the next page, None on the last page."""
+    position = decode_cursor(cursor) if cursor else None
+    items = (
+        FeedItem.objects.filter(user=user, post__is_active=True, post__community__is_active=True)
+        .filter(after(position, "created_at", "post_id"))
+        .select_related("post__author__profile", "post__community")
+        .order_by("-created_at", "-post_id")[: limit + 1]
+    )
+    posts = {item.post_id: item.post for item in items}
+    large_communities = CommunityMember.objects.filter(
+        user=user, community__member_count__gt=settings.HOME_FEED_FANOUT_MAX_MEMBERS, community__is_active=True
+    ).values("community_id")
+    pulled = (
+        Post.objects.filter(community__in=large_communities, parent=None, is_active=True)
+        .filter(after(position, "created_at", "pk"))
+        .cards()
+        .order_by("-created_at", "-pk")[: limit + 1]
+    )
+    # a community that outgrew the fan-out keeps its older feed items, so the same post may come from both
+    for post in pulled:
+        posts.setdefault(post.pk, post)
+    page = sorted(posts.values(), key=lambda post: (post.created_at, post.pk), reverse=True)[: limit + 1]
+    if len(page) > limit:
+        return page[:limit], encode_cursor(page[limit - 1])
+    return page, None
+
+
+def trim(max_items: int | None = None) -> int:
+    """Drop the items past the newest ``max_items`` of every feed, return the number removed."""
+    max_items = max_items or settings.HOME_FEED_MAX_ITEMS
+    ranked = FeedItem.objects.annotate(
+        position=Window(RowNumber(), partition_by="user_id", order_by=["-created_at", "-post_id"])
+    )
+    excess = ranked.filter(position__gt=max_items).values("pk")
+    return FeedItem.objects.filter(pk__in=excess).delete()[0]
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandParser
+
+from core import trending
+
+
+class Command(BaseCommand):
+    help = "Merging aging trending tag buckets and dropping the ones past the retention"
+
+    def add_arguments(self: "Command", parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self: "Command", *_args: str, **options: str) -> None:
+        removed, written = trending.compact(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Compacted tag usage: removed {removed} rows, wrote {written} rows"))
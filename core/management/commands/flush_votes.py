@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+
+from core.models import BufferedVote
+
+
+class Command(BaseCommand):
+    help = "Applying buffered votes to post votes and tallies"
+
+    def add_arguments(self: "Command", parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=settings.VOTE_BUFFER_FLUSH_BATCH_SIZE)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.VOTE_BUFFER_FLUSH_INTERVAL_SECONDS,
+            help="Seconds to wait between flushes when running with --loop",
+        )
+        parser.add_argument("--loop", action="store_true", help="Keep flushing until interrupted")
+
+    def handle(self: "Command", *_args: str, **options: str) -> None:
+        while True:
+            flushed = self.flush(options["batch_size"])
+            self.stdout.write(f"Flushed {flushed} buffered votes")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
+
+    def flush(self: "Command", batch_size: int) -> int:
+        total = 0
+        while flushed := BufferedVote.flush(batch_size):
+            total += flushed
+        return total
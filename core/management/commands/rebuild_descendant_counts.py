@@ -0,0 +1,41 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from core.models import Post
+
+
+class Command(BaseCommand):
+    help = "Rebuilding stored descendant counts for every post"
+
+    def add_arguments(self: "Command", parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self: "Command", *_args: str, **options: str) -> None:
+        children = defaultdict(list)
+        active = {}
+        stored = {}
+        for post_id, parent_id, is_active, descendant_count in Post.all_objects.values_list(
+            "id", "parent_id", "is_active", "descendant_count"
+        ).iterator():
+            children[parent_id].append(post_id)
+            active[post_id] = is_active
+            stored[post_id] = descendant_count
+
+        counts = dict.fromkeys(stored, 0)
+        # iterative post-order walk, so deep threads do not hit the recursion limit
+        stack = [(post_id, False) for post_id in children[None]]
+        while stack:
+            post_id, visited = stack.pop()
+            if not visited:
+                stack.append((post_id, True))
+                stack.extend((child_id, False) for child_id in children[post_id])
+                continue
+            counts[post_id] = sum(1 + counts[child_id] for child_id in children[post_id] if active[child_id])
+
+        changed = [
+            Post(id=post_id, descendant_count=count) for post_id, count in counts.items() if stored[post_id] != count
+        ]
+        Post.all_objects.bulk_update(changed, ["descendant_count"], batch_size=options["batch_size"])
+        message = f"Rebuilt descendant counts: {len(changed)} of {len(counts)} posts changed"
+        self.stdout.write(self.style.SUCCESS(message))
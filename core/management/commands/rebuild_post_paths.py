@@ -0,0 +1,37 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from core.models import Post, path_segment
+
+
+class Command(BaseCommand):
+    help = "Rebuilding the materialized thread path and depth of every post"
+
+    def add_arguments(self: "Command", parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self: "Command", *_args: str, **options: str) -> None:
+        children = defaultdict(list)
+        stored = {}
+        for post_id, parent_id, path, depth in Post.all_objects.values_list(
+            "id", "parent_id", "path", "depth"
+        ).iterator():
+            children[parent_id].append(post_id)
+            stored[post_id] = (path, depth)
+
+        paths = {}
+        # iterative walk from the root posts down, so deep threads do not hit the recursion limit
+        stack = [(post_id, "", 0) for post_id in children[None]]
+        while stack:
+            post_id, parent_path, depth = stack.pop()
+            paths[post_id] = (parent_path + path_segment(post_id), depth)
+            stack.extend((child_id, paths[post_id][0], depth + 1) for child_id in children[post_id])
+
+        changed = [
+            Post(id=post_id, path=path, depth=depth)
+            for post_id, (path, depth) in paths.items()
+            if stored[post_id] != (path, depth)
+        ]
+        Post.all_objects.bulk_update(changed, ["path", "depth"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt post paths: {len(changed)} of {len(stored)} posts changed"))
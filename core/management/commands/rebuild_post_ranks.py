@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandParser
+
+from core.models import Post
+
+
+class Command(BaseCommand):
+    help = "Recomputing hot, top and controversial rank columns for every post"
+
+    def add_arguments(self: "Command", parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self: "Command", *_args: str, **options: str) -> None:
+        batch_size = options["batch_size"]
+        posts = Post.all_objects.only("id", "up_votes", "down_votes", "created_at").order_by("id")
+        batch = []
+        total = 0
+        for post in posts.iterator(chunk_size=batch_size):
+            post.update_rank_fields()
+            batch.append(post)
+            if len(batch) == batch_size:
+                total += self.save_batch(batch)
+                batch = []
+        total += self.save_batch(batch)
+        self.stdout.write(self.style.SUCCESS(f"Recomputed ranks of {total} posts"))
+
+    def save_batch(self: "Command", batch: list[Post]) -> int:
+        Post.all_objects.bulk_update(batch, ["hot_rank", "top_rank", "controversial_rank"])
+        return len(batch)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+
+from core import search
+from core.models import Post
+
+
+class Command(BaseCommand):
+    help = "Rebuilding the search index of the configured backend from every post"
+
+    def add_arguments(self: "Command", parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self: "Command", *_args: str, **options: str) -> None:
+        backend = search.get_backend()
+        posts = Post.all_objects.only("id", "title", "content").order_by("id")
+        total = 0
+        with transaction.atomic():
+            backend.clear()
+            for post in posts.iterator(chunk_size=options["batch_size"]):
+                backend.index(post)
+                total += 1
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} posts with the {backend.name} backend"))
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandParser
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.models import Post, PostVote
+
+
+class Command(BaseCommand):
+    help = "Recomputing up/down vote tallies of every post from its votes and reporting drift"
+
+    def add_arguments(self: "Command", parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Only report drifted posts, do not fix them")
+
+    def handle(self: "Command", *_args: str, **options: str) -> None:
+        def votes_subquery(choice: str) -> Subquery:
+            return Subquery(
+                PostVote.objects.filter(post_id=OuterRef("pk"), choice=choice)
+                .values("post_id")
+                .annotate(votes=Count("pk"))
+                .values("votes")
+            )
+
+        drifted = (
+            Post.all_objects.annotate(
+                counted_up_votes=Coalesce(votes_subquery(PostVote.UPVOTE), 0),
+                counted_down_votes=Coalesce(votes_subquery(PostVote.DOWNVOTE), 0),
+            )
+            .exclude(up_votes=F("counted_up_votes"), down_votes=F("counted_down_votes"))
+            .only("id", "up_votes", "down_votes", "created_at")
+            .order_by("id")
+        )
+
+        fixed = []
+        now = timezone.now()
+        for post in drifted.iterator(chunk_size=options["batch_size"]):
+            self.stdout.write(
+                f"Post {post.id}: up_votes {post.up_votes} -> {post.counted_up_votes}, "
+                f"down_votes {post.down_votes} -> {post.counted_down_votes}"
+            )
+            post.up_votes = post.counted_up_votes
+            post.down_votes = post.counted_down_votes
+            post.score_changed_at = now
+            post.update_rank_fields()
+            fixed.append(post)
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"Found {len(fixed)} posts with drifted vote tallies (dry run)"))
+            return
+        Post.all_objects.bulk_update(
+            fixed,
+            ["up_votes", "down_votes", "hot_rank", "top_rank", "controversial_rank", "score_changed_at"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Fixed vote tallies of {len(fixed)} posts"))
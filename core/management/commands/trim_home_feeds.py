@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandParser
+
+from core import home_feed
+
+
+class Command(BaseCommand):
+    help = "Trimming every home feed to its newest HOME_FEED_MAX_ITEMS posts"
+
+    def add_arguments(self: "Command", parser: CommandParser) -> None:
+        parser.add_argument("--max-items", type=int, default=None)
+
+    def handle(self: "Command", *_args: str, **options: str) -> None:
+        removed = home_feed.trim(options["max_items"])
+        self.stdout.write(self.style.SUCCESS(f"Trimmed home feeds: removed {removed} items"))
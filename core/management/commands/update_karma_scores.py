@@ -1,20 +1,88 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
 
-from django.core.management.base import BaseCommand
-from django.db.models import F, OuterRef, Subquery, Sum
+from django.core.management.base import BaseCommand, CommandParser
+from django.db.models import F, Max, OuterRef, Q, QuerySet, Subquery, Sum
 from django.db.models.functions import Coalesce
 from django.utils import timezone
 
-from core.models import Post
+from core.models import KarmaRecalculation, PendingKarmaAuthor, Post
 from users.models import Profile
 
+KARMA_WINDOW = timedelta(days=365)
+
 
 class Command(BaseCommand):
-    help = "Updating karma scores for every user"
+    help = "Updating karma scores for every user, or with --incremental only for authors whose posts changed"
+
+    def add_arguments(self: "Command", parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=5000, help="Number of profiles recomputed at once")
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only recompute authors whose posts changed or aged out of the karma window since the last run",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only report karma changes, do not save them")
+
+    def handle(self: "Command", *_args: str, **options: str) -> None:
+        started_at = timezone.now()
+        date_limit = started_at - KARMA_WINDOW
+        since = KarmaRecalculation.last_started_at() if options["incremental"] else None
+        # authors of posts deleted until now, cleared once this run is saved
+        last_pending = PendingKarmaAuthor.objects.aggregate(last=Max("pk"))["last"] or 0
+        pending = PendingKarmaAuthor.objects.filter(pk__lte=last_pending)
+        profiles = Profile.objects.all()
+        if since is not None:
+            profiles = profiles.filter(
+                Q(user_id__in=self.changed_author_ids(since, date_limit)) | Q(user_id__in=pending.values("user_id"))
+            )
+        elif options["incremental"]:
+            self.stdout.write("No previous run found, recomputing every profile")
 
-    def handle(self: "Command", *_args: str, **_options: str) -> None:
-        date_limit = timezone.now() - timedelta(days=365)
+        total = profiles.count()
+        batch_size = options["batch_size"]
+        updated = post_karma_delta = comment_karma_delta = done = 0
+        last_pk = 0
+        while batch := list(profiles.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:batch_size]):
+            last_pk = batch[-1]
+            changed = self.karma_changes(batch, date_limit)
+            for profile in changed:
+                if options["verbosity"] > 1:
+                    self.stdout.write(
+                        f"Profile {profile.pk}: post_karma {profile.post_karma} -> {profile.new_post_karma}, "
+                        f"comment_karma {profile.comment_karma} -> {profile.new_comment_karma}"
+                    )
+                post_karma_delta += profile.new_post_karma - profile.post_karma
+                comment_karma_delta += profile.new_comment_karma - profile.comment_karma
+                profile.post_karma = profile.new_post_karma
+                profile.comment_karma = profile.new_comment_karma
+            if not options["dry_run"]:
+                Profile.objects.bulk_update(changed, ["post_karma", "comment_karma"])
+            updated += len(changed)
+            done += len(batch)
+            self.stdout.write(f"Processed {done}/{total} profiles, {updated} changed")
 
+        summary = (
+            f"karma of {updated} of {total} profiles "
+            f"(post karma {post_karma_delta:+d}, comment karma {comment_karma_delta:+d})"
+        )
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"Would update {summary} (dry run)"))
+            return
+        KarmaRecalculation.objects.create(
+            started_at=started_at, incremental=since is not None, updated_profiles=updated
+        )
+        pending.delete()
+        self.stdout.write(self.style.SUCCESS(f"Updated {summary}"))
+
+    @staticmethod
+    def changed_author_ids(since: datetime, date_limit: datetime) -> QuerySet:
+        # votes, edits and (de)activations bump score_changed_at, posts older than the window drop out of karma
+        return Post.all_objects.filter(
+            Q(score_changed_at__gte=since) | Q(created_at__gte=since - KARMA_WINDOW, created_at__lt=date_limit)
+        ).values("author_id")
+
+    @staticmethod
+    def karma_changes(profile_ids: list[int], date_limit: datetime) -> list[Profile]:
         def karma_subquery(*, parent_isnull: bool) -> Subquery:
             return (
                 Post.objects.filter(
@@ -25,7 +93,13 @@ class Command(BaseCommand):
                 .values("karma_score")
             )
 
-        Profile.objects.update(
-            post_karma=Coalesce(Subquery(karma_subquery(parent_isnull=True)), 0),
-            comment_karma=Coalesce(Subquery(karma_subquery(parent_isnull=False)), 0),
+        return list(
+            Profile.objects.filter(pk__in=profile_ids)
+            .annotate(
+                new_post_karma=Coalesce(Subquery(karma_subquery(parent_isnull=True)), 0),
+                new_comment_karma=Coalesce(Subquery(karma_subquery(parent_isnull=False)), 0),
+            )
+            .exclude(post_karma=F("new_post_karma"), comment_karma=F("new_comment_karma"))
+            .only("pk", "post_karma", "comment_karma")
+            .order_by("pk")
         )
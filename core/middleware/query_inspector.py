@@ -0,0 +1,118 @@
+"""Per request SQL recording with N+1 detection.
+
+Every query run while handling a request is fingerprinted (parameters and ``IN`` lists collapsed) and
+attributed to the template and project source line that triggered it. Query shapes repeated more than
+``QUERY_INSPECTOR_REPEAT_THRESHOLD`` times are logged, and every report is sent with
+``query_report_ready`` so tests can enforce per URL name budgets (see ``core.tests.query_budget``).
+"""
+
+import inspect
+import logging
+import re
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import FrameType
+
+from django.conf import settings
+from django.db import connection
+from django.dispatch import Signal
+from django.http import HttpRequest, HttpResponse
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+query_report_ready = Signal()
+
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LIST_RE = re.compile(r"\bIN \((?:%s, )*%s\)")
+PROJECT_ROOT = f"{Path(settings.BASE_DIR).resolve()}/"
+THIS_FILE = str(Path(__file__).resolve())
+
+
+def fingerprint(sql: str) -> str:
+    return IN_LIST_RE.sub("IN (...)", LITERAL_RE.sub("%s", sql))
+
+
+def query_origin(frame: FrameType | None) -> str:
+    """Innermost project source line and template on the stack, e.g. ``core/views.py:42 in post-detail.html``."""
+    location = template = None
+    while frame is not None and template is None:
+        # type() rather than isinstance(), which would evaluate lazy objects such as request.user
+        instance = frame.f_locals.get("self")
+        if issubclass(type(instance), Template) and instance.origin.template_name:
+            template = instance.origin.template_name
+        filename = frame.f_code.co_filename
+        if location is None and filename.startswith(PROJECT_ROOT) and filename != THIS_FILE:
+            location = f"{filename.removeprefix(PROJECT_ROOT)}:{frame.f_lineno}"
+        frame = frame.f_back
+    return " in ".join(part for part in (location, template) if part) or "unknown"
+
+
+@dataclass
+class RecordedQuery:
+    sql: str
+    fingerprint: str
+    origin: str
+
+
+@dataclass
+class RepeatedQuery:
+    fingerprint: str
+    count: int
+    origins: list[str]
+
+    def __str__(self: "RepeatedQuery") -> str:
+        return f"{self.count}x from {', '.join(self.origins)}: {self.fingerprint}"
+
+
+@dataclass
+class QueryReport:
+    url_name: str | None
+    path: str
+    queries: list[RecordedQuery] = field(default_factory=list)
+
+    # the execute_wrapper signature, see https://docs.djangoproject.com/en/5.0/topics/db/instrumentation/
+    def __call__(  # noqa: PLR0913
+        self: "QueryReport",
+        execute: Callable,
+        sql: str,
+        params: tuple,
+        many: bool,  # noqa: FBT001
+        context: dict,
+    ) -> object:
+        self.queries.append(RecordedQuery(sql, fingerprint(sql), query_origin(inspect.currentframe())))
+        return execute(sql, params, many, context)
+
+    def repeated(self: "QueryReport", threshold: int) -> list[RepeatedQuery]:
+        counts = Counter(query.fingerprint for query in self.queries)
+        return [
+            RepeatedQuery(
+                shape,
+                count,
+                sorted({query.origin for query in self.queries if query.fingerprint == shape}),
+            )
+            for shape, count in counts.most_common()
+            if count > threshold
+        ]
+
+
+class QueryInspectorMiddleware:
+    def __init__(self: "QueryInspectorMiddleware", get_response: Callable) -> None:
+        self.get_response = get_response
+
+    def __call__(self: "QueryInspectorMiddleware", request: HttpRequest) -> HttpResponse:
+        if not settings.QUERY_INSPECTOR_ENABLED:
+            return self.get_response(request)
+
+        report = QueryReport(url_name=None, path=request.path)
+        with connection.execute_wrapper(report):
+            response = self.get_response(request)
+        if request.resolver_match is not None:
+            report.url_name = request.resolver_match.view_name
+
+        for repeated in report.repeated(settings.QUERY_INSPECTOR_REPEAT_THRESHOLD):
+            logger.warning("Possible N+1 on %s (%s): %s", report.url_name, report.path, repeated)
+        query_report_ready.send(sender=self.__class__, report=report)
+        return response
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:38
+
+from django.db import migrations, models
+
+
+def backfill_descendant_counts(apps, schema_editor):
+    Post = apps.get_model("core", "Post")
+    children = {}
+    active = {}
+    for post_id, parent_id, is_active in Post._base_manager.values_list("id", "parent_id", "is_active").iterator():
+        children.setdefault(parent_id, []).append(post_id)
+        active[post_id] = is_active
+    counts = {}
+    # iterative post-order walk, inactive comments hide their subtree
+    stack = [(post_id, False) for post_id in children.get(None, [])]
+    while stack:
+        post_id, visited = stack.pop()
+        if not visited:
+            stack.append((post_id, True))
+            stack.extend((child_id, False) for child_id in children.get(post_id, []))
+            continue
+        counts[post_id] = sum(1 + counts[child_id] for child_id in children.get(post_id, []) if active[child_id])
+    changed = [Post(id=post_id, descendant_count=count) for post_id, count in counts.items() if count]
+    Post._base_manager.bulk_update(changed, ["descendant_count"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_alter_postaward_choice'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='descendant_count',
+            field=models.IntegerField(default=0, help_text='Number of active comments below this post, maintained on comment create, (de)activate and delete'),
+        ),
+        migrations.RunPython(backfill_descendant_counts, migrations.RunPython.noop),
+    ]
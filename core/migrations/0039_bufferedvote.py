@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_post_descendant_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BufferedVote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('choice', models.CharField(choices=[('10_UPVOTE', 'Up Vote'), ('20_DOWNVOTE', 'Down Vote')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buffered_votes', to='core.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buffered_votes', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
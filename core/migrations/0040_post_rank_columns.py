@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+from core.ranking import controversial_rank, hot_rank
+
+
+def backfill_ranks(apps, schema_editor):
+    Post = apps.get_model("core", "Post")
+    posts = Post._base_manager.only("id", "up_votes", "down_votes", "created_at").order_by("id")
+    changed = []
+    for post in posts.iterator(chunk_size=1000):
+        post.top_rank = post.up_votes - post.down_votes
+        post.hot_rank = hot_rank(post.up_votes, post.down_votes, post.created_at)
+        post.controversial_rank = controversial_rank(post.up_votes, post.down_votes)
+        changed.append(post)
+    Post._base_manager.bulk_update(changed, ["hot_rank", "top_rank", "controversial_rank"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0039_bufferedvote'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='controversial_rank',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='hot_rank',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='top_rank',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_ranks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['parent', '-hot_rank', '-id'], name='core_post_hot_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['parent', '-top_rank', '-id'], name='core_post_top_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['parent', '-controversial_rank', '-id'], name='core_post_controversial_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['parent', '-created_at', '-id'], name='core_post_created_at_idx'),
+        ),
+    ]
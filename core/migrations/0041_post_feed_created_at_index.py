@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0040_post_rank_columns'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-created_at', '-id'], name='core_post_feed_created_at_idx'),
+        ),
+    ]
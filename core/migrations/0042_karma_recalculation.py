@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0041_post_feed_created_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KarmaRecalculation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('incremental', models.BooleanField(default=False)),
+                ('updated_profiles', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='score_changed_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Last time the post was saved or voted on, drives incremental karma updates'),
+        ),
+    ]
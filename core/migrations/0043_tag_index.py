@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:02
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_tags(apps, schema_editor):
+    Tag = apps.get_model("core", "Tag")
+    duplicates = (
+        Tag.objects.values("content_type", "object_id", "name")
+        .annotate(first_id=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        Tag.objects.filter(
+            content_type=duplicate["content_type"], object_id=duplicate["object_id"], name=duplicate["name"]
+        ).exclude(pk=duplicate["first_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0042_karma_recalculation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['name', 'content_type', 'object_id'], name='core_tag_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['content_type', 'created_at', 'name'], name='core_tag_created_at_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_tags, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('content_type', 'object_id', 'name'), name='core_tag_unique_per_object'),
+        ),
+    ]
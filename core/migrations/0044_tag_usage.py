@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_tag_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.SlugField()),
+                ('bucket', models.DateTimeField()),
+                ('posts', models.PositiveIntegerField(default=1)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket', 'name'], name='core_tagusage_bucket_idx')],
+            },
+        ),
+    ]
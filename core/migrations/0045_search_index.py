@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:14
+
+import django.db.models.deletion
+from django.db import OperationalError, migrations, models
+
+
+def create_fts_table(apps, schema_editor):
+    # FTS5 only exists on SQLite builds compiled with it, core.search falls back to the inverted index otherwise
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE core_post_fts USING fts5(title, content, tokenize='unicode61')")
+        except OperationalError:
+            return
+        cursor.execute("INSERT INTO core_post_fts(rowid, title, content) SELECT id, title, content FROM core_post")
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS core_post_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0044_tag_usage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='core.post')),
+                ('length', models.PositiveIntegerField(help_text='Number of weighted terms in the title and content')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=255)),
+                ('frequency', models.PositiveIntegerField(help_text='Weighted number of occurrences in the title and content')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='core.searchdocument')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('term', 'document'), name='core_searchterm_unique_term')],
+            },
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
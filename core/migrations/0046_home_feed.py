@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_member_count(apps, schema_editor):
+    Community = apps.get_model("core", "Community")
+    counts = Community.all_objects.annotate(members_total=Count("members")).values_list("pk", "members_total")
+    for pk, members_total in counts:
+        Community.all_objects.filter(pk=pk).update(member_count=members_total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0045_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='community',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of members, kept up to date by the membership signals'),
+        ),
+        migrations.RunPython(backfill_member_count, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(help_text='Creation time of the post, the feed order')),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.community')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='core.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-created_at', '-post'], name='core_feeditem_user_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'post'), name='core_feeditem_unique_post')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    Post = apps.get_model("core", "Post")
+    children = {}
+    for post_id, parent_id in Post._base_manager.values_list("id", "parent_id").iterator():
+        children.setdefault(parent_id, []).append(post_id)
+    changed = []
+    stack = [(post_id, "", 0) for post_id in children.get(None, [])]
+    while stack:
+        post_id, parent_path, depth = stack.pop()
+        path = f"{parent_path}{post_id:010d}/"
+        changed.append(Post(id=post_id, path=path, depth=depth))
+        stack.extend((child_id, path, depth + 1) for child_id in children.get(post_id, []))
+    Post._base_manager.bulk_update(changed, ["path", "depth"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0046_home_feed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='depth',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='0 for posts, 1 for their comments, ...'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='path',
+            field=models.TextField(default='', editable=False, help_text='Materialized path of the thread, set on insert, see path_segment'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['path'], name='core_post_path_idx'),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:11
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0047_post_path'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='community',
+            managers=[
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:56
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0048_alter_community_managers'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='tag',
+            name='core_tag_created_at_idx',
+        ),
+    ]
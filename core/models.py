@@ -1,20 +1,36 @@
 import hashlib
 import re
 import typing
-from datetime import timedelta
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import UTC, datetime, timedelta
 from typing import Any, ClassVar
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
-from django.db.models import Case, F, QuerySet, Value, When
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, QuerySet, Subquery, Value, When
+from django.db.models.functions import Coalesce, Substr
 from django.utils import timezone
 from django.utils.text import slugify
 
+from . import community_cache, presence, ranking
+
 User = get_user_model()
 
+HASHTAG_RE = re.compile(r"#(\w+)")
+
+# Post.path is the zero padded ids from the root post down to the post itself, each followed by "/", so
+# string order is thread order and the descendants of a post are the paths in [path, path + PATH_END)
+PATH_SEGMENT_WIDTH = 10
+PATH_END = "~"
+
+
+def path_segment(post_id: int) -> str:
+    return f"{post_id:0{PATH_SEGMENT_WIDTH}d}/"
+
 
 class ActiveOnlyManager(models.Manager):
     def get_queryset(self: "ActiveOnlyManager") -> QuerySet:
@@ -35,6 +51,65 @@ class GenericModel(models.Model):
         abstract = True
 
 
+# characters of content loaded for list previews, with room for markup that is stripped before truncating
+CARD_PREVIEW_LENGTH = 500
+# maintained with F() updates by votes, awards, views and comments, an ordinary save of a loaded post leaves them
+POST_COUNTER_FIELDS = frozenset(
+    {
+        "up_votes",
+        "down_votes",
+        "gold",
+        "display_counter",
+        "descendant_count",
+        "hot_rank",
+        "top_rank",
+        "controversial_rank",
+    }
+)
+
+
+class PostQuerySet(models.QuerySet):
+    def bulk_create(
+        self: "PostQuerySet", objs: Iterable["Post"], batch_size: int | None = None, **kwargs: dict[str, Any]
+    ) -> list["Post"]:
+        """Insert the posts, then store their paths and depths, which ``Post.save`` sets after its insert.
+
+        The posts are added to the search index and fanned out to the home feeds, which the ``post_save``
+        signal does for ``save``.
+        Descendant counts are left as they are, like the other counters ``save`` would keep up to date.
+        """
+        from . import home_feed, search
+
+        posts = super().bulk_create(objs, batch_size, **kwargs)
+        inserted = [post for post in posts if post.pk is not None]
+        parent_ids = {post.parent_id for post in inserted if post.parent_id is not None}
+        parents = {
+            post_id: (path, depth)
+            for post_id, path, depth in self.model.all_objects.filter(pk__in=parent_ids).values_list(
+                "id", "path", "depth"
+            )
+        }
+        for post in inserted:
+            parent_path, parent_depth = parents.get(post.parent_id, ("", -1))
+            post.path = parent_path + path_segment(post.pk)
+            post.depth = parent_depth + 1
+        self.model.all_objects.bulk_update(inserted, ["path", "depth"], batch_size=batch_size)
+        for post in inserted:
+            search.index_post(post)
+            home_feed.fan_out(post)
+        return posts
+
+    def cards(self: "PostQuerySet", *, preview: bool = False) -> "PostQuerySet":
+        """Load everything ``post-header.html`` and ``post-footer.html`` render with the posts.
+
+        With ``preview`` only the start of the content is loaded, as ``content_preview``.
+        """
+        queryset = self.select_related("author__profile", "community")
+        if preview:
+            queryset = queryset.annotate(content_preview=Substr("content", 1, CARD_PREVIEW_LENGTH)).defer("content")
+        return queryset
+
+
 class PostManagerMixin:
     def roots(self: "PostManagerMixin", **kwargs: dict[str, Any]) -> QuerySet["Post"]:
         return self.get_queryset().filter(parent__isnull=True, **kwargs)
@@ -42,8 +117,11 @@ class PostManagerMixin:
     def comments(self: "PostManagerMixin", **kwargs: dict[str, Any]) -> QuerySet["Post"]:
         return self.get_queryset().filter(parent__isnull=False, **kwargs)
 
+    def tagged(self: "PostManagerMixin", name: str) -> QuerySet["Post"]:
+        return self.get_queryset().filter(pk__in=Tag.objects.for_posts().filter(name=name).values("object_id"))
 
-class ActivePostManagers(PostManagerMixin, ActiveOnlyManager):
+
+class ActivePostManagers(PostManagerMixin, ActiveOnlyManager.from_queryset(PostQuerySet)):
     pass
 
 
@@ -66,11 +144,36 @@ class PostAwardManager(models.Manager):
             )
         )
 
+    def get_post_awards_by_post(self: "PostAwardManager", post_ids: list[int]) -> dict[int, list[dict]]:
+        awards_by_post = defaultdict(list)
+        for award in self.get_post_awards_anonymous().filter(post_id__in=post_ids).order_by("id"):
+            awards_by_post[award["post_id"]].append(award)
+        return awards_by_post
+
 
-class AllObjectsPostManager(PostManagerMixin, models.Manager):
+class AllObjectsPostManager(PostManagerMixin, models.Manager.from_queryset(PostQuerySet)):
     pass
 
 
+class CommunityQuerySet(models.QuerySet):
+    def with_member_stats(self: "CommunityQuerySet") -> "CommunityQuerySet":
+        """Count the members online in the same query, as ``online_members``, ``member_count`` is a column.
+
+        Nothing is annotated while the presence index answers ``count_online_users`` from the cache.
+        """
+        if settings.PRESENCE_INDEX_ENABLED:
+            return self
+        online_limit = timezone.now() - timedelta(minutes=settings.LAST_ACTIVITY_ONLINE_LIMIT_MINUTES)
+        online = (
+            CommunityMember.objects.filter(community=OuterRef("pk"), user__last_activity__gte=online_limit)
+            .order_by()
+            .values("community")
+            .annotate(n=Count("pk"))
+            .values("n")
+        )
+        return self.annotate(online_members=Coalesce(Subquery(online), 0))
+
+
 class Community(GenericModel):
     PUBLIC: typing.ClassVar[str] = "10_PUBLIC"
     RESTRICTED: typing.ClassVar[str] = "20_RESTRICTED"
@@ -88,6 +191,12 @@ class Community(GenericModel):
     members = models.ManyToManyField(User, through="CommunityMember", related_name="communities")
     privacy = models.CharField(max_length=15, choices=PRIVACY_CHOICES, default=RESTRICTED)
     is_18_plus = models.BooleanField(default=False)
+    member_count = models.PositiveIntegerField(
+        default=0, help_text="Number of members, kept up to date by the membership signals"
+    )
+
+    objects = ActiveOnlyManager.from_queryset(CommunityQuerySet)()
+    all_objects = models.Manager.from_queryset(CommunityQuerySet)()
 
     class Meta:
         verbose_name_plural = "Communities"
@@ -110,6 +219,11 @@ class Community(GenericModel):
         return unique_slug
 
     def count_online_users(self: "Community") -> int:
+        count = presence.online_count(self.pk)
+        if count is not None:
+            return count
+        if hasattr(self, "online_members"):
+            return self.online_members
         online_limit = timezone.now() - timedelta(minutes=settings.LAST_ACTIVITY_ONLINE_LIMIT_MINUTES)
         return self.members.filter(last_activity__gte=online_limit).count()
 
@@ -120,12 +234,9 @@ class Community(GenericModel):
         CommunityService.remove_moderator(self, user)
 
     def is_admin_or_moderator(self: "Community", user: User) -> bool:
-        return (
-            CommunityMember.objects.filter(
-                community=self, user=user, role__in=[CommunityMember.ADMIN, CommunityMember.MODERATOR]
-            ).exists()
-            or self.author == user
-        )
+        if user.pk is not None and self.author_id == user.pk:
+            return True
+        return community_cache.get_role(self.pk, user.pk) in {CommunityMember.ADMIN, CommunityMember.MODERATOR}
 
 
 class CommunityService:
@@ -140,6 +251,38 @@ class CommunityService:
         CommunityMember.objects.filter(community=community, user=user, role=CommunityMember.MODERATOR).delete()
 
 
+class TagQuerySet(models.QuerySet):
+    def for_posts(self: "TagQuerySet") -> "TagQuerySet":
+        return self.filter(content_type=ContentType.objects.get_for_model(Post))
+
+    def add(self: "TagQuerySet", names: Iterable[str], content_type: ContentType, object_id: int) -> list[str]:
+        """Tag the object with the names, return the ones actually added.
+
+        A concurrent save may have added some of them first, then the unique constraint rejects the batch and
+        the names are inserted one by one to tell which ones were new.
+        """
+        names = list(names)
+        try:
+            with transaction.atomic():
+                self.bulk_create(
+                    [self.model(name=name, content_type=content_type, object_id=object_id) for name in names]
+                )
+        except IntegrityError:
+            pass
+        else:
+            return names
+        added = []
+        for name in names:
+            try:
+                with transaction.atomic():
+                    self.create(name=name, content_type=content_type, object_id=object_id)
+            except IntegrityError:
+                continue
+            else:
+                added.append(name)
+        return added
+
+
 class Tag(models.Model):
     name = models.SlugField()
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
@@ -147,15 +290,52 @@ class Tag(models.Model):
     content_object = GenericForeignKey("content_type", "object_id")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = TagQuerySet.as_manager()
+
     class Meta:
         indexes: ClassVar[list[models.Index]] = [
             models.Index(fields=["content_type", "object_id"]),
+            # tag -> posts lookups, trending tags are counted in TagUsage
+            models.Index(fields=["name", "content_type", "object_id"], name="core_tag_name_idx"),
+        ]
+        constraints: ClassVar[list[models.BaseConstraint]] = [
+            models.UniqueConstraint(fields=["content_type", "object_id", "name"], name="core_tag_unique_per_object"),
         ]
 
     def __str__(self: "Tag") -> str:
         return str(self.name)
 
 
+class TagUsage(models.Model):
+    """Number of posts a tag was added to within a time bucket, the aggregates behind ``core.trending``.
+
+    Rows are only ever inserted, ``manage.py compact_tag_usage`` merges them into coarser buckets as they age.
+    """
+
+    name = models.SlugField()
+    bucket = models.DateTimeField()
+    posts = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes: ClassVar[list[models.Index]] = [
+            models.Index(fields=["bucket", "name"], name="core_tagusage_bucket_idx"),
+        ]
+
+    def __str__(self: "TagUsage") -> str:
+        return f"#{self.name} at {self.bucket}: {self.posts}"
+
+    @staticmethod
+    def bucket_of(moment: datetime, size: timedelta | None = None) -> datetime:
+        """Start of the bucket of the given size, by default ``TRENDING_TAGS_BUCKET_MINUTES``, holding the moment."""
+        seconds = (size or timedelta(minutes=settings.TRENDING_TAGS_BUCKET_MINUTES)).total_seconds()
+        return datetime.fromtimestamp(moment.timestamp() // seconds * seconds, tz=UTC)
+
+    @classmethod
+    def record(cls: type["TagUsage"], names: Iterable[str]) -> None:
+        bucket = cls.bucket_of(timezone.now())
+        cls.objects.bulk_create([cls(name=name, bucket=bucket) for name in names])
+
+
 class Post(GenericModel):
     community = models.ForeignKey(
         Community,
@@ -181,11 +361,38 @@ class Post(GenericModel):
         help_text="Hash of the title + content to prevent overwriting already saved post",
     )
     display_counter = models.IntegerField(default=0)
+    descendant_count = models.IntegerField(
+        default=0,
+        help_text="Number of active comments below this post, maintained on comment create, (de)activate and delete",
+    )
+    hot_rank = models.FloatField(default=0, editable=False)
+    top_rank = models.IntegerField(default=0, editable=False)
+    controversial_rank = models.FloatField(default=0, editable=False)
+    score_changed_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        help_text="Last time the post was saved or voted on, drives incremental karma updates",
+    )
     is_active = models.BooleanField(default=True)
+    path = models.TextField(
+        default="", editable=False, help_text="Materialized path of the thread, set on insert, see path_segment"
+    )
+    depth = models.PositiveIntegerField(default=0, editable=False, help_text="0 for posts, 1 for their comments, ...")
 
     objects = ActivePostManagers()
     all_objects = AllObjectsPostManager()
 
+    class Meta:
+        indexes: ClassVar[list[models.Index]] = [
+            models.Index(fields=["parent", "-hot_rank", "-id"], name="core_post_hot_rank_idx"),
+            models.Index(fields=["parent", "-top_rank", "-id"], name="core_post_top_rank_idx"),
+            models.Index(fields=["parent", "-controversial_rank", "-id"], name="core_post_controversial_idx"),
+            models.Index(fields=["parent", "-created_at", "-id"], name="core_post_created_at_idx"),
+            # the API feeds span posts and comments, so keyset pages on "new" need an index without parent
+            models.Index(fields=["-created_at", "-id"], name="core_post_feed_created_at_idx"),
+            models.Index(fields=["path"], name="core_post_path_idx"),
+        ]
+
     def __str__(self: "Post") -> str:
         return f"@{self.author}: {self.title}"
 
@@ -194,8 +401,30 @@ class Post(GenericModel):
             msg = "The post was already modified"
             raise ValueError(msg)
         self.version = self.generate_version()
+        is_new = self._state.adding or self.pk is None
+        if is_new:
+            self.descendant_count = 0
+        elif self.parent_id is not None:
+            was_active, self.descendant_count = (
+                Post.all_objects.filter(pk=self.pk).values_list("is_active", "descendant_count").get()
+            )
+        self.update_rank_fields()
+        if not is_new and not args and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in POST_COUNTER_FIELDS
+            ]
         super().save(*args, **kwargs)
-        self.update_tags()
+        if is_new:
+            self.set_path()
+        self.update_tags(created=is_new)
+        if self.parent_id is not None:
+            if is_new and self.is_active:
+                self.update_ancestors_descendant_count(1)
+            elif not is_new and was_active != self.is_active:
+                delta = 1 + self.descendant_count
+                self.update_ancestors_descendant_count(delta if self.is_active else -delta)
 
     def generate_version(self: "Post") -> str:
         data = f"{self.title}{self.content}{self.is_active}"
@@ -205,34 +434,48 @@ class Post(GenericModel):
     def score(self: "Post") -> int:
         return self.up_votes - self.down_votes
 
+    def update_rank_fields(self: "Post") -> None:
+        self.top_rank = self.score
+        self.hot_rank = ranking.hot_rank(self.up_votes, self.down_votes, self.created_at or timezone.now())
+        self.controversial_rank = ranking.controversial_rank(self.up_votes, self.down_votes)
+
     def get_content_type(self: "Post") -> ContentType:
         return ContentType.objects.get_for_model(self)
 
-    def get_post_awards(self: "Post") -> QuerySet:
+    def get_post_awards(self: "Post") -> QuerySet | list[dict]:
+        if hasattr(self, "prefetched_awards"):
+            return self.prefetched_awards
         return PostAward.objects.get_post_awards_anonymous().filter(post=self)
 
-    def update_tags(self: "Post") -> None:
-        current_tags = set(re.findall(r"#(\w+)", self.content))
-        existing_tags = set(
-            Tag.objects.filter(
-                content_type=self.get_content_type(),
-                object_id=self.id,
-            ).values_list("name", flat=True),
-        )
-        tags_to_remove = existing_tags - current_tags
-        Tag.objects.filter(
-            name__in=tags_to_remove,
-            content_type=self.get_content_type(),
-            object_id=self.id,
-        ).delete()
-        new_tags = current_tags - existing_tags
-        for tag in new_tags:
-            Tag.objects.create(name=tag, content_object=self)
+    @staticmethod
+    def attach_awards(posts: Iterable["Post"]) -> None:
+        """Load the anonymised awards of every post in one query, ``get_post_awards`` then returns them."""
+        posts = list(posts)
+        awards_by_post = PostAward.objects.get_post_awards_by_post([post.pk for post in posts]) if posts else {}
+        for post in posts:
+            post.prefetched_awards = awards_by_post.get(post.pk, [])
+
+    def update_tags(self: "Post", *, created: bool = False) -> None:
+        """Sync the tags with the hashtags of the content and count the added ones in ``TagUsage``."""
+        current_tags = set(HASHTAG_RE.findall(self.content))
+        content_type = self.get_content_type()
+        new_tags = current_tags
+        if not created:
+            tags = Tag.objects.filter(content_type=content_type, object_id=self.pk)
+            existing_tags = set(tags.values_list("name", flat=True))
+            if existing_tags - current_tags:
+                tags.filter(name__in=existing_tags - current_tags).delete()
+            new_tags = current_tags - existing_tags
+        if new_tags and created:
+            # nothing can have tagged a post that was just inserted
+            Tag.objects.bulk_create([Tag(name=name, content_type=content_type, object_id=self.pk) for name in new_tags])
+        elif new_tags:
+            # only the tags this save added are counted, not the ones a concurrent save added first
+            new_tags = Tag.objects.add(new_tags, content_type, self.pk)
+        TagUsage.record(new_tags)
 
     def vote(self: "Post", user: User, choice: str) -> None:
-        vote, _ = PostVote.objects.get_or_create(user=user, post=self)
-        vote.choice = choice
-        vote.save()
+        PostVote.objects.update_or_create(user=user, post=self, defaults={"choice": choice})
 
     def get_images(self: "Post") -> QuerySet:
         return Image.objects.filter(post=self)
@@ -242,14 +485,41 @@ class Post(GenericModel):
 
     @property
     def children_count(self: "Post") -> int:
-        def count_descendants(post: "Post") -> int:
-            children = post.children.all()
-            total_children = children.count()
-            for child in children:
-                total_children += count_descendants(child)
-            return total_children
+        return self.descendant_count
+
+    def set_path(self: "Post") -> None:
+        """Store the path and depth of a new post below the ones of its parent."""
+        parent_path, parent_depth = "", -1
+        if self.parent_id is not None:
+            if Post.parent.is_cached(self):
+                parent_path, parent_depth = self.parent.path, self.parent.depth
+            else:
+                parent_path, parent_depth = (
+                    Post.all_objects.filter(pk=self.parent_id).values_list("path", "depth").get()
+                )
+        self.path = parent_path + path_segment(self.pk)
+        self.depth = parent_depth + 1
+        Post.all_objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+
+    @property
+    def ancestor_ids(self: "Post") -> list[int]:
+        """Ids from the root post down to the parent, read from the path without a query."""
+        return [int(segment) for segment in self.path.split("/")[:-2]]
+
+    def get_ancestors(self: "Post") -> QuerySet["Post"]:
+        return Post.all_objects.filter(pk__in=self.ancestor_ids).order_by("depth")
 
-        return count_descendants(self)
+    def get_descendants(self: "Post") -> QuerySet["Post"]:
+        """Every comment below the post, active or not, in thread order."""
+        return Post.all_objects.filter(path__gt=self.path, path__lt=self.path + PATH_END).order_by("path")
+
+    def update_ancestors_descendant_count(self: "Post", delta: int) -> None:
+        """Add ``delta`` to the parent and further ancestors, stopping above the first inactive one."""
+        if self.parent_id is None or not delta:
+            return
+        ancestors = self.get_ancestors()
+        inactive_below = ancestors.filter(is_active=False, depth__gt=OuterRef("depth"))
+        ancestors.exclude(Exists(inactive_below)).update(descendant_count=F("descendant_count") + delta)
 
     def is_top_level(self: "Post") -> bool:
         return self.parent is None
@@ -257,6 +527,21 @@ class Post(GenericModel):
     def is_saved(self: "Post", user: User) -> bool:
         return SavedPost.objects.filter(user=user, post=self).exists()
 
+    @staticmethod
+    def attach_user_state(posts: Iterable["Post"], user: User) -> None:
+        """Set ``saved_by_user`` and ``user_vote`` ("up", "down" or None) on every post in two queries."""
+        posts = list(posts)
+        saved_ids, user_votes = set(), {}
+        if user.is_authenticated and posts:
+            post_ids = [post.pk for post in posts]
+            saved_ids = set(SavedPost.objects.filter(user=user, post_id__in=post_ids).values_list("post_id", flat=True))
+            vote_types = {choice: vote_type for vote_type, choice in PostVote.VOTE_TYPES.items()}
+            votes = PostVote.objects.filter(user=user, post_id__in=post_ids).values_list("post_id", "choice")
+            user_votes = {post_id: vote_types[choice] for post_id, choice in votes}
+        for post in posts:
+            post.saved_by_user = post.pk in saved_ids
+            post.user_vote = user_votes.get(post.pk)
+
     def get_comments(self: "Post") -> QuerySet:
         return self.children.all()
 
@@ -273,6 +558,14 @@ class PostVote(models.Model):
         (UPVOTE, "Up Vote"),
         (DOWNVOTE, "Down Vote"),
     ]
+    TALLY_FIELDS: ClassVar[dict[str, str]] = {
+        UPVOTE: "up_votes",
+        DOWNVOTE: "down_votes",
+    }
+    VOTE_TYPES: ClassVar[dict[str, str]] = {
+        "up": UPVOTE,
+        "down": DOWNVOTE,
+    }
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="post_votes")
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="post_votes")
@@ -286,11 +579,159 @@ class PostVote(models.Model):
         return f"@{self.user}: {self.choice} for post: {self.post}"
 
     def save(self: "PostVote", *args: int, **kwargs: int) -> None:
-        super().save(*args, **kwargs)
-        post_votes = PostVote.objects.filter(post=self.post)
-        up_votes = post_votes.filter(choice=PostVote.UPVOTE).count()
-        down_votes = post_votes.filter(choice=PostVote.DOWNVOTE).count()
-        Post.objects.filter(pk=self.post.pk).update(up_votes=up_votes, down_votes=down_votes)
+        with transaction.atomic():
+            previous_choice = None
+            if not self._state.adding:
+                previous_choice = (
+                    PostVote.objects.select_for_update().filter(pk=self.pk).values_list("choice", flat=True).first()
+                )
+                if previous_choice == self.choice:
+                    return
+            super().save(*args, **kwargs)
+            self.update_post_tally(previous_choice, self.choice)
+
+    def update_post_tally(self: "PostVote", previous_choice: str | None, choice: str | None) -> None:
+        deltas = self.get_tally_deltas(previous_choice, choice)
+        if deltas:
+            Post.all_objects.filter(pk=self.post_id).update(
+                **ranking.vote_delta_updates(deltas.get("up_votes", 0), deltas.get("down_votes", 0))
+            )
+
+    @classmethod
+    def get_tally_deltas(cls: "PostVote", previous_choice: str | None, choice: str | None) -> dict[str, int]:
+        deltas = {}
+        for vote_choice, field in cls.TALLY_FIELDS.items():
+            delta = (choice == vote_choice) - (previous_choice == vote_choice)
+            if delta:
+                deltas[field] = delta
+        return deltas
+
+
+class BufferedVote(models.Model):
+    """Append-only staging row for a vote, folded into PostVote and Post tallies by ``flush``."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="buffered_votes")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="buffered_votes")
+    choice = models.CharField(max_length=20, choices=PostVote.VOTE_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self: "BufferedVote") -> str:
+        return f"@{self.user_id}: buffered {self.choice} for post: {self.post_id}"
+
+    @classmethod
+    def flush(cls: "BufferedVote", batch_size: int) -> int:
+        with transaction.atomic():
+            # a concurrent flush waits on the oldest rows until this one commits, then reads the votes it wrote;
+            # skipping locked rows instead would apply later votes of the same users against stale choices
+            buffered = list(
+                cls.objects.select_for_update()
+                .order_by("id")
+                .values_list("id", "post_id", "user_id", "choice")[:batch_size]
+            )
+            if not buffered:
+                return 0
+            latest_choices = {(post_id, user_id): choice for _, post_id, user_id, choice in buffered}
+            post_ids = {post_id for post_id, _ in latest_choices}
+            user_ids = {user_id for _, user_id in latest_choices}
+            previous_choices = {
+                (post_id, user_id): choice
+                for post_id, user_id, choice in PostVote.objects.filter(
+                    post_id__in=post_ids, user_id__in=user_ids
+                ).values_list("post_id", "user_id", "choice")
+            }
+
+            post_deltas = defaultdict(lambda: defaultdict(int))
+            for (post_id, user_id), choice in latest_choices.items():
+                deltas = PostVote.get_tally_deltas(previous_choices.get((post_id, user_id)), choice)
+                for field, delta in deltas.items():
+                    post_deltas[post_id][field] += delta
+
+            PostVote.objects.bulk_create(
+                [
+                    PostVote(post_id=post_id, user_id=user_id, choice=choice)
+                    for (post_id, user_id), choice in latest_choices.items()
+                    if previous_choices.get((post_id, user_id)) != choice
+                ],
+                update_conflicts=True,
+                unique_fields=["post", "user"],
+                update_fields=["choice"],
+            )
+            for post_id, deltas in post_deltas.items():
+                if any(deltas.values()):
+                    Post.all_objects.filter(pk=post_id).update(
+                        **ranking.vote_delta_updates(deltas["up_votes"], deltas["down_votes"])
+                    )
+            cls.objects.filter(id__in=[buffered_id for buffered_id, *_ in buffered]).delete()
+        return len(buffered)
+
+
+class KarmaRecalculation(models.Model):
+    """Completed ``update_karma_scores`` run, the latest one is the starting point of incremental runs."""
+
+    started_at = models.DateTimeField()
+    incremental = models.BooleanField(default=False)
+    updated_profiles = models.IntegerField(default=0)
+
+    def __str__(self: "KarmaRecalculation") -> str:
+        return f"Karma recalculation started at {self.started_at}"
+
+    @classmethod
+    def last_started_at(cls: "KarmaRecalculation") -> datetime | None:
+        return cls.objects.aggregate(last=models.Max("started_at"))["last"]
+
+
+class PendingKarmaAuthor(models.Model):
+    """Author of a deleted post, which leaves no changed row behind for an incremental ``update_karma_scores``."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self: "PendingKarmaAuthor") -> str:
+        return f"Karma of @{self.user_id} pending since {self.created_at}"
+
+
+class FeedItem(models.Model):
+    """Root post pushed to the home feed of a member of its community, see ``core.home_feed``."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="feed_items")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="feed_items")
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(help_text="Creation time of the post, the feed order")
+
+    class Meta:
+        constraints: ClassVar[list[models.BaseConstraint]] = [
+            models.UniqueConstraint(fields=["user", "post"], name="core_feeditem_unique_post"),
+        ]
+        indexes: ClassVar[list[models.Index]] = [
+            models.Index(fields=["user", "-created_at", "-post"], name="core_feeditem_user_idx"),
+        ]
+
+    def __str__(self: "FeedItem") -> str:
+        return f"Post {self.post_id} in the feed of user {self.user_id}"
+
+
+class SearchDocument(models.Model):
+    """Indexed post of the inverted index search backend, see ``core.search``."""
+
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name="search_document")
+    length = models.PositiveIntegerField(help_text="Number of weighted terms in the title and content")
+
+    def __str__(self: "SearchDocument") -> str:
+        return f"Search document of post {self.post_id}"
+
+
+class SearchTerm(models.Model):
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name="terms")
+    term = models.CharField(max_length=255)
+    frequency = models.PositiveIntegerField(help_text="Weighted number of occurrences in the title and content")
+
+    class Meta:
+        constraints: ClassVar[list[models.BaseConstraint]] = [
+            models.UniqueConstraint(fields=["term", "document"], name="core_searchterm_unique_term"),
+        ]
+
+    def __str__(self: "SearchTerm") -> str:
+        return f"{self.term} in post {self.document_id}"
 
 
 class PostAward(models.Model):
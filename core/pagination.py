@@ -0,0 +1,115 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import APIView
+
+
+class KeysetPagination(BasePagination):
+    """Seek pagination over the queryset ordering, which must end with a unique field such as ``-id``.
+
+    The cursor is the opaque position of the last row of the page, so every page costs the same
+    index range scan no matter how deep it is, and no ``COUNT(*)`` is ever run.
+    """
+
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(
+        self: "KeysetPagination",
+        queryset: QuerySet,
+        request: Request,
+        view: APIView | None = None,  # noqa: ARG002
+    ) -> list:
+        self.request = request
+        self.ordering = list(queryset.query.order_by) or ["-id"]
+        position = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+        if position is not None:
+            queryset = queryset.filter(self.after_position_filter(position))
+        rows = list(queryset.order_by(*self.ordering)[: self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def get_paginated_response(self: "KeysetPagination", data: list) -> Response:
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_next_link(self: "KeysetPagination") -> str | None:
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), "page")
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def after_position_filter(self: "KeysetPagination", position: list) -> Q:
+        # (a, b, c) after (x, y, z) == a > x | (a == x & b > y) | (a == x & b == y & c > z)
+        condition = Q()
+        equal_so_far = Q()
+        for field, value in zip(self.ordering, position, strict=True):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal_so_far & Q(**{f"{name}__{lookup}": value})
+            equal_so_far &= Q(**{name: value})
+        # the redundant bound on the leading column lets the database seek the index instead of scanning it
+        leading = self.ordering[0]
+        bound = "lte" if leading.startswith("-") else "gte"
+        return Q(**{f"{leading.lstrip('-')}__{bound}": position[0]}) & condition
+
+    def encode_cursor(self: "KeysetPagination", obj: object) -> str:
+        names = [field.lstrip("-") for field in self.ordering]
+        # pages of model instances or of values() rows
+        values = [obj[name] for name in names] if isinstance(obj, dict) else [getattr(obj, name) for name in names]
+        position = [self.serialize_value(value) for value in values]
+        payload = json.dumps({"o": self.ordering, "p": position}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self: "KeysetPagination", cursor: str | None) -> list | None:
+        if not cursor:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            ordering, position = payload["o"], payload["p"]
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message) from None
+        if ordering != self.ordering or len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    @staticmethod
+    def serialize_value(value: object) -> object:
+        return value.isoformat() if isinstance(value, datetime) else value
+
+
+class PostPagination(PageNumberPagination):
+    """Page numbers by default; a ``cursor`` query parameter (empty for the first page) switches to keyset pages."""
+
+    def paginate_queryset(
+        self: "PostPagination",
+        queryset: QuerySet,
+        request: Request,
+        view: APIView | None = None,
+    ) -> list | None:
+        self.keyset = None
+        if KeysetPagination.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def page_state(self: "PostPagination") -> int | bool:
+        """Return what shapes the response besides the rows: whether a next page exists or the total count."""
+        if self.keyset is not None:
+            return self.keyset.has_next
+        return self.page.paginator.count
+
+    def get_paginated_response(self: "PostPagination", data: list) -> Response:
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,130 @@
+"""Per community online member counts kept in the cache in time buckets.
+
+Every member is counted in the bucket of their latest activity, so the number of members online in a
+community is the sum of its last ``LAST_ACTIVITY_ONLINE_LIMIT_MINUTES`` worth of buckets, a fixed number of
+cache reads however many members it has. Buckets expire with the cache timeout. A cold cache (first read,
+restart, eviction) is rebuilt from ``User.last_activity`` before it is read.
+
+The index lives in the default cache, so it is per process with the default local memory cache and shared
+between workers with a shared backend such as Redis or Memcached.
+"""
+
+import contextlib
+import uuid
+from collections import defaultdict
+from datetime import UTC, datetime
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+
+GENERATION_KEY = "presence:generation"
+
+
+def bucket_of(timestamp: float) -> int:
+    return int(timestamp // settings.PRESENCE_BUCKET_SECONDS)
+
+
+def window_buckets() -> int:
+    return settings.LAST_ACTIVITY_ONLINE_LIMIT_MINUTES * 60 // settings.PRESENCE_BUCKET_SECONDS
+
+
+def key_timeout() -> int:
+    return (window_buckets() + 1) * settings.PRESENCE_BUCKET_SECONDS
+
+
+def current_bucket() -> int:
+    return bucket_of(timezone.now().timestamp())
+
+
+def community_key(generation: str, community_id: int, bucket: int) -> str:
+    return f"presence:{generation}:community:{community_id}:{bucket}"
+
+
+def user_key(generation: str, user_id: int) -> str:
+    return f"presence:{generation}:user:{user_id}"
+
+
+def add(key: str, delta: int) -> None:
+    cache.add(key, 0, key_timeout())
+    # a bucket expiring in between is out of the window anyway
+    with contextlib.suppress(ValueError):
+        cache.incr(key, delta)
+
+
+def online_count(community_id: int) -> int | None:
+    """Members of the community active within the online limit, None when the index is disabled."""
+    if not settings.PRESENCE_INDEX_ENABLED:
+        return None
+    generation = cache.get(GENERATION_KEY) or rebuild()
+    bucket = current_bucket()
+    keys = [community_key(generation, community_id, bucket - offset) for offset in range(window_buckets())]
+    return sum(cache.get_many(keys).values())
+
+
+def record_activity(user_id: int) -> None:
+    """Move the user to the current bucket of every community they are a member of."""
+    generation = cache.get(GENERATION_KEY) if settings.PRESENCE_INDEX_ENABLED else None
+    if generation is None:
+        return  # a cold index is rebuilt from last_activity on the next read
+    bucket = current_bucket()
+    previous_bucket, community_ids = cache.get(user_key(generation, user_id), (None, []))
+    if previous_bucket == bucket:
+        return
+    if previous_bucket is None or bucket - previous_bucket >= window_buckets():
+        community_ids = list(
+            apps.get_model("core", "CommunityMember")
+            .objects.filter(user_id=user_id)
+            .values_list("community_id", flat=True)
+        )
+    else:
+        for community_id in community_ids:
+            add(community_key(generation, community_id, previous_bucket), -1)
+    for community_id in community_ids:
+        add(community_key(generation, community_id, bucket), 1)
+    cache.set(user_key(generation, user_id), (bucket, community_ids), key_timeout())
+
+
+def record_membership(user_id: int, community_id: int, *, joined: bool) -> None:
+    """Count or uncount an online user in a community they joined or left."""
+    generation = cache.get(GENERATION_KEY) if settings.PRESENCE_INDEX_ENABLED else None
+    if generation is None:
+        return
+    bucket, community_ids = cache.get(user_key(generation, user_id), (None, []))
+    if bucket is None and joined:
+        # not counted anywhere yet, e.g. an online user joining their first community
+        last_activity = get_user_model().objects.filter(pk=user_id).values_list("last_activity", flat=True).first()
+        bucket = bucket_of(last_activity.timestamp()) if last_activity else None
+    if bucket is None or current_bucket() - bucket >= window_buckets():
+        return
+    if joined and community_id not in community_ids:
+        community_ids = [*community_ids, community_id]
+        add(community_key(generation, community_id, bucket), 1)
+    elif not joined and community_id in community_ids:
+        community_ids = [cid for cid in community_ids if cid != community_id]
+        add(community_key(generation, community_id, bucket), -1)
+    cache.set(user_key(generation, user_id), (bucket, community_ids), key_timeout())
+
+
+def rebuild() -> str:
+    """Recompute every bucket from the last activity of online members under a new generation of keys."""
+    generation = uuid.uuid4().hex
+    first_bucket = current_bucket() - window_buckets() + 1
+    online_limit = datetime.fromtimestamp(first_bucket * settings.PRESENCE_BUCKET_SECONDS, tz=UTC)
+    memberships = (
+        apps.get_model("core", "CommunityMember")
+        .objects.filter(user__last_activity__gte=online_limit)
+        .values_list("user_id", "user__last_activity", "community_id")
+    )
+    users = {}
+    counts = defaultdict(int)
+    for user_id, last_activity, community_id in memberships:
+        bucket = bucket_of(last_activity.timestamp())
+        users.setdefault(user_key(generation, user_id), (bucket, []))[1].append(community_id)
+        counts[community_key(generation, community_id, bucket)] += 1
+    cache.set_many({**users, **counts}, key_timeout())
+    # the previous generation of keys is left to expire
+    cache.set(GENERATION_KEY, generation, None)
+    return generation
@@ -0,0 +1,95 @@
+"""Reddit style post rankings backed by the precomputed ``Post.*_rank`` columns."""
+
+import math
+from datetime import datetime, timedelta
+
+from django.db.models import Case, F, FloatField, QuerySet, Value, When
+from django.db.models.expressions import Expression
+from django.db.models.functions import Abs, Cast, Greatest, Least, Log, Now, Power, Sign
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+
+HOT = "hot"
+NEW = "new"
+TOP = "top"
+CONTROVERSIAL = "controversial"
+SORTS = (HOT, NEW, TOP, CONTROVERSIAL)
+
+SORT_ORDERING = {
+    HOT: ("-hot_rank", "-id"),
+    NEW: ("-created_at", "-id"),
+    TOP: ("-top_rank", "-id"),
+    CONTROVERSIAL: ("-controversial_rank", "-id"),
+}
+WINDOWED_SORTS = (TOP, CONTROVERSIAL)
+WINDOWS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+    "month": timedelta(days=30),
+    "year": timedelta(days=365),
+    "all": None,
+}
+DEFAULT_WINDOW = "day"
+
+# same constants as the original reddit hot ranking: every 12.5 hours of age is worth a 10x vote score
+HOT_EPOCH_SECONDS = 1134028003
+HOT_DECAY_SECONDS = 45000
+
+
+def hot_rank(up_votes: int, down_votes: int, created_at: datetime) -> float:
+    return hot_order(up_votes - down_votes) + (created_at.timestamp() - HOT_EPOCH_SECONDS) / HOT_DECAY_SECONDS
+
+
+def hot_order(score: int) -> float:
+    sign = (score > 0) - (score < 0)
+    return sign * math.log10(max(abs(score), 1))
+
+
+def controversial_rank(up_votes: int, down_votes: int) -> float:
+    if up_votes <= 0 or down_votes <= 0:
+        return 0.0
+    balance = min(up_votes, down_votes) / max(up_votes, down_votes)
+    return (up_votes + down_votes) ** balance
+
+
+def hot_order_expression(score: Expression) -> Expression:
+    return Cast(Sign(score), FloatField()) * Log(Value(10.0), Cast(Greatest(Abs(score), Value(1)), FloatField()))
+
+
+def controversial_rank_expression(up_votes: Expression, down_votes: Expression) -> Expression:
+    balance = Cast(Least(up_votes, down_votes), FloatField()) / Cast(Greatest(up_votes, down_votes), FloatField())
+    return Case(
+        When(
+            GreaterThan(up_votes, 0) & GreaterThan(down_votes, 0),
+            then=Power(Cast(up_votes + down_votes, FloatField()), balance),
+        ),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def vote_delta_updates(up_delta: int, down_delta: int) -> dict[str, Expression]:
+    """Build ``update()`` kwargs applying vote deltas to the tallies and every rank column in one statement."""
+    up_votes = F("up_votes") + up_delta
+    down_votes = F("down_votes") + down_delta
+    return {
+        "up_votes": up_votes,
+        "down_votes": down_votes,
+        "top_rank": up_votes - down_votes,
+        # the age part of the hot rank never changes, so swap only the vote part
+        "hot_rank": F("hot_rank")
+        - hot_order_expression(F("up_votes") - F("down_votes"))
+        + hot_order_expression(up_votes - down_votes),
+        "controversial_rank": controversial_rank_expression(up_votes, down_votes),
+        "score_changed_at": Now(),
+    }
+
+
+def rank_posts(queryset: QuerySet, sort: str | None, window: str | None = None, default: str = HOT) -> QuerySet:
+    sort = sort if sort in SORTS else default
+    if sort in WINDOWED_SORTS:
+        period = WINDOWS.get(window, WINDOWS[DEFAULT_WINDOW])
+        if period is not None:
+            queryset = queryset.filter(created_at__gte=timezone.now() - period)
+    return queryset.order_by(*SORT_ORDERING[sort])
@@ -0,0 +1,36 @@
+"""Opt-in JSON renderer backed by orjson, enabled with ``API_FAST_JSON_RENDERER``.
+
+orjson is the optional ``fast-json`` extra, installed with ``poetry install --extras fast-json``.
+"""
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional, the renderer falls back to JSONRenderer
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` that encodes with orjson, several times faster on large pages.
+
+    The bytes match ``JSONRenderer`` for serializer output, with one exception. Floats in exponent form are
+    spelled the shorter way, for example ``1e16`` instead of ``1e+16``. ``JSONRenderer`` still renders indented
+    responses, data orjson rejects (such as a ``Decimal`` or a datetime) and installs without orjson.
+    """
+
+    def render(
+        self: "FastJSONRenderer",
+        data: object,
+        accepted_media_type: str | None = None,
+        renderer_context: dict | None = None,
+    ) -> bytes:
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            # datetimes are left to JSONRenderer, orjson spells them differently
+            ret = orjson.dumps(data, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # same escaping as JSONRenderer, the output stays a strict javascript subset
+        return ret.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
@@ -0,0 +1,211 @@
+"""Full text search over post and comment titles and content, ranked with BM25.
+
+Two backends keep their index up to date from the ``Post`` save and delete signals (see ``core.signals``):
+
+- ``fts5``: the ``core_post_fts`` SQLite FTS5 table created by migration 0045, ranked with its ``bm25()``.
+- ``inverted_index``: ``SearchDocument`` and ``SearchTerm`` rows for any database, ranked in Python.
+
+``Post.objects.bulk_create`` indexes the posts it inserts, fixtures loaded with ``loaddata`` are not indexed.
+``SEARCH_BACKEND = "auto"`` picks FTS5 when the table exists. After switching backends or loading fixtures run
+``manage.py rebuild_search_index``. Queries match posts containing every term, titles weigh double.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from functools import cache
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.db.models import Count, Q, QuerySet, Sum
+from django.db.models.expressions import RawSQL
+
+from core.models import Community, CommunityMember, Post, SearchDocument, SearchTerm
+from users.models import User
+
+FTS_TABLE = "core_post_fts"
+TITLE_WEIGHT = 2
+# the BM25 parameters FTS5 uses
+K1 = 1.2
+B = 0.75
+TERM_RE = re.compile(r"\w+")
+MAX_TERM_LENGTH = SearchTerm._meta.get_field("term").max_length  # noqa: SLF001
+
+
+def terms_of(text: str) -> list[str]:
+    return TERM_RE.findall(text.lower())
+
+
+def weighted_terms(post: Post) -> Counter:
+    terms = Counter(terms_of(post.content))
+    for term in terms_of(post.title):
+        terms[term] += TITLE_WEIGHT
+    # longer tokens do not fit SearchTerm.term, a query for one of them matches nothing either way
+    return Counter({term: frequency for term, frequency in terms.items() if len(term) <= MAX_TERM_LENGTH})
+
+
+class Fts5Backend:
+    name = "fts5"
+
+    def index(self: "Fts5Backend", post: Post) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {FTS_TABLE}(rowid, title, content) VALUES (%s, %s, %s)",  # noqa: S608
+                [post.pk, post.title, post.content],
+            )
+
+    def remove(self: "Fts5Backend", post_id: int) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id])  # noqa: S608
+
+    def clear(self: "Fts5Backend") -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")  # noqa: S608
+
+    @staticmethod
+    def match_expression(terms: list[str]) -> str:
+        # quoted terms are matched literally, so FTS5 query syntax in the input has no effect
+        return " ".join(f'"{term}"' for term in terms)
+
+    def filter(self: "Fts5Backend", queryset: QuerySet[Post], terms: list[str]) -> QuerySet[Post]:
+        sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"  # noqa: S608
+        matches = RawSQL(sql, [self.match_expression(terms)])  # noqa: S611
+        return queryset.filter(pk__in=matches)
+
+    def rank(
+        self: "Fts5Backend", terms: list[str], visible: QuerySet[Post], offset: int, limit: int
+    ) -> list[tuple[int, float]]:
+        visible_sql, visible_params = visible.values("pk").query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, -bm25({FTS_TABLE}, {TITLE_WEIGHT}, 1) AS score FROM {FTS_TABLE} "  # noqa: S608
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid IN ({visible_sql}) "
+                "ORDER BY score DESC, rowid DESC LIMIT %s OFFSET %s",
+                [self.match_expression(terms), *visible_params, limit, offset],
+            )
+            return cursor.fetchall()
+
+    def count(self: "Fts5Backend", terms: list[str], visible: QuerySet[Post]) -> int:
+        return self.filter(visible, terms).count()
+
+
+class InvertedIndexBackend:
+    name = "inverted_index"
+
+    def index(self: "InvertedIndexBackend", post: Post) -> None:
+        terms = weighted_terms(post)
+        SearchDocument.objects.filter(pk=post.pk).delete()
+        document = SearchDocument.objects.create(post_id=post.pk, length=terms.total())
+        SearchTerm.objects.bulk_create(
+            [SearchTerm(document=document, term=term, frequency=frequency) for term, frequency in terms.items()]
+        )
+
+    def remove(self: "InvertedIndexBackend", post_id: int) -> None:
+        SearchDocument.objects.filter(pk=post_id).delete()
+
+    def clear(self: "InvertedIndexBackend") -> None:
+        SearchTerm.objects.all().delete()
+        SearchDocument.objects.all().delete()
+
+    def matching_documents(self: "InvertedIndexBackend", terms: list[str]) -> QuerySet[SearchTerm]:
+        return (
+            SearchTerm.objects.filter(term__in=terms)
+            .values("document_id")
+            .annotate(matched=Count("id"))
+            .filter(matched=len(terms))
+            .values("document_id")
+        )
+
+    def filter(self: "InvertedIndexBackend", queryset: QuerySet[Post], terms: list[str]) -> QuerySet[Post]:
+        return queryset.filter(pk__in=self.matching_documents(terms))
+
+    def rank(
+        self: "InvertedIndexBackend", terms: list[str], visible: QuerySet[Post], offset: int, limit: int
+    ) -> list[tuple[int, float]]:
+        documents = SearchDocument.objects.aggregate(count=Count("pk"), total_length=Sum("length"))
+        average_length = (documents["total_length"] or 0) / (documents["count"] or 1)
+        document_frequencies = dict(
+            SearchTerm.objects.filter(term__in=terms).values("term").annotate(n=Count("id")).values_list("term", "n")
+        )
+        postings = SearchTerm.objects.filter(
+            term__in=terms, document__in=self.matching_documents(terms), document__post__in=visible
+        ).values_list("document_id", "frequency", "term", "document__length")
+        scores = defaultdict(float)
+        for post_id, frequency, term, length in postings:
+            n = document_frequencies[term]
+            idf = math.log((documents["count"] - n + 0.5) / (n + 0.5) + 1)
+            scores[post_id] += idf * frequency * (K1 + 1) / (frequency + K1 * (1 - B + B * length / average_length))
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return ranked[offset : offset + limit]
+
+    def count(self: "InvertedIndexBackend", terms: list[str], visible: QuerySet[Post]) -> int:
+        return self.filter(visible, terms).count()
+
+
+@cache
+def fts5_available() -> bool:
+    return connection.vendor == "sqlite" and FTS_TABLE in connection.introspection.table_names()
+
+
+def get_backend() -> Fts5Backend | InvertedIndexBackend:
+    name = settings.SEARCH_BACKEND
+    if name == "auto":
+        name = Fts5Backend.name if fts5_available() else InvertedIndexBackend.name
+    return Fts5Backend() if name == Fts5Backend.name else InvertedIndexBackend()
+
+
+def visible_posts(user: User | AnonymousUser, community: Community | None = None) -> QuerySet[Post]:
+    """Active posts the user may read: everything outside private communities and inside the ones they joined."""
+    posts = Post.objects.filter(community__is_active=True)
+    if community is not None:
+        posts = posts.filter(community=community)
+    public = ~Q(community__privacy=Community.PRIVATE)
+    if not user.is_authenticated:
+        return posts.filter(public)
+    joined = CommunityMember.objects.filter(user=user).values("community_id")
+    return posts.filter(public | Q(community_id__in=joined))
+
+
+class SearchResults:
+    """Lazily ranked search results, sliceable and countable like a queryset so they can be paginated."""
+
+    def __init__(self: "SearchResults", query: str, visible: QuerySet[Post]) -> None:
+        self.terms = list(dict.fromkeys(terms_of(query)))
+        self.visible = visible
+        self.backend = get_backend()
+
+    def count(self: "SearchResults") -> int:
+        if not self.terms:
+            return 0
+        return self.backend.count(self.terms, self.visible)
+
+    def __len__(self: "SearchResults") -> int:
+        return self.count()
+
+    def __getitem__(self: "SearchResults", index: slice) -> list[Post]:
+        start, stop = index.start or 0, index.stop
+        if not self.terms or stop is None or stop <= start:
+            return []
+        ranked = self.backend.rank(self.terms, self.visible, start, stop - start)
+        posts = Post.objects.in_bulk([post_id for post_id, _ in ranked])
+        results = []
+        for post_id, score in ranked:
+            # deactivated or deleted since it was ranked
+            if (post := posts.get(post_id)) is None:
+                continue
+            post.search_score = score
+            results.append(post)
+        return results
+
+
+def search(query: str, user: User | AnonymousUser, community: Community | None = None) -> SearchResults:
+    return SearchResults(query, visible_posts(user, community))
+
+
+def index_post(post: Post) -> None:
+    get_backend().index(post)
+
+
+def remove_post(post_id: int) -> None:
+    get_backend().remove(post_id)
@@ -1,10 +1,16 @@
-from collections.abc import Sequence
+from collections.abc import Callable, Iterable, Sequence
+from datetime import datetime, tzinfo
+from functools import cached_property
 from typing import ClassVar
 
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from django.db.models import Model
-from rest_framework import serializers
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 
-from core.models import Community, Post
+from core.models import Community, CommunityMember, Post
 from users.models import User
 
 
@@ -41,7 +47,7 @@ class CommunitySerializer(serializers.ModelSerializer):
             "id",
             "name",
             "slug",
-            "members",
+            "member_count",
             "count_online_users",
             "author",
             "is_active",
@@ -62,6 +68,7 @@ class MinimalCommunitySerializer(CommunitySerializer):
 
 
 class MinimalUserSerializer(serializers.ModelSerializer):
+    avatar = serializers.ReadOnlyField(source="profile.avatar_url")
     is_online = serializers.ReadOnlyField()
     last_activity_ago = serializers.ReadOnlyField()
 
@@ -70,9 +77,139 @@ class MinimalUserSerializer(serializers.ModelSerializer):
         fields: ClassVar[Sequence[str] | str] = ("nickname", "avatar", "is_online", "last_activity_ago")
 
 
-class CommunityMembersSerializer(CommunitySerializer):
-    members = MinimalUserSerializer(read_only=True, many=True)
+class CommunityMemberSerializer(serializers.ModelSerializer):
+    user = MinimalUserSerializer(read_only=True)
+
+    class Meta:
+        model: Model = CommunityMember
+        fields: ClassVar[Sequence[str] | str] = ("user", "role", "joined_at")
 
 
 class CommunityPostsSerializer(CommunitySerializer):
     posts = PostSerializer(many=True, read_only=True)
+
+
+class SearchResultSerializer(PostSerializer):
+    search_score = serializers.FloatField(read_only=True)
+
+    class Meta(PostSerializer.Meta):
+        fields: ClassVar[Sequence[str] | str] = (*PostSerializer.Meta.fields, "search_score")
+
+
+class CommentTreeSerializer(PostSerializer):
+    replies = serializers.SerializerMethodField()
+    has_more_replies = serializers.ReadOnlyField()
+    replies_cursor = serializers.ReadOnlyField()
+
+    class Meta(PostSerializer.Meta):
+        fields: ClassVar[Sequence[str] | str] = (
+            *PostSerializer.Meta.fields,
+            "replies",
+            "has_more_replies",
+            "replies_cursor",
+        )
+
+    def get_replies(self: "CommentTreeSerializer", obj: Post) -> list[dict]:
+        return CommentTreeSerializer(obj.replies, many=True, context=self.context).data
+
+
+class TrendingTagSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    posts = serializers.IntegerField()
+    expected = serializers.FloatField()
+    score = serializers.FloatField()
+
+
+# fields whose to_representation returns the column value as is
+PLAIN_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.ReadOnlyField,
+)
+# stands in for the converter of an ISO 8601 DateTimeField until the current timezone is known
+ISO_DATETIME = object()
+
+
+def is_iso_datetime(field: serializers.Field) -> bool:
+    """Tell whether a DateTimeField writes ISO 8601 in the current timezone, the DRF default."""
+    return (
+        isinstance(field, serializers.DateTimeField)
+        and settings.USE_TZ
+        and not hasattr(field, "timezone")
+        and (getattr(field, "format", api_settings.DATETIME_FORMAT) or "").lower() == ISO_8601
+    )
+
+
+def iso_datetime(tz: tzinfo) -> Callable[[datetime], str]:
+    def convert(value: datetime) -> str:
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return convert
+
+
+class ValuesSerializer:
+    """Serialize ``values()`` rows into exactly what ``serializer_class`` makes of the model instances.
+
+    The fields are compiled once into the column each one reads and a converter, none where DRF returns the value
+    as is, so nothing is bound, looked up or checked per row. Fields without a column go in ``computed``.
+    """
+
+    serializer_class: type[serializers.ModelSerializer]
+    computed: ClassVar[dict[str, Callable[[dict], object]]] = {}
+
+    @cached_property
+    def fields(self: "ValuesSerializer") -> list[tuple[str, str | None, Callable | None]]:
+        model = self.serializer_class.Meta.model
+        columns = {field.name for field in model._meta.concrete_fields}  # noqa: SLF001
+        compiled = []
+        for name, field in self.serializer_class().fields.items():
+            if name in self.computed:
+                compiled.append((name, None, self.computed[name]))
+            elif field.source not in columns:
+                msg = f"{self.serializer_class.__name__}.{name} has no column, add it to computed."
+                raise ImproperlyConfigured(msg)
+            elif is_iso_datetime(field):
+                compiled.append((name, field.source, ISO_DATETIME))
+            elif isinstance(field, PLAIN_FIELDS) or (
+                isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None
+            ):
+                compiled.append((name, field.source, None))
+            else:
+                compiled.append((name, field.source, field.to_representation))
+        return compiled
+
+    @cached_property
+    def columns(self: "ValuesSerializer") -> list[str]:
+        return [source for _, source, _ in self.fields if source is not None]
+
+    def to_representation(self: "ValuesSerializer", row: dict, fields: list | None = None) -> dict:
+        data = {}
+        for name, source, convert in fields or self.bind_fields():
+            if source is None:
+                data[name] = convert(row)
+            else:
+                value = row[source]
+                data[name] = value if convert is None or value is None else convert(value)
+        return data
+
+    def bind_fields(self: "ValuesSerializer") -> list[tuple[str, str | None, Callable | None]]:
+        # DRF looks the current timezone up for every datetime, here it is looked up once per call
+        to_iso = iso_datetime(timezone.get_current_timezone())
+        return [(name, source, to_iso if convert is ISO_DATETIME else convert) for name, source, convert in self.fields]
+
+    def serialize(self: "ValuesSerializer", rows: Iterable[dict]) -> list[dict]:
+        fields = self.bind_fields()
+        return [self.to_representation(row, fields) for row in rows]
+
+
+class PostValuesSerializer(ValuesSerializer):
+    serializer_class = PostSerializer
+    computed: ClassVar[dict[str, Callable[[dict], object]]] = {
+        "score": lambda row: row["up_votes"] - row["down_votes"],
+    }
+
+
+class MinimalCommunityValuesSerializer(ValuesSerializer):
+    serializer_class = MinimalCommunitySerializer
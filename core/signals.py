@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.db.models import F, QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import community_cache, home_feed, presence, search
+from .models import Community, CommunityMember, PendingKarmaAuthor, Post, PostVote
+
+
+@receiver(post_delete, sender=Post)
+def update_ancestors_on_delete(sender: type, instance: Post, origin: Post | QuerySet, **kwargs: dict) -> None:  # noqa: ARG001
+    # A comment deleted together with its parent is already counted in the delta of the parent, while its
+    # path still names the surviving ancestors, so only the top-most deleted comments update them.
+    if not instance.is_active or instance.parent_id is None:
+        return
+    if isinstance(origin, Post) and origin.pk != instance.pk:
+        return
+    # post_delete runs once every collected row is gone, a missing parent was deleted by the same call
+    if origin is not instance and not Post.all_objects.filter(pk=instance.parent_id).exists():
+        return
+    instance.update_ancestors_descendant_count(-(1 + instance.descendant_count))
+
+
+@receiver(post_delete, sender=Post)
+def record_pending_karma_on_delete(sender: type, instance: Post, **kwargs: dict) -> None:  # noqa: ARG001
+    # only active posts with a score count towards karma
+    if instance.author_id is not None and instance.is_active and instance.up_votes != instance.down_votes:
+        PendingKarmaAuthor.objects.create(user_id=instance.author_id)
+
+
+@receiver(post_delete, sender=PostVote)
+def update_post_tally_on_delete(sender: type, instance: PostVote, origin: object, **kwargs: dict) -> None:  # noqa: ARG001
+    # votes removed together with their post have no tally left to update
+    if isinstance(origin, Post) or (isinstance(origin, QuerySet) and origin.model is Post):
+        return
+    instance.update_post_tally(instance.choice, None)
+
+
+@receiver(post_save, sender=CommunityMember)
+def record_presence_on_join(sender: type, instance: CommunityMember, created: bool, **kwargs: dict) -> None:  # noqa: ARG001, FBT001
+    if created:
+        presence.record_membership(instance.user_id, instance.community_id, joined=True)
+
+
+@receiver(post_delete, sender=CommunityMember)
+def record_presence_on_leave(sender: type, instance: CommunityMember, **kwargs: dict) -> None:  # noqa: ARG001
+    presence.record_membership(instance.user_id, instance.community_id, joined=False)
+
+
+@receiver(m2m_changed, sender=Community.members.through)
+def record_presence_on_members_added(
+    sender: type,  # noqa: ARG001
+    instance: object,
+    action: str,
+    reverse: bool,  # noqa: FBT001
+    pk_set: set[int],
+    **kwargs: dict,  # noqa: ARG001
+) -> None:
+    # community.members.add() bulk creates the rows without post_save, remove() deletes them with post_delete
+    if action != "post_add":
+        return
+    for pk in pk_set:
+        user_id, community_id = (instance.pk, pk) if reverse else (pk, instance.pk)
+        presence.record_membership(user_id, community_id, joined=True)
+
+
+@receiver(pre_save, sender=Community)
+def invalidate_cached_community_previous_slug(sender: type, instance: Community, **kwargs: dict) -> None:  # noqa: ARG001
+    # the entry is keyed by slug, a changed slug would leave the old one reachable until it times out
+    if instance.pk is not None and settings.COMMUNITY_CACHE_ENABLED:
+        previous_slug = Community.all_objects.filter(pk=instance.pk).values_list("slug", flat=True).first()
+        if previous_slug is not None and previous_slug != instance.slug:
+            community_cache.communities.delete(previous_slug)
+
+
+@receiver(post_save, sender=Community)
+@receiver(post_delete, sender=Community)
+def invalidate_cached_community(sender: type, instance: Community, **kwargs: dict) -> None:  # noqa: ARG001
+    community_cache.communities.delete(instance.slug)
+
+
+@receiver(post_save, sender=CommunityMember)
+@receiver(post_delete, sender=CommunityMember)
+def invalidate_cached_role(sender: type, instance: CommunityMember, **kwargs: dict) -> None:  # noqa: ARG001
+    community_cache.roles.delete((instance.community_id, instance.user_id))
+
+
+@receiver(m2m_changed, sender=Community.members.through)
+def invalidate_cached_roles_on_members_changed(
+    sender: type,  # noqa: ARG001
+    instance: object,
+    action: str,
+    reverse: bool,  # noqa: FBT001
+    pk_set: set[int] | None,
+    **kwargs: dict,  # noqa: ARG001
+) -> None:
+    if action == "post_clear":
+        community_cache.roles.clear()
+    elif action in ("post_add", "post_remove"):
+        for pk in pk_set:
+            community_cache.roles.delete((pk, instance.pk) if reverse else (instance.pk, pk))
+
+
+@receiver(post_save, sender=Post)
+def index_post_on_save(sender: type, instance: Post, raw: bool, **kwargs: dict) -> None:  # noqa: ARG001, FBT001
+    # loaddata saves raw, related rows may not be loaded yet, fixtures are indexed by rebuild_search_index
+    if not raw:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_from_index_on_delete(sender: type, instance: Post, **kwargs: dict) -> None:  # noqa: ARG001
+    search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post_on_create(sender: type, instance: Post, created: bool, raw: bool, **kwargs: dict) -> None:  # noqa: ARG001, FBT001
+    # fixtures carry their own feed items, the memberships may not be loaded yet
+    if created and not raw:
+        home_feed.fan_out(instance)
+
+
+@receiver(post_save, sender=CommunityMember)
+def update_home_feed_on_join(sender: type, instance: CommunityMember, created: bool, **kwargs: dict) -> None:  # noqa: ARG001, FBT001
+    if created:
+        Community.all_objects.filter(pk=instance.community_id).update(member_count=F("member_count") + 1)
+        home_feed.join(instance.user_id, instance.community_id)
+
+
+@receiver(post_delete, sender=CommunityMember)
+def update_home_feed_on_leave(sender: type, instance: CommunityMember, **kwargs: dict) -> None:  # noqa: ARG001
+    Community.all_objects.filter(pk=instance.community_id).update(member_count=F("member_count") - 1)
+    home_feed.leave(instance.user_id, instance.community_id)
+
+
+@receiver(m2m_changed, sender=Community.members.through)
+def update_home_feed_on_members_added(
+    sender: type,  # noqa: ARG001
+    instance: object,
+    action: str,
+    reverse: bool,  # noqa: FBT001
+    pk_set: set[int],
+    **kwargs: dict,  # noqa: ARG001
+) -> None:
+    if action != "post_add":
+        return
+    for pk in pk_set:
+        user_id, community_id = (instance.pk, pk) if reverse else (pk, instance.pk)
+        Community.all_objects.filter(pk=community_id).update(member_count=F("member_count") + 1)
+        home_feed.join(user_id, community_id)
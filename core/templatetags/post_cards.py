@@ -0,0 +1,76 @@
+"""Cached post headers and footers, the bulk of the template time of post lists.
+
+``{% post_card "core/post-header.html" post %}`` renders the template once per state of the post and reuses the HTML
+from the cache until something it shows changes: the cache key digests the post version, tallies, counters, awards,
+author with their karma and avatar, community and the "... ago" text, so a vote or award on one post misses the cache
+for that card only. Parts that depend on the request, such as the saved and voted state, the CSRF token and the ``next``
+path, are marked with ``{% per_user "template.html" %}`` and rendered on every request.
+
+Disabled unless ``POST_CARD_CACHE_ENABLED`` is set, then both tags render like ``{% include %}``.
+"""
+
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.context import Context
+from django.utils.safestring import SafeString
+from django.utils.timesince import timesince
+
+from core.models import Post
+
+register = template.Library()
+
+SLOT_RE = re.compile(r"<!--per-user (?P<template_name>[\w/.-]+) (?P<params>[^ ]*)-->")
+
+
+def card_key(template_name: str, post: Post) -> str:
+    author = post.author
+    profile = getattr(author, "profile", None)
+    state = (
+        template_name,
+        post.version,
+        post.up_votes,
+        post.down_votes,
+        post.gold,
+        post.display_counter,
+        post.descendant_count,
+        [(award["id"], award["choice"], award["giver_anonymous"]) for award in post.get_post_awards()],
+        author and (author.pk, author.nickname),
+        profile and (profile.post_karma, profile.comment_karma, profile.avatar.name),
+        str(post.community),
+        timesince(post.created_at),
+    )
+    return f"post-card:{post.pk}:{hashlib.sha256(repr(state).encode()).hexdigest()[:32]}"
+
+
+def render(context: Context, template_name: str, **values: object) -> SafeString:
+    with context.push(**values):
+        return context.template.engine.get_template(template_name).render(context)
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context: Context, template_name: str, post: Post) -> SafeString:
+    if not settings.POST_CARD_CACHE_ENABLED:
+        return render(context, template_name, post=post)
+    key = card_key(template_name, post)
+    html = cache.get(key)
+    if html is None:
+        html = render(context, template_name, post=post, per_user_slots=True)
+        cache.set(key, html, settings.POST_CARD_CACHE_TIMEOUT_SECONDS)
+
+    def fill(slot: re.Match) -> str:
+        values = dict(parse_qsl(slot["params"]))
+        return render(context, slot["template_name"], post=post, per_user_slots=False, **values)
+
+    return SafeString(SLOT_RE.sub(fill, html))
+
+
+@register.simple_tag(takes_context=True)
+def per_user(context: Context, template_name: str, **values: str) -> SafeString:
+    if context.get("per_user_slots"):
+        return SafeString(f"<!--per-user {template_name} {urlencode(values)}-->")
+    return render(context, template_name, **values)
@@ -0,0 +1,67 @@
+"""Deep page latency of the posts API, page numbers against keyset cursors.
+
+    pytest core/tests/benchmarks/bench_pagination.py -s
+
+BENCH_POSTS overrides the number of generated posts (200k by default).
+"""
+
+import os
+import random
+import time
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from core import ranking
+from core.models import Community, Post
+from core.pagination import KeysetPagination
+from core.tests.benchmarks.bench_ranking import synthetic_posts
+
+pytestmark = pytest.mark.django_db
+
+POSTS = int(os.environ.get("BENCH_POSTS", 200_000))
+BATCH_SIZE = 10_000
+PAGES = (1, 10, 100, 1000, 10_000)
+REPEATS = 5
+
+
+@pytest.fixture()
+def _large_feed(public_community: Community) -> None:
+    rng = random.Random(POSTS)  # noqa: S311
+    for start in range(0, POSTS, BATCH_SIZE):
+        Post.objects.bulk_create(synthetic_posts(public_community, min(BATCH_SIZE, POSTS - start), rng))
+
+
+def best_of(client: Client, url: str, params: dict) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        response = client.get(url, params)
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    return min(timings)
+
+
+def cursor_before_page(sort: str, page: int) -> str:
+    """Cursor a client would hold after walking ``page - 1`` pages."""
+    if page == 1:
+        return ""
+    paginator = KeysetPagination()
+    paginator.ordering = list(ranking.SORT_ORDERING[sort])
+    last_row = Post.objects.order_by(*paginator.ordering)[(page - 1) * paginator.page_size - 1]
+    return paginator.encode_cursor(last_row)
+
+
+@pytest.mark.usefixtures("_large_feed")
+def test_bench_deep_pages(client: Client) -> None:
+    url = reverse("api-posts-list-view")
+    print(f"\nposts API over {POSTS} posts, best of {REPEATS}:")  # noqa: T201
+    for sort in (ranking.NEW, ranking.HOT):
+        print(f"  {sort:<6} {'page':>6} {'?page=':>12} {'?cursor=':>12}")  # noqa: T201
+        for page in PAGES:
+            if (page - 1) * KeysetPagination.page_size >= POSTS:
+                break
+            offset = best_of(client, url, {"sort": sort, "page": page})
+            keyset = best_of(client, url, {"sort": sort, "cursor": cursor_before_page(sort, page)})
+            print(f"  {'':<6} {page:>6} {offset * 1000:9.2f} ms {keyset * 1000:9.2f} ms")  # noqa: T201
@@ -0,0 +1,61 @@
+"""Post list render time without the post card cache, with a cold cache and with a warm one.
+
+    pytest core/tests/benchmarks/bench_post_cards.py -s
+
+BENCH_POSTS overrides the number of posts on the page (25 by default, a full page).
+"""
+
+import os
+import time
+from collections.abc import Callable
+
+import pytest
+from django.conf import Settings
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from core.models import Community, Post
+from users.models import User
+
+pytestmark = pytest.mark.django_db
+
+POSTS = int(os.environ.get("BENCH_POSTS", 25))
+REPEATS = 20
+
+
+@pytest.fixture()
+def _page(user: User, public_community: Community) -> None:
+    Post.objects.bulk_create(
+        Post(author=user, community=public_community, title=f"Post {i}", content="Lorem ipsum " * 50)
+        for i in range(POSTS)
+    )
+
+
+def best_of(client: Client, url: str, before: Callable[[], None]) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        before()
+        start = time.perf_counter()
+        response = client.get(url, {"sort": "new"})
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    return min(timings)
+
+
+@pytest.mark.usefixtures("_page")
+def test_bench_post_list_render(client: Client, settings: Settings, user: User) -> None:
+    client.force_login(user)
+    url = reverse("post-list")
+
+    settings.POST_CARD_CACHE_ENABLED = False
+    uncached = best_of(client, url, lambda: None)
+    settings.POST_CARD_CACHE_ENABLED = True
+    cold = best_of(client, url, cache.clear)
+    warm = best_of(client, url, lambda: None)
+    cache.clear()
+
+    print(f"\npost-list with {POSTS} posts, best of {REPEATS}:")  # noqa: T201
+    print(f"  no card cache {uncached * 1000:9.2f} ms")  # noqa: T201
+    print(f"  cold cache    {cold * 1000:9.2f} ms")  # noqa: T201
+    print(f"  warm cache    {warm * 1000:9.2f} ms")  # noqa: T201
@@ -0,0 +1,85 @@
+"""First page latency of every feed sort on a large synthetic table.
+
+    pytest core/tests/benchmarks/bench_ranking.py -s
+
+BENCH_POSTS overrides the number of generated posts (1M by default).
+"""
+
+import os
+import random
+import time
+from datetime import timedelta
+
+import pytest
+from django.db.models import F
+from django.utils import timezone
+
+from core import ranking
+from core.models import Community, Post
+
+pytestmark = pytest.mark.django_db
+
+POSTS = int(os.environ.get("BENCH_POSTS", 1_000_000))
+BATCH_SIZE = 10_000
+PAGE_SIZE = 25
+REPEATS = 5
+AGE_DAYS = 30
+
+
+def synthetic_posts(community: Community, count: int, rng: random.Random) -> list[Post]:
+    now = timezone.now()
+    posts = []
+    for i in range(count):
+        age_days = rng.randrange(AGE_DAYS)
+        post = Post(
+            author_id=community.author_id,
+            community=community,
+            title=f"Synthetic post {i}",
+            content="",
+            up_votes=int(rng.paretovariate(1.2)) - 1,
+            down_votes=int(rng.paretovariate(1.5)) - 1,
+            # remembers the age bucket, auto_now_add overwrites created_at on insert
+            display_counter=age_days,
+            created_at=now - timedelta(days=age_days),
+        )
+        post.update_rank_fields()
+        posts.append(post)
+    return posts
+
+
+@pytest.fixture()
+def _large_feed(community: Community) -> None:
+    rng = random.Random(POSTS)  # noqa: S311
+    for start in range(0, POSTS, BATCH_SIZE):
+        Post.objects.bulk_create(synthetic_posts(community, min(BATCH_SIZE, POSTS - start), rng))
+    now = timezone.now()
+    for age_days in range(AGE_DAYS):
+        Post.objects.filter(display_counter=age_days).update(created_at=now - timedelta(days=age_days))
+
+
+def best_of(callable_: callable) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        callable_()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+@pytest.mark.usefixtures("_large_feed")
+def test_bench_feed_sorts() -> None:
+    queryset = Post.objects.filter(parent=None, is_active=True)
+    print(f"\nfirst page of {PAGE_SIZE} out of {POSTS} posts, best of {REPEATS}:")  # noqa: T201
+    for sort in ranking.SORTS:
+        windows = ("week", "all") if sort in ranking.WINDOWED_SORTS else (None,)
+        for window in windows:
+            seconds = best_of(
+                lambda sort=sort, window=window: list(ranking.rank_posts(queryset, sort, window)[:PAGE_SIZE])
+            )
+            label = f"{sort} ({window})" if window else sort
+            print(f"  {label:<22} {seconds * 1000:8.2f} ms")  # noqa: T201
+
+    def unindexed_top() -> None:
+        list(queryset.order_by((F("up_votes") - F("down_votes")).desc(), "-id")[:PAGE_SIZE])
+
+    print(f"  {'top (no rank column)':<22} {best_of(unindexed_top) * 1000:8.2f} ms")  # noqa: T201
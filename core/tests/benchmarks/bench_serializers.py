@@ -0,0 +1,65 @@
+"""Post list serialization, ``PostSerializer`` against ``values()`` rows and the orjson renderer.
+
+    pytest core/tests/benchmarks/bench_serializers.py -s
+
+BENCH_POSTS overrides the number of serialized posts (10k by default).
+"""
+
+import os
+import random
+import time
+from collections.abc import Callable
+
+import pytest
+from rest_framework.renderers import JSONRenderer
+
+from core import renderers
+from core.models import Community, Post
+from core.renderers import FastJSONRenderer
+from core.serializers import PostSerializer, PostValuesSerializer
+from core.tests.benchmarks.bench_ranking import synthetic_posts
+
+pytestmark = pytest.mark.django_db
+
+POSTS = int(os.environ.get("BENCH_POSTS", 10_000))
+REPEATS = 5
+
+
+@pytest.fixture()
+def _posts(public_community: Community) -> None:
+    rng = random.Random(POSTS)  # noqa: S311
+    posts = synthetic_posts(public_community, POSTS, rng)
+    for post in posts:
+        post.content = "Lorem ipsum dolor sit amet " * 20
+    Post.objects.bulk_create(posts, batch_size=1000)
+
+
+def best_of(render: Callable[[], bytes]) -> tuple[float, bytes]:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        output = render()
+        timings.append(time.perf_counter() - start)
+    return min(timings), output
+
+
+@pytest.mark.usefixtures("_posts")
+def test_bench_serializers() -> None:
+    posts = Post.objects.order_by("-created_at", "-id")
+    values_serializer = PostValuesSerializer()
+
+    def values_rows() -> list[dict]:
+        return values_serializer.serialize(posts.values(*values_serializer.columns))
+
+    model, expected = best_of(lambda: JSONRenderer().render(PostSerializer(posts, many=True).data))
+    values, output = best_of(lambda: JSONRenderer().render(values_rows()))
+    assert output == expected
+    fast, output = best_of(lambda: FastJSONRenderer().render(values_rows()))
+    assert output == expected
+
+    # without orjson installed FastJSONRenderer falls back to JSONRenderer
+    fast_label = "PostValuesSerializer + " + ("orjson" if renderers.orjson else "JSONRenderer (no orjson)")
+    print(f"\n{POSTS} posts fetched, serialized and rendered, best of {REPEATS}:")  # noqa: T201
+    print(f"  {'PostSerializer + JSONRenderer':48} {model * 1000:9.1f} ms")  # noqa: T201
+    print(f"  {'PostValuesSerializer + JSONRenderer':48} {values * 1000:9.1f} ms")  # noqa: T201
+    print(f"  {fast_label:48} {fast * 1000:9.1f} ms")  # noqa: T201
@@ -0,0 +1,65 @@
+"""Synchronous vs buffered vote ingestion.
+
+Benchmarks are not collected by the regular test run, pass the file explicitly:
+    pytest core/tests/benchmarks/bench_votes.py -s
+"""
+
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from core.models import BufferedVote, Community, Post, PostVote
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+HOT_POSTS = 5
+VOTERS = 400
+
+
+@pytest.fixture()
+def voters() -> list[User]:
+    return User.objects.bulk_create(User(email=f"voter_{i}@example.com", nickname=f"voter_{i}") for i in range(VOTERS))
+
+
+@pytest.fixture()
+def hot_posts(community: Community) -> list[Post]:
+    return [
+        Post.objects.create(author=community.author, community=community, title=f"Hot {i}", content="hot")
+        for i in range(HOT_POSTS)
+    ]
+
+
+def cast_votes(voters: list[User], hot_posts: list[Post]) -> list[tuple[Post, User, str]]:
+    choices = (PostVote.UPVOTE, PostVote.UPVOTE, PostVote.DOWNVOTE)
+    return [(post, user, choices[i % len(choices)]) for post in hot_posts for i, user in enumerate(voters)]
+
+
+def test_bench_vote_ingestion(voters: list[User], hot_posts: list[Post]) -> None:
+    votes = cast_votes(voters, hot_posts)
+
+    start = time.perf_counter()
+    for post, user, choice in votes:
+        post.vote(user, choice)
+    sync_seconds = time.perf_counter() - start
+    sync_tallies = list(Post.objects.order_by("id").values_list("up_votes", "down_votes"))
+
+    PostVote.objects.all().delete()
+    Post.objects.update(up_votes=0, down_votes=0)
+
+    start = time.perf_counter()
+    for post, user, choice in votes:
+        BufferedVote.objects.create(post=post, user=user, choice=choice)
+    ingest_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    call_command("flush_votes")
+    flush_seconds = time.perf_counter() - start
+
+    assert list(Post.objects.order_by("id").values_list("up_votes", "down_votes")) == sync_tallies
+    print(  # noqa: T201
+        f"\n{len(votes)} votes on {HOT_POSTS} posts: synchronous {sync_seconds:.3f}s, "
+        f"buffered ingest {ingest_seconds:.3f}s + flush {flush_seconds:.3f}s"
+    )
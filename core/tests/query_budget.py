@@ -0,0 +1,73 @@
+"""Pytest plugin failing tests whose requests exceed a declared SQL query budget.
+
+    @pytest.mark.query_budget("post-detail", 12, max_repeats=3)
+    def test_post_detail(client: Client, post: Post) -> None: ...
+
+Requests made by a marked test are recorded by ``QueryInspectorMiddleware``. The test fails when a request
+to a budgeted URL name runs more queries than the budget, when ``max_repeats`` is given and one query shape
+runs more often than that (N+1), or when the URL name was never requested.
+"""
+
+from collections.abc import Generator
+
+import pytest
+from django.conf import Settings
+
+from core.middleware.query_inspector import QueryReport, query_report_ready
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line(
+        "markers", "query_budget(url_name, max_queries, max_repeats=None): fail on requests exceeding the budget"
+    )
+
+
+@pytest.fixture()
+def query_reports(settings: Settings) -> Generator[list[QueryReport], None, None]:
+    """Collect the query reports of every request made during the test."""
+    settings.QUERY_INSPECTOR_ENABLED = True
+    reports = []
+
+    def collect(report: QueryReport, **_kwargs: dict) -> None:
+        reports.append(report)
+
+    query_report_ready.connect(collect, weak=False)
+    yield reports
+    query_report_ready.disconnect(collect)
+
+
+@pytest.fixture(autouse=True)
+def _query_budget(request: pytest.FixtureRequest) -> None:
+    if request.node.get_closest_marker("query_budget") is not None:
+        request.node.query_reports = request.getfixturevalue("query_reports")
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item: pytest.Item) -> Generator[None, None, None]:
+    result = yield
+    budgets = {marker.args[0]: marker for marker in item.iter_markers("query_budget")}
+    if budgets:
+        violations = budget_violations(item.query_reports, budgets)
+        if violations:
+            pytest.fail("\n".join(violations), pytrace=False)
+    return result
+
+
+def budget_violations(reports: list[QueryReport], budgets: dict[str, pytest.Mark]) -> list[str]:
+    violations = [f"No request to {url_name} was made" for url_name in budgets.keys() - {r.url_name for r in reports}]
+    for report in reports:
+        marker = budgets.get(report.url_name)
+        if marker is None:
+            continue
+        max_queries, max_repeats = marker.args[1], marker.kwargs.get("max_repeats")
+        if len(report.queries) > max_queries:
+            violations.append(
+                f"{report.url_name} ({report.path}) ran {len(report.queries)} queries, the budget is {max_queries}"
+            )
+            violations.extend(f"    {query.origin}: {query.sql}" for query in report.queries)
+        if max_repeats is not None:
+            violations.extend(
+                f"{report.url_name} ({report.path}) repeated a query {repeated}"
+                for repeated in report.repeated(max_repeats)
+            )
+    return violations
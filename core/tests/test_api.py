@@ -1,15 +1,36 @@
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
 import pytest
+from django.conf import settings
+from django.db import connection
 from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from freezegun import freeze_time
+from pytest_django import DjangoAssertNumQueries
+from rest_framework.renderers import JSONRenderer
 
 from conftest import CommunityWithMembersFixture, CreateCommunitiesFixture, create_posts
-from core.models import Community, Post
+from core import ranking
+from core.models import Community, CommunityMember, Post, PostVote
+from core.renderers import FastJSONRenderer
+from core.serializers import (
+    MinimalCommunitySerializer,
+    MinimalCommunityValuesSerializer,
+    PostSerializer,
+    PostValuesSerializer,
+)
+from users.models import User
 
 pytestmark = pytest.mark.django_db
 
 
 PAGE_SIZE = 10
 PREFIX = "http://testserver"
+NOW = datetime(2026, 1, 15, 12, 0, tzinfo=UTC)
 
 
 def get_abs_url(url: str, page: int) -> str:
@@ -169,12 +190,12 @@ def test_api_community_get_one_public(
     response = client.get(reverse("api-community-detail", kwargs={"slug": community.slug}))
     assert response.status_code == 200
     assert response.data["id"] == community.id
-    assert len(response.data["members"]) == 5
+    assert response.data["member_count"] == 5
     assert set(response.data.keys()) == {
         "id",
         "name",
         "slug",
-        "members",
+        "member_count",
         "count_online_users",
         "author",
         "is_active",
@@ -193,12 +214,12 @@ def test_api_community_get_one_restricted(
     response = client.get(reverse("api-community-detail", kwargs={"slug": community.slug}))
     assert response.status_code == 200
     assert response.data["id"] == community.id
-    assert len(response.data["members"]) == 5
+    assert response.data["member_count"] == 5
     assert set(response.data.keys()) == {
         "id",
         "name",
         "slug",
-        "members",
+        "member_count",
         "count_online_users",
         "author",
         "is_active",
@@ -244,3 +265,222 @@ def test_api_community_posts_private(client: Client, private_community: Communit
     create_posts(private_community, 10)
     response = client.get(reverse("api-communities-posts-list", kwargs={"slug": private_community.slug}))
     assert response.status_code == 403
+
+
+def walk_cursor_pages(url: str, client: Client, params: dict | None = None) -> list[list[int]]:
+    pages = []
+    response = client.get(url, {**(params or {}), "cursor": ""})
+    while True:
+        assert response.status_code == 200
+        assert "count" not in response.data
+        pages.append([post["id"] for post in response.data["results"]])
+        if response.data["next"] is None:
+            return pages
+        response = client.get(response.data["next"])
+
+
+@pytest.mark.parametrize("sort", ["new", "hot", "top", "controversial"])
+def test_api_posts_cursor_pages(client: Client, public_community: Community, sort: str) -> None:
+    posts = create_posts(public_community, count=2 * PAGE_SIZE + 1)
+    Post.objects.filter(pk__in=[post.pk for post in posts[::3]]).update(top_rank=5, hot_rank=1e6)
+    expected = list(
+        Post.objects.order_by(*ranking.SORT_ORDERING[sort]).values_list("id", flat=True),
+    )
+
+    pages = walk_cursor_pages(reverse("api-posts-list-view"), client, {"sort": sort, "t": "all"})
+
+    assert [len(page) for page in pages] == [PAGE_SIZE, PAGE_SIZE, 1]
+    assert [post_id for page in pages for post_id in page] == expected
+
+
+def test_api_community_posts_cursor_pages(client: Client, create_communities: CreateCommunitiesFixture) -> None:
+    community = create_communities(count=2, posts_per_community=PAGE_SIZE + 1)[0]
+    url = reverse("api-communities-posts-list", kwargs={"slug": community.slug})
+
+    pages = walk_cursor_pages(url, client)
+
+    expected = list(
+        Post.objects.filter(community=community).order_by("-created_at", "-id").values_list("id", flat=True)
+    )
+    assert [post_id for page in pages for post_id in page] == expected
+
+
+def test_api_posts_cursor_does_not_count(client: Client, public_community: Community) -> None:
+    create_posts(public_community, count=PAGE_SIZE + 1)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse("api-posts-list-view"), {"cursor": ""})
+        client.get(response.data["next"])
+    assert not [query for query in queries if "COUNT(" in query["sql"]]
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30=", "eyJvIjpbIi10b3BfcmFuayIsIi1pZCJdLCJwIjpbMCwxXX0="])
+def test_api_posts_invalid_cursor(client: Client, public_community: Community, cursor: str) -> None:
+    create_posts(public_community, count=1)
+    response = client.get(reverse("api-posts-list-view"), {"cursor": cursor})
+    assert response.status_code == 404
+
+
+def revalidate(client: Client, url: str, params: dict | None = None) -> int:
+    response = client.get(url, params)
+    assert response.status_code == 200
+    return client.get(url, params, headers={"if-none-match": response["ETag"]}).status_code
+
+
+def test_api_posts_not_modified(client: Client, public_community: Community, another_user: User) -> None:
+    post = create_posts(public_community, count=PAGE_SIZE + 1)[-1]
+    url = reverse("api-posts-list-view")
+    response = client.get(url)
+
+    not_modified = client.get(url, headers={"if-none-match": response["ETag"]})
+
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified["ETag"] == response["ETag"]
+    assert client.get(url, {"page": 2}, headers={"if-none-match": response["ETag"]}).status_code == 200
+    assert revalidate(client, url, {"cursor": ""}) == 304
+
+    post.vote(user=another_user, choice=PostVote.UPVOTE)
+    assert client.get(url, headers={"if-none-match": response["ETag"]}).status_code == 200
+    response = client.get(url)
+    post.update_display_counter()
+    assert client.get(url, headers={"if-none-match": response["ETag"]}).status_code == 200
+
+
+def test_api_private_community_modified_since(client: Client, user: User) -> None:
+    with freeze_time(NOW):
+        community = Community.objects.create(name="Hidden", privacy=Community.PRIVATE, author=user)
+    url = reverse("api-community-detail", kwargs={"slug": community.slug})
+    response = client.get(url)
+    assert response["Last-Modified"] == "Thu, 15 Jan 2026 12:00:00 GMT"
+
+    assert client.get(url, headers={"if-modified-since": response["Last-Modified"]}).status_code == 304
+
+    with freeze_time(NOW + timedelta(minutes=1)):
+        community.is_18_plus = True
+        community.save()
+    assert client.get(url, headers={"if-modified-since": response["Last-Modified"]}).status_code == 200
+
+
+def test_api_counters_have_no_last_modified(client: Client, public_community: Community, another_user: User) -> None:
+    with freeze_time(NOW):
+        post = create_posts(public_community, count=1)[0]
+    urls = [
+        reverse("api-communities-posts-list", kwargs={"slug": public_community.slug}),
+        reverse("api-posts-list-view"),
+        reverse("api-communities-list"),
+        reverse("api-community-detail", kwargs={"slug": public_community.slug}),
+    ]
+    for url in urls:
+        assert "Last-Modified" not in client.get(url)
+
+    # a view leaves score_changed_at as it was, an If-Modified-Since request still gets the new count
+    since = http_date(NOW.timestamp())
+    post.update_display_counter()
+    assert client.get(urls[0], headers={"if-modified-since": since}).status_code == 200
+    CommunityMember.objects.create(community=public_community, user=another_user)
+    assert client.get(urls[3], headers={"if-modified-since": since}).status_code == 200
+
+
+def test_api_communities_not_modified(client: Client, public_community: Community) -> None:
+    url = reverse("api-communities-list")
+    assert revalidate(client, url) == 304
+
+    response = client.get(url)
+    Community.objects.create(name="Another Community", author=public_community.author)
+    assert client.get(url, headers={"if-none-match": response["ETag"]}).status_code == 200
+
+
+def test_api_community_detail_not_modified(client: Client, public_community: Community, another_user: User) -> None:
+    url = reverse("api-community-detail", kwargs={"slug": public_community.slug})
+    assert revalidate(client, url) == 304
+
+    response = client.get(url)
+    CommunityMember.objects.create(community=public_community, user=another_user)
+    assert client.get(url, headers={"if-none-match": response["ETag"]}).status_code == 200
+
+
+def test_api_errors_have_no_validators(client: Client, private_community: Community) -> None:
+    response = client.get(reverse("api-communities-posts-list", kwargs={"slug": private_community.slug}))
+
+    assert response.status_code == 403
+    assert "ETag" not in response
+
+
+def test_values_serializer_matches_model_serializer(public_community: Community, another_user: User) -> None:
+    post = create_posts(public_community, count=1)[0]
+    post.vote(user=another_user, choice=PostVote.DOWNVOTE)
+    Post.objects.create(
+        author=another_user, community=public_community, parent=post, content="Zażółć \u2028 gęślą jaźń"
+    )
+    posts = Post.all_objects.order_by("id")
+    serializer = PostValuesSerializer()
+
+    expected = JSONRenderer().render(PostSerializer(posts, many=True).data)
+
+    assert JSONRenderer().render(serializer.serialize(posts.values(*serializer.columns))) == expected
+    assert FastJSONRenderer().render(serializer.serialize(posts.values(*serializer.columns))) == expected
+    communities = Community.objects.order_by("id")
+    serializer = MinimalCommunityValuesSerializer()
+    assert serializer.serialize(communities.values(*serializer.columns)) == (
+        MinimalCommunitySerializer(communities, many=True).data
+    )
+
+
+def test_fast_renderer_falls_back_to_json_renderer() -> None:
+    data = {"when": NOW, "price": Decimal("1.50")}
+
+    assert (
+        FastJSONRenderer().render(data) == JSONRenderer().render(data) == b'{"when":"2026-01-15T12:00:00Z","price":1.5}'
+    )
+    assert FastJSONRenderer().render([1], "application/json; indent=2") == b"[\n  1\n]"
+    assert FastJSONRenderer().render(None) == b""
+
+
+def test_api_community_detail_counts_in_one_query(
+    client: Client,
+    public_community_with_members: CommunityWithMembersFixture,
+    django_assert_num_queries: DjangoAssertNumQueries,
+) -> None:
+    community = public_community_with_members(5)
+    User.objects.update(last_activity=timezone.now() - timedelta(days=1))
+    User.objects.filter(nickname__in=["User_1", "User_2"]).update(last_activity=timezone.now())
+
+    with django_assert_num_queries(1):
+        response = client.get(reverse("api-community-detail", kwargs={"slug": community.slug}))
+
+    assert (response.data["member_count"], response.data["count_online_users"]) == (5, 2)
+
+
+def test_api_community_detail_online_count_follows_the_clock(
+    client: Client, public_community: Community, another_user: User
+) -> None:
+    CommunityMember.objects.create(community=public_community, user=another_user)
+    User.objects.update(last_activity=NOW - timedelta(days=1))
+    User.objects.filter(pk=another_user.pk).update(last_activity=NOW)
+    url = reverse("api-community-detail", kwargs={"slug": public_community.slug})
+
+    with freeze_time(NOW):
+        assert client.get(url).data["count_online_users"] == 1
+    with freeze_time(NOW + timedelta(hours=2)):
+        assert client.get(url).data["count_online_users"] == 0
+
+
+def test_api_community_members_cursor_pages(
+    client: Client, public_community_with_members: CommunityWithMembersFixture
+) -> None:
+    community = public_community_with_members(PAGE_SIZE + 1)
+    url = reverse("api-community-members", kwargs={"slug": community.slug})
+
+    first = client.get(url)
+    second = client.get(first.data["next"])
+
+    assert [member["user"]["nickname"] for member in first.data["results"]][:2] == ["User_11", "User_10"]
+    assert set(first.data["results"][0]) == {"user", "role", "joined_at"}
+    assert first.data["results"][0]["user"]["avatar"] == settings.DEFAULT_AVATAR_URL
+    assert [member["user"]["nickname"] for member in second.data["results"]] == ["User_1"]
+    assert second.data["next"] is None
+
+
+def test_api_community_members_private(client: Client, private_community: Community) -> None:
+    response = client.get(reverse("api-community-members", kwargs={"slug": private_community.slug}))
+    assert response.status_code == 403
@@ -8,6 +8,7 @@ from django.db import IntegrityError
 from django.test import Client
 from django.urls import reverse
 from faker import Faker
+from pytest_django import DjangoAssertNumQueries
 
 # Local application imports
 from core.models import Post, PostAward
@@ -120,3 +121,35 @@ def test_award_comment(user: User, post: Post) -> None:
         receiver=post.author, post=post, giver=user, choice=PostAward.get_reward_choices()[0][0], comment="Test comment"
     )
     assert award.comment == "Test comment"
+
+
+@pytest.mark.django_db()
+def test_attach_awards(
+    users: list[User], post: Post, comment: Post, django_assert_num_queries: DjangoAssertNumQueries
+) -> None:
+    choice = PostAward.get_reward_choices()[0][0]
+    PostAward.objects.create(receiver=post.author, post=post, giver=users[1], anonymous=True, choice=choice)
+    PostAward.objects.create(receiver=post.author, post=post, giver=users[0], choice=choice)
+    PostAward.objects.create(receiver=comment.author, post=comment, giver=users[2], choice=choice)
+    posts = [post, comment, Post.objects.create(author=users[0], community=post.community, content="no awards")]
+
+    with django_assert_num_queries(1):
+        Post.attach_awards(posts)
+        givers = [[award["giver_anonymous"] for award in item.get_post_awards()] for item in posts]
+
+    assert givers == [["Anonymous", "test_user_1"], ["test_user_3"], []]
+
+
+@pytest.mark.django_db()
+def test_post_detail_renders_comment_awards(client: Client, users: list[User], post: Post, comment: Post) -> None:
+    PostAward.objects.create(
+        receiver=comment.author,
+        post=comment,
+        giver=users[1],
+        anonymous=True,
+        choice=PostAward.get_reward_choices()[0][0],
+    )
+
+    response = client.get(reverse("post-detail", kwargs={"pk": post.pk}))
+
+    assert 'title="Anonymous"' in response.content.decode()
@@ -1,12 +1,15 @@
+import io
+import threading
 from datetime import timedelta
 
 import pytest
 from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.db import OperationalError, connection
 from django.utils import timezone
 from freezegun import freeze_time
 
-from core.models import Community, Post
+from core.models import BufferedVote, Community, KarmaRecalculation, PendingKarmaAuthor, Post, PostVote
 from users.models import Profile
 
 User = get_user_model()
@@ -115,3 +118,187 @@ def test_calculate_karma_score_two_posts_one_comment_one_expires(user: User, com
 
     assert profile.post_karma == 0  # both posts are now older than a year
     assert profile.comment_karma == 0  # comment is now older than a year
+
+
+@pytest.mark.django_db()
+def test_update_karma_scores_incremental_only_changed_authors(
+    user: User, another_user: User, community: Community
+) -> None:
+    post = Post.objects.create(author=user, community=community, title="post", content="post")
+    Post.objects.create(author=another_user, up_votes=4, community=community, title="other", content="other")
+    call_command("update_karma_scores", stdout=io.StringIO())
+    Profile.objects.filter(user=another_user).update(post_karma=100)
+
+    post.vote(another_user, PostVote.UPVOTE)
+    call_command("update_karma_scores", "--incremental", stdout=io.StringIO())
+
+    assert Profile.objects.get(user=user).post_karma == 1
+    assert Profile.objects.get(user=another_user).post_karma == 100  # untouched, its posts did not change
+    assert KarmaRecalculation.objects.filter(incremental=True).get().updated_profiles == 1
+
+
+@pytest.mark.django_db()
+def test_update_karma_scores_incremental_posts_aged_out(user: User, community: Community) -> None:
+    with freeze_time(FIXED_DATETIME) as frozen_time:
+        Post.objects.create(author=user, up_votes=3, community=community, title="post", content="post")
+        call_command("update_karma_scores", stdout=io.StringIO())
+        assert Profile.objects.get(user=user).post_karma == 3
+
+        frozen_time.tick(timedelta(days=366))
+        call_command("update_karma_scores", "--incremental", stdout=io.StringIO())
+
+    assert Profile.objects.get(user=user).post_karma == 0
+
+
+@pytest.mark.django_db()
+def test_update_karma_scores_incremental_deleted_posts(user: User, community: Community) -> None:
+    post = Post.objects.create(author=user, up_votes=3, community=community, title="post", content="post")
+    Post.objects.create(author=user, up_votes=2, community=community, title="kept", content="kept")
+    call_command("update_karma_scores", stdout=io.StringIO())
+    assert Profile.objects.get(user=user).post_karma == 5
+
+    Post.objects.filter(pk=post.pk).delete()
+    call_command("update_karma_scores", "--incremental", stdout=io.StringIO())
+
+    assert Profile.objects.get(user=user).post_karma == 2
+    assert not PendingKarmaAuthor.objects.exists()
+
+
+@pytest.mark.django_db()
+def test_update_karma_scores_dry_run(user: User, community: Community) -> None:
+    Post.objects.create(author=user, up_votes=5, down_votes=1, community=community, title="post", content="post")
+    out = io.StringIO()
+
+    call_command("update_karma_scores", "--dry-run", "--verbosity=2", stdout=out)
+
+    profile = Profile.objects.get(user=user)
+    assert profile.post_karma == 0
+    assert f"Profile {profile.pk}: post_karma 0 -> 4, comment_karma 0 -> 0" in out.getvalue()
+    assert "Would update karma of 1 of 1 profiles (post karma +4, comment karma +0)" in out.getvalue()
+    assert not KarmaRecalculation.objects.exists()
+
+
+@pytest.mark.django_db()
+def test_update_karma_scores_batches(users: list[User], community: Community) -> None:
+    for user in users:
+        Post.objects.create(author=user, up_votes=2, community=community, title="post", content="post")
+    out = io.StringIO()
+
+    call_command("update_karma_scores", "--batch-size=2", stdout=out)
+
+    assert "Processed 2/4 profiles" in out.getvalue()
+    assert "Processed 4/4 profiles, 3 changed" in out.getvalue()
+    assert set(Profile.objects.filter(user__in=users).values_list("post_karma", flat=True)) == {2}
+
+
+@pytest.mark.django_db()
+def test_rebuild_descendant_counts(post: Post, comment: Post) -> None:
+    reply = Post.objects.create(parent=comment, community=post.community, content="reply")
+    inactive = Post.objects.create(parent=post, community=post.community, content="inactive", is_active=False)
+    Post.objects.create(parent=inactive, community=post.community, content="reply to inactive")
+    Post.all_objects.update(descendant_count=42)
+
+    call_command("rebuild_descendant_counts")
+
+    counts = dict(Post.all_objects.values_list("id", "descendant_count"))
+    assert counts[post.id] == 2
+    assert counts[comment.id] == 1
+    assert counts[reply.id] == 0
+    assert counts[inactive.id] == 1
+
+
+@pytest.mark.django_db()
+def test_rebuild_post_paths(post: Post, comment: Post) -> None:
+    reply = Post.objects.create(parent=comment, community=post.community, content="reply")
+    expected = dict(Post.all_objects.values_list("id", "path"))
+    Post.all_objects.filter(pk=comment.pk).update(path="", depth=0)
+    Post.all_objects.filter(pk=reply.pk).update(path="broken/", depth=7)
+
+    out = io.StringIO()
+    call_command("rebuild_post_paths", stdout=out)
+
+    assert "Rebuilt post paths: 2 of 3 posts changed" in out.getvalue()
+    assert dict(Post.all_objects.values_list("id", "path")) == expected
+    assert dict(Post.all_objects.values_list("id", "depth")) == {post.pk: 0, comment.pk: 1, reply.pk: 2}
+
+
+@pytest.mark.django_db()
+def test_reconcile_vote_tallies(post: Post, user: User, another_user: User) -> None:
+    post.vote(user=user, choice=PostVote.UPVOTE)
+    post.vote(user=another_user, choice=PostVote.DOWNVOTE)
+    Post.objects.filter(pk=post.pk).update(up_votes=7, down_votes=0)
+
+    out = io.StringIO()
+    call_command("reconcile_vote_tallies", "--dry-run", stdout=out)
+    post.refresh_from_db()
+    assert f"Post {post.id}: up_votes 7 -> 1, down_votes 0 -> 1" in out.getvalue()
+    assert post.up_votes == 7
+
+    call_command("reconcile_vote_tallies", stdout=io.StringIO())
+    post.refresh_from_db()
+    assert post.up_votes == 1
+    assert post.down_votes == 1
+
+
+@pytest.mark.django_db()
+def test_flush_votes(post: Post, post2: Post, user: User, another_user: User) -> None:
+    post.vote(user=user, choice=PostVote.DOWNVOTE)
+    BufferedVote.objects.create(post=post, user=user, choice=PostVote.UPVOTE)
+    BufferedVote.objects.create(post=post, user=another_user, choice=PostVote.DOWNVOTE)
+    BufferedVote.objects.create(post=post, user=another_user, choice=PostVote.UPVOTE)
+    BufferedVote.objects.create(post=post2, user=user, choice=PostVote.DOWNVOTE)
+
+    call_command("flush_votes", "--batch-size", "2", stdout=io.StringIO())
+
+    post.refresh_from_db()
+    post2.refresh_from_db()
+    assert (post.up_votes, post.down_votes) == (2, 0)
+    assert (post2.up_votes, post2.down_votes) == (0, 1)
+    assert set(PostVote.objects.values_list("post_id", "user_id", "choice")) == {
+        (post.id, user.id, PostVote.UPVOTE),
+        (post.id, another_user.id, PostVote.UPVOTE),
+        (post2.id, user.id, PostVote.DOWNVOTE),
+    }
+    assert not BufferedVote.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_overlapping_vote_flushes_count_once(
+    post: Post, user: User, another_user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    for voter in (user, another_user):
+        BufferedVote.objects.create(post=post, user=voter, choice=PostVote.UPVOTE)
+    BufferedVote.objects.create(post=post, user=user, choice=PostVote.DOWNVOTE)
+    selected, release = threading.Event(), threading.Event()
+    get_tally_deltas = PostVote.get_tally_deltas
+
+    def paused_tally_deltas(previous_choice: str | None, choice: str | None) -> dict[str, int]:
+        selected.set()
+        release.wait(timeout=5)
+        return get_tally_deltas(previous_choice, choice)
+
+    def flush(batch_size: int) -> None:
+        try:
+            BufferedVote.flush(batch_size)
+        except OperationalError:
+            pass  # SQLite rejects the second writer instead of making it wait
+        finally:
+            connection.close()
+
+    monkeypatch.setattr(PostVote, "get_tally_deltas", paused_tally_deltas)
+    first = threading.Thread(target=flush, args=(2,))
+    first.start()
+    assert selected.wait(timeout=5)
+    monkeypatch.setattr(PostVote, "get_tally_deltas", get_tally_deltas)
+    # the batch of the second flush overlaps the first one, it waits for or fails on the rows held by the first
+    second = threading.Thread(target=flush, args=(3,))
+    second.start()
+    second.join(timeout=1)
+    release.set()
+    first.join(timeout=5)
+    second.join(timeout=5)
+    BufferedVote.flush(3)
+
+    post.refresh_from_db()
+    assert (post.up_votes, post.down_votes) == (1, 1)
+    assert not BufferedVote.objects.exists()
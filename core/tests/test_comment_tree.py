@@ -0,0 +1,234 @@
+import pytest
+from django.conf import Settings
+from django.test import Client
+from django.urls import reverse
+from pytest_django import DjangoAssertNumQueries
+from rest_framework.test import APIClient
+
+from core import comment_tree
+from core.models import Community, CommunityMember, Post
+from users.models import User
+
+pytestmark = pytest.mark.django_db
+
+TOP_LEVEL_COMMENTS = 50
+REPLIES_PER_COMMENT = 9
+REPLIES_PER_REPLY = 10
+TOTAL_COMMENTS = TOP_LEVEL_COMMENTS * (1 + REPLIES_PER_COMMENT + REPLIES_PER_COMMENT * REPLIES_PER_REPLY)
+
+
+def create_replies(parents: list[Post], count: int) -> list[Post]:
+    return Post.objects.bulk_create(
+        Post(
+            author=parent.author,
+            community=parent.community,
+            parent=parent,
+            title="",
+            content=f"Reply {i} to {parent.pk}",
+        )
+        for parent in parents
+        for i in range(count)
+    )
+
+
+@pytest.fixture()
+def large_thread(post: Post) -> Post:
+    top_level = create_replies([post], TOP_LEVEL_COMMENTS)
+    replies = create_replies(top_level, REPLIES_PER_COMMENT)
+    create_replies(replies, REPLIES_PER_REPLY)
+    return post
+
+
+def count_nodes(comments: list[Post]) -> int:
+    return sum(1 + count_nodes(comment.replies) for comment in comments)
+
+
+def test_comment_tree_nests_replies(post: Post, comment: Post) -> None:
+    reply = Post.objects.create(author=post.author, community=post.community, parent=comment, content="Reply")
+
+    tree = comment_tree.load(post)
+
+    assert tree == [comment]
+    assert tree[0].replies == [reply]
+    assert tree[0].replies[0].replies == []
+
+
+def test_comment_tree_hides_inactive_subtree(post: Post, comment: Post) -> None:
+    Post.objects.create(author=post.author, community=post.community, parent=comment, content="Hidden reply")
+    Post.objects.filter(pk=comment.pk).update(is_active=False)
+
+    assert comment_tree.load(post) == []
+
+
+def test_comment_tree_hides_inactive_subtree_below_a_comment(post: Post, comment: Post) -> None:
+    reply = Post.objects.create(author=post.author, community=post.community, parent=comment, content="Reply")
+    hidden = Post.objects.create(author=post.author, community=post.community, parent=reply, content="Hidden")
+    Post.objects.create(author=post.author, community=post.community, parent=hidden, content="Hidden reply")
+    visible = Post.objects.create(author=post.author, community=post.community, parent=reply, content="Visible")
+    Post.objects.filter(pk=hidden.pk).update(is_active=False)
+
+    tree = comment_tree.load(comment)
+
+    assert tree == [reply]
+    assert tree[0].replies == [visible]
+    assert count_nodes(tree) == 2
+
+
+def test_comment_tree_of_comment_returns_its_subtree(post: Post, comment: Post) -> None:
+    reply = Post.objects.create(author=post.author, community=post.community, parent=comment, content="Reply")
+
+    assert comment_tree.load(comment) == [reply]
+
+
+def test_comment_tree_query_count(large_thread: Post, django_assert_num_queries: DjangoAssertNumQueries) -> None:
+    with django_assert_num_queries(1):
+        tree = comment_tree.load(large_thread, max_comments=TOTAL_COMMENTS)
+        total = count_nodes(tree)
+
+    assert len(tree) == TOP_LEVEL_COMMENTS
+    assert total == TOTAL_COMMENTS == 5000
+    assert large_thread.has_more_replies is False
+
+
+def create_comment(parent: Post, content: str, score: int = 0) -> Post:
+    return Post.objects.create(
+        author=parent.author,
+        community=parent.community,
+        parent=parent,
+        content=content,
+        up_votes=max(score, 0),
+        down_votes=max(-score, 0),
+    )
+
+
+def contents(comments: list[Post]) -> list[str]:
+    return [comment.content for comment in comments]
+
+
+def test_limited_comment_tree_orders_children_by_score(post: Post) -> None:
+    low = create_comment(post, "Low", score=-1)
+    best = create_comment(post, "Best", score=5)
+    newest = create_comment(post, "Newest")
+    create_comment(low, "Reply", score=2)
+
+    tree = comment_tree.load(post)
+
+    assert tree == [best, newest, low]
+    assert contents(tree[2].replies) == ["Reply"]
+    assert not post.has_more_replies
+    assert not any(comment.has_more_replies for comment in tree)
+
+
+def test_limited_comment_tree_continues_after_the_cursor(settings: Settings, post: Post) -> None:
+    settings.COMMENT_TREE_MAX_COMMENTS = 3
+    comments = [create_comment(post, f"Comment {i}", score=10 - i) for i in range(5)]
+    create_comment(comments[0], "Reply")
+    create_comment(comments[3], "Later reply")
+
+    first = comment_tree.load(post)
+    assert first == comments[:3]
+    assert post.has_more_replies
+    assert first[0].replies == []
+    assert first[0].has_more_replies
+    assert first[0].replies_cursor == ""
+
+    second = comment_tree.load(post, post.replies_cursor)
+    assert second == comments[3:]
+    assert contents(second[0].replies) == ["Later reply"]
+    assert count_nodes(second) == 3
+    assert not post.has_more_replies
+    assert contents(comment_tree.load(comments[0])) == ["Reply"]
+
+
+def test_limited_comment_tree_stops_at_max_depth(settings: Settings, post: Post, comment: Post) -> None:
+    settings.COMMENT_TREE_MAX_DEPTH = 2
+    reply = create_comment(comment, "Reply")
+    deep_reply = create_comment(reply, "Deep reply")
+
+    tree = comment_tree.load(post)
+
+    loaded_reply = tree[0].replies[0]
+    assert loaded_reply == reply
+    assert loaded_reply.replies == []
+    assert loaded_reply.has_more_replies
+    assert comment_tree.load(reply, loaded_reply.replies_cursor) == [deep_reply]
+
+
+def test_limited_comment_tree_query_count(
+    large_thread: Post, django_assert_num_queries: DjangoAssertNumQueries
+) -> None:
+    with django_assert_num_queries(1):
+        tree = comment_tree.load(large_thread, max_comments=200, max_depth=5)
+        total = count_nodes(tree)
+
+    assert len(tree) == TOP_LEVEL_COMMENTS
+    assert total == 200
+    assert large_thread.has_more_replies is False
+    # the 150 replies left after the first level fill the replies of the 16 newest comments
+    assert sum(comment.has_more_replies for comment in tree) == TOP_LEVEL_COMMENTS - 150 // REPLIES_PER_COMMENT
+
+
+def test_comment_replies_fragment(client: Client, settings: Settings, post: Post) -> None:
+    settings.COMMENT_TREE_MAX_COMMENTS = 1
+    create_comment(post, "First", score=1)
+    create_comment(post, "Second")
+    url = reverse("comment-replies", kwargs={"pk": post.pk})
+
+    response = client.get(url)
+    assert "First" in response.content.decode()
+    assert "Second" not in response.content.decode()
+    assert "Load more replies" in response.content.decode()
+
+    comment_tree.load(post)
+    response = client.get(url, {"after": post.replies_cursor})
+    assert "Second" in response.content.decode()
+    assert "Load more replies" not in response.content.decode()
+    assert client.get(url, {"after": "nonsense"}).status_code == 404
+
+
+def test_comment_replies_fragment_returns_to_the_post(client: Client, user: User, post: Post, comment: Post) -> None:
+    create_comment(comment, "Reply")
+    client.force_login(user)
+
+    response = client.get(reverse("comment-replies", kwargs={"pk": comment.pk}))
+
+    post_url = reverse("post-detail", kwargs={"pk": post.pk})
+    assert f"?next={post_url}" in response.content.decode()
+    assert f"?next={reverse('comment-replies', kwargs={'pk': comment.pk})}" not in response.content.decode()
+
+
+def test_comment_replies_fragment_of_private_community(
+    client: Client, user: User, another_user: User, private_community: Community
+) -> None:
+    private_post = Post.objects.create(author=user, community=private_community, title="Private", content="x")
+    create_comment(private_post, "Secret comment")
+    url = reverse("comment-replies", kwargs={"pk": private_post.pk})
+
+    assert client.get(url).status_code == 403
+    client.force_login(another_user)
+    assert client.get(url).status_code == 403
+    CommunityMember.objects.create(community=private_community, user=another_user)
+    assert "Secret comment" in client.get(url).content.decode()
+    assert client.get(reverse("comment-replies", kwargs={"pk": 0})).status_code == 404
+
+
+def test_comment_tree_api(settings: Settings, post: Post, comment: Post, private_community: Community) -> None:
+    settings.COMMENT_TREE_MAX_COMMENTS = 2
+    reply = create_comment(comment, "Reply")
+    create_comment(post, "Second comment", score=-1)
+    client = APIClient()
+
+    response = client.get(reverse("api-comment-tree", kwargs={"pk": post.pk}))
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["content"] for result in results] == [comment.content, "Second comment"]
+    assert results[0]["replies"] == []
+    assert results[0]["has_more_replies"]
+    assert response.json()["next"] is None
+
+    response = client.get(reverse("api-comment-tree", kwargs={"pk": comment.pk}))
+    assert [result["id"] for result in response.json()["results"]] == [reply.pk]
+
+    private_post = Post.objects.create(author=post.author, community=private_community, title="Private", content="x")
+    assert client.get(reverse("api-comment-tree", kwargs={"pk": private_post.pk})).status_code == 403
@@ -0,0 +1,160 @@
+from collections.abc import Generator
+from datetime import timedelta
+
+import pytest
+from django.conf import Settings
+from django.test import Client
+from django.urls import reverse
+from freezegun import freeze_time
+from pytest_django import DjangoAssertNumQueries
+
+from core import community_cache
+from core.models import Community, CommunityMember, Post
+from users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture()
+def _community_cache(settings: Settings) -> Generator[None, None, None]:
+    settings.COMMUNITY_CACHE_ENABLED = True
+    settings.COMMUNITY_CACHE_TIMEOUT_SECONDS = 60
+    settings.COMMUNITY_CACHE_MAX_ENTRIES = 100
+    community_cache.communities.clear()
+    community_cache.roles.clear()
+    yield
+    community_cache.communities.clear()
+    community_cache.roles.clear()
+
+
+@pytest.mark.usefixtures("_community_cache")
+def test_get_community_is_read_through(community: Community, django_assert_num_queries: DjangoAssertNumQueries) -> None:
+    with django_assert_num_queries(1):
+        first = community_cache.get_community(community.slug)
+    with django_assert_num_queries(0):
+        second = community_cache.get_community(community.slug)
+
+    assert first == second == community
+    assert first is not second
+    with pytest.raises(Community.DoesNotExist):
+        community_cache.get_community("missing")
+
+
+@pytest.mark.usefixtures("_community_cache")
+def test_saving_a_community_invalidates_it(community: Community) -> None:
+    community_cache.get_community(community.slug)
+    community.privacy = Community.PRIVATE
+    community.save()
+
+    assert community_cache.get_community(community.slug).privacy == Community.PRIVATE
+
+    community.is_active = False
+    community.save()
+    with pytest.raises(Community.DoesNotExist):
+        community_cache.get_community(community.slug)
+
+
+@pytest.mark.usefixtures("_community_cache")
+def test_changing_the_slug_invalidates_the_previous_one(community: Community) -> None:
+    previous_slug = community.slug
+    community_cache.get_community(previous_slug)
+
+    community.slug = "renamed"
+    community.save()
+
+    with pytest.raises(Community.DoesNotExist):
+        community_cache.get_community(previous_slug)
+    assert community_cache.get_community("renamed") == community
+
+
+@pytest.mark.usefixtures("_community_cache")
+def test_get_role_caches_non_members(
+    community: Community, user: User, another_user: User, django_assert_num_queries: DjangoAssertNumQueries
+) -> None:
+    CommunityMember.objects.create(community=community, user=user, role=CommunityMember.ADMIN)
+
+    with django_assert_num_queries(2):
+        assert community_cache.get_role(community.pk, user.pk) == CommunityMember.ADMIN
+        assert community_cache.get_role(community.pk, another_user.pk) is None
+    with django_assert_num_queries(0):
+        assert community_cache.get_role(community.pk, user.pk) == CommunityMember.ADMIN
+        assert community_cache.get_role(community.pk, another_user.pk) is None
+        assert community_cache.get_role(community.pk, None) is None
+
+
+@pytest.mark.usefixtures("_community_cache")
+def test_moderator_changes_invalidate_roles(community: Community, another_user: User) -> None:
+    assert not community.is_admin_or_moderator(another_user)
+
+    community.add_moderator(another_user)
+    assert community.is_admin_or_moderator(another_user)
+
+    community.remove_moderator(another_user)
+    assert not community.is_admin_or_moderator(another_user)
+
+    community.members.add(another_user, through_defaults={"role": CommunityMember.MODERATOR})
+    assert community.is_admin_or_moderator(another_user)
+
+    community.members.remove(another_user)
+    assert not community.is_admin_or_moderator(another_user)
+
+
+@pytest.mark.usefixtures("_community_cache")
+def test_entries_expire(community: Community, django_assert_num_queries: DjangoAssertNumQueries) -> None:
+    with freeze_time() as frozen_time:
+        community_cache.get_community(community.slug)
+        frozen_time.tick(timedelta(seconds=61))
+
+        with django_assert_num_queries(1):
+            community_cache.get_community(community.slug)
+
+
+@pytest.mark.usefixtures("_community_cache")
+def test_least_recently_used_entries_are_evicted(settings: Settings) -> None:
+    settings.COMMUNITY_CACHE_MAX_ENTRIES = 2
+    cache = community_cache.LRUCache()
+    cache.get("a", lambda: 1)
+    cache.get("b", lambda: 2)
+    assert cache.get("a", lambda: pytest.fail("a is cached")) == 1
+
+    cache.get("c", lambda: 3)
+
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.get("b", lambda: 4) == 4
+
+
+@pytest.mark.usefixtures("_community_cache")
+def test_post_edit_permission_uses_cached_role(
+    post: Post, another_user: User, django_assert_num_queries: DjangoAssertNumQueries
+) -> None:
+    assert not another_user.has_permission(post.pk, "edit")
+
+    post.community.add_moderator(another_user)
+    assert another_user.has_permission(post.pk, "edit")
+    with django_assert_num_queries(1):
+        assert another_user.has_permission(post.pk, "edit")
+
+
+@pytest.mark.usefixtures("_community_cache")
+def test_private_community_detail_warm_queries(
+    client: Client, private_community: Community, another_user: User, django_assert_num_queries: DjangoAssertNumQueries
+) -> None:
+    url = reverse("community-detail", kwargs={"slug": private_community.slug})
+    CommunityMember.objects.create(community=private_community, user=another_user, role=CommunityMember.MEMBER)
+    client.force_login(another_user)
+    assert client.get(url).status_code == 200
+
+    # session, user, member count
+    with django_assert_num_queries(3):
+        assert client.get(url).status_code == 200
+
+    private_community.members.remove(another_user)
+    assert client.get(url).status_code == 403
+
+
+def test_community_detail_loads_the_community_once(
+    client: Client, community: Community, django_assert_num_queries: DjangoAssertNumQueries
+) -> None:
+    # community with its author, member count
+    with django_assert_num_queries(2):
+        client.get(reverse("community-detail", kwargs={"slug": community.slug}))
@@ -0,0 +1,157 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from django.conf import Settings
+from django.core import serializers
+from django.core.management import call_command
+from django.test import Client
+from django.urls import reverse
+from freezegun import freeze_time
+from pytest_django import DjangoAssertNumQueries
+
+from core import home_feed
+from core.models import Community, CommunityMember, FeedItem, Post
+from users.models import User
+
+pytestmark = pytest.mark.django_db
+
+NOW = datetime(2026, 1, 15, 12, 0, tzinfo=UTC)
+
+
+def create_posts(community: Community, author: User, count: int, start: datetime = NOW) -> list[Post]:
+    posts = []
+    for number in range(count):
+        with freeze_time(start + timedelta(minutes=number)):
+            posts.append(Post.objects.create(author=author, community=community, title=f"Post {number}", content="x"))
+    return posts
+
+
+def titles(posts: list[Post]) -> list[str]:
+    return [post.title for post in posts]
+
+
+def test_root_posts_are_fanned_out_to_members(community: Community, user: User, another_user: User) -> None:
+    CommunityMember.objects.create(community=community, user=another_user)
+    post = Post.objects.create(author=user, community=community, title="Hello", content="x")
+    Post.objects.create(author=user, community=community, parent=post, content="Comment")
+
+    assert list(FeedItem.objects.values_list("user", "post")) == [(another_user.pk, post.pk)]
+    assert titles(home_feed.read(another_user)[0]) == ["Hello"]
+    assert home_feed.read(user) == ([], None)
+
+
+def test_bulk_created_posts_are_fanned_out(community: Community, user: User, another_user: User) -> None:
+    CommunityMember.objects.create(community=community, user=another_user)
+    post, _ = Post.objects.bulk_create(
+        [Post(author=user, community=community, title=f"Post {i}", content="x") for i in range(2)]
+    )
+    Post.objects.bulk_create([Post(author=user, community=community, parent=post, content="Comment")])
+
+    assert sorted(titles(home_feed.read(another_user)[0])) == ["Post 0", "Post 1"]
+
+
+def test_loaded_fixtures_are_not_fanned_out(community: Community, user: User, another_user: User) -> None:
+    CommunityMember.objects.create(community=community, user=another_user)
+    post = Post.objects.create(author=user, community=community, title="Hello", content="x")
+    fixture = serializers.serialize("json", [post])
+    post.delete()
+
+    for loaded in serializers.deserialize("json", fixture):
+        loaded.save()
+
+    assert Post.objects.filter(title="Hello").exists()
+    assert not FeedItem.objects.exists()
+
+
+def test_member_count_follows_memberships(community: Community, user: User, another_user: User) -> None:
+    CommunityMember.objects.create(community=community, user=user)
+    community.members.add(another_user)
+    community.refresh_from_db()
+    assert community.member_count == 2
+
+    community.members.remove(user)
+    another_user.communities.remove(community)
+    community.refresh_from_db()
+    assert community.member_count == 0
+
+
+def test_cursor_pagination(community: Community, user: User, another_user: User) -> None:
+    CommunityMember.objects.create(community=community, user=another_user)
+    posts = create_posts(community, user, 5)
+    with freeze_time(NOW + timedelta(minutes=4)):
+        posts.append(Post.objects.create(author=user, community=community, title="Same time", content="x"))
+
+    first, cursor = home_feed.read(another_user, limit=4)
+    second, last_cursor = home_feed.read(another_user, cursor, limit=4)
+
+    assert titles(first) == ["Same time", "Post 4", "Post 3", "Post 2"]
+    assert titles(second) == ["Post 1", "Post 0"]
+    assert last_cursor is None
+    assert titles(home_feed.read(another_user, "not a cursor", limit=4)[0]) == titles(first)
+
+
+def test_inactive_posts_are_hidden(community: Community, user: User, another_user: User) -> None:
+    CommunityMember.objects.create(community=community, user=another_user)
+    hidden, shown = create_posts(community, user, 2)
+    hidden.is_active = False
+    hidden.save()
+
+    assert home_feed.read(another_user)[0] == [shown]
+
+
+def test_large_communities_are_read_on_demand(
+    settings: Settings, community: Community, community2: Community, user: User, another_user: User
+) -> None:
+    settings.HOME_FEED_FANOUT_MAX_MEMBERS = 1
+    community.members.add(user, another_user)
+    CommunityMember.objects.create(community=community2, user=another_user)
+    create_posts(community, user, 2)
+    create_posts(community2, user, 1, start=NOW + timedelta(seconds=30))
+
+    assert FeedItem.objects.filter(community=community).count() == 0
+    assert titles(home_feed.read(another_user)[0]) == ["Post 1", "Post 0", "Post 0"]
+    assert [post.community for post in home_feed.read(another_user, limit=2)[0]] == [community, community2]
+
+
+def test_join_backfills_and_leave_removes(
+    settings: Settings, community: Community, user: User, another_user: User
+) -> None:
+    settings.HOME_FEED_BACKFILL_ITEMS = 2
+    create_posts(community, user, 3)
+
+    CommunityMember.objects.create(community=community, user=another_user)
+    assert titles(home_feed.read(another_user)[0]) == ["Post 2", "Post 1"]
+
+    community.members.remove(another_user)
+    assert home_feed.read(another_user)[0] == []
+
+
+def test_trim_home_feeds(community: Community, user: User, another_user: User, capsys: pytest.CaptureFixture) -> None:
+    community.members.add(user, another_user)
+    create_posts(community, user, 4)
+
+    call_command("trim_home_feeds", "--max-items", "3")
+
+    assert "Trimmed home feeds: removed 2 items" in capsys.readouterr().out
+    assert titles(home_feed.read(another_user)[0]) == ["Post 3", "Post 2", "Post 1"]
+
+
+def test_home_page_queries(
+    client: Client,
+    community: Community,
+    user: User,
+    another_user: User,
+    django_assert_num_queries: DjangoAssertNumQueries,
+) -> None:
+    CommunityMember.objects.create(community=community, user=another_user)
+    create_posts(community, user, home_feed.PAGE_SIZE + 1)
+    client.force_login(another_user)
+
+    # session, user, feed items with posts, large communities, saved posts, votes, awards
+    with django_assert_num_queries(7):
+        response = client.get(reverse("home"))
+
+    assert len(response.context["posts"]) == home_feed.PAGE_SIZE
+    next_page = client.get(reverse("home"), {"cursor": response.context["next_cursor"]})
+    assert titles(next_page.context["posts"]) == ["Post 0"]
+    assert next_page.context["next_cursor"] is None
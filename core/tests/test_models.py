@@ -3,10 +3,22 @@ from datetime import timedelta
 import pytest
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import IntegrityError
+from django.contrib.auth.models import AnonymousUser
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
-
-from core.models import Community, CommunityMember, Post, PostVote, SavedPost, Tag
+from pytest_django import DjangoAssertNumQueries
+
+from core.models import (
+    CARD_PREVIEW_LENGTH,
+    Community,
+    CommunityMember,
+    Post,
+    PostVote,
+    SavedPost,
+    Tag,
+    path_segment,
+)
 
 User = get_user_model()
 
@@ -138,6 +150,37 @@ def test_tags_removed_on_post_update(user: User, community: Community) -> None:
     assert "tag2" not in tag_names
 
 
+@pytest.mark.django_db()
+def test_update_tags_queries(post: Post, django_assert_num_queries: DjangoAssertNumQueries) -> None:
+    post.get_content_type()  # the content type is cached once per process
+
+    post.content = "#a #b #c #a"
+    # the tags and their usage each in one insert
+    with django_assert_num_queries(2):
+        post.update_tags(created=True)
+    assert sorted(post.tags.values_list("name", flat=True)) == ["a", "b", "c"]
+
+    post.content = "#b #c #d"
+    # the existing tags, one delete of the removed ones, the insert of the added one in a savepoint and its usage
+    with django_assert_num_queries(6):
+        post.update_tags()
+    with django_assert_num_queries(1):
+        post.update_tags()
+
+    assert sorted(post.tags.values_list("name", flat=True)) == ["b", "c", "d"]
+
+
+@pytest.mark.django_db()
+def test_tag_index(post: Post) -> None:
+    tagged = [
+        Post.objects.create(author=post.author, community=post.community, title=f"Post {i}", content=content)
+        for i, content in enumerate(["#django #python", "#python", "#rust"])
+    ]
+
+    assert list(Post.objects.tagged("python").order_by("pk")) == tagged[:2]
+    assert list(Post.objects.tagged("go")) == []
+
+
 @pytest.mark.django_db()
 def test_create_community_user(user: User, community: Community) -> None:
     community_user: CommunityMember = CommunityMember.objects.create(
@@ -301,3 +344,223 @@ def test_parent_children_post(post: Post) -> None:
     p.refresh_from_db()
     assert post.children.exists()
     assert post.children.first() == p
+
+
+@pytest.mark.django_db()
+def test_descendant_count_on_comment_create(post: Post, comment: Post) -> None:
+    Post.objects.create(parent=comment, community=post.community, content="reply")
+
+    post.refresh_from_db()
+    comment.refresh_from_db()
+    assert post.descendant_count == 2
+    assert comment.descendant_count == 1
+
+
+@pytest.mark.django_db()
+def test_descendant_count_on_deactivate_and_reactivate(post: Post, comment: Post) -> None:
+    Post.objects.create(parent=comment, community=post.community, content="reply")
+
+    comment.is_active = False
+    comment.save()
+    post.refresh_from_db()
+    assert post.descendant_count == 0
+
+    comment.is_active = True
+    comment.save()
+    post.refresh_from_db()
+    assert post.descendant_count == 2
+
+
+@pytest.mark.django_db()
+def test_descendant_count_skips_ancestors_above_inactive_comment(post: Post, comment: Post) -> None:
+    comment.is_active = False
+    comment.save()
+
+    Post.objects.create(parent=comment, community=post.community, content="reply")
+
+    post.refresh_from_db()
+    comment.refresh_from_db()
+    assert post.descendant_count == 0
+    assert comment.descendant_count == 1
+
+
+@pytest.mark.django_db()
+def test_descendant_count_on_delete(post: Post, comment: Post) -> None:
+    reply = Post.objects.create(parent=comment, community=post.community, content="reply")
+    Post.objects.create(parent=reply, community=post.community, content="nested reply")
+    Post.objects.create(parent=post, community=post.community, content="second comment")
+
+    reply.refresh_from_db()
+    reply.delete()
+    post.refresh_from_db()
+    comment.refresh_from_db()
+    assert post.descendant_count == 2
+    assert comment.descendant_count == 0
+
+    Post.objects.filter(parent=post).delete()
+    post.refresh_from_db()
+    assert post.descendant_count == 0
+
+
+@pytest.mark.django_db()
+def test_descendant_count_on_queryset_delete(post: Post, comment: Post) -> None:
+    reply = Post.objects.create(parent=comment, community=post.community, content="reply")
+    Post.objects.create(parent=post, community=post.community, content="second comment")
+
+    Post.objects.filter(pk=comment.pk).delete()
+    post.refresh_from_db()
+    assert post.descendant_count == 1
+    assert not Post.all_objects.filter(pk=reply.pk).exists()
+
+    Post.objects.create(parent=post, community=post.community, content="third comment")
+    Post.objects.filter(parent=post).delete()
+    post.refresh_from_db()
+    assert post.descendant_count == 0
+
+
+@pytest.mark.django_db()
+def test_saving_a_stale_post_keeps_its_counters(post: Post, another_user: User) -> None:
+    stale = Post.objects.get(pk=post.pk)
+    Post.objects.create(parent=post, community=post.community, content="comment")
+    post.vote(user=another_user, choice=PostVote.UPVOTE)
+
+    stale.title = "edited"
+    stale.save()
+
+    post.refresh_from_db()
+    assert (post.title, post.descendant_count, post.up_votes, post.top_rank) == ("edited", 1, 1, 1)
+
+
+def assert_paths_consistent() -> None:
+    posts = {post.pk: post for post in Post.all_objects.all()}
+    for post in posts.values():
+        parent = posts.get(post.parent_id)
+        assert post.path == (parent.path if parent else "") + path_segment(post.pk)
+        assert post.depth == (parent.depth + 1 if parent else 0)
+
+
+@pytest.mark.django_db()
+def test_post_path_is_set_on_insert(post: Post, comment: Post) -> None:
+    reply = Post.objects.create(parent=comment, community=post.community, content="reply")
+    Post.objects.create(parent_id=reply.pk, community=post.community, content="nested reply")
+    Post.objects.create(parent=post, community=post.community, content="second comment")
+
+    assert reply.path == f"{post.pk:010d}/{comment.pk:010d}/{reply.pk:010d}/"
+    assert reply.depth == 2
+    assert_paths_consistent()
+
+
+@pytest.mark.django_db()
+def test_post_path_is_set_on_bulk_insert(post: Post, comment: Post) -> None:
+    replies = Post.objects.bulk_create(
+        [Post(parent=comment, community=post.community, content=f"reply {i}") for i in range(3)]
+    )
+    Post.objects.bulk_create([Post(community=post.community, title="Another post")])
+
+    assert replies[0].ancestor_ids == [post.pk, comment.pk]
+    assert replies[0].depth == 2
+    assert_paths_consistent()
+
+    Post.objects.create(parent=replies[0], community=post.community, content="nested reply")
+    post.refresh_from_db()
+    assert post.descendant_count == 2
+
+
+@pytest.mark.django_db()
+def test_post_ancestors_and_descendants(
+    post: Post, post2: Post, comment: Post, django_assert_num_queries: DjangoAssertNumQueries
+) -> None:
+    reply = Post.objects.create(parent=comment, community=post.community, content="reply")
+    nested = Post.objects.create(parent=reply, community=post.community, content="nested", is_active=False)
+    second = Post.objects.create(parent=post, community=post.community, content="second comment")
+    Post.objects.create(parent=post2, community=post2.community, content="other thread")
+
+    with django_assert_num_queries(3):
+        assert list(post.get_descendants()) == [comment, reply, nested, second]
+        assert list(comment.get_descendants()) == [reply, nested]
+        assert list(nested.get_ancestors()) == [post, comment, reply]
+    assert list(post.get_ancestors()) == []
+    assert nested.ancestor_ids == [post.pk, comment.pk, reply.pk]
+
+
+@pytest.mark.django_db()
+def test_post_cards_load_header_relations(
+    post: Post, post2: Post, django_assert_num_queries: DjangoAssertNumQueries
+) -> None:
+    Post.all_objects.filter(pk=post.pk).update(content="<p>" + "x" * 1000 + "</p>")
+
+    with django_assert_num_queries(1):
+        cards = list(Post.objects.order_by("id").cards(preview=True))
+        assert [card.author.profile.post_karma for card in cards] == [0, 0]
+        assert [card.community for card in cards] == [post.community, post2.community]
+        assert len(cards[0].content_preview) == CARD_PREVIEW_LENGTH
+    assert cards[0].get_deferred_fields() == {"content"}
+    assert not Post.objects.cards().get(pk=post.pk).get_deferred_fields()
+
+
+@pytest.mark.django_db()
+def test_post_vote_repeated_choice_is_noop(post: Post, user: User) -> None:
+    post.vote(user=user, choice=PostVote.UPVOTE)
+    post.vote(user=user, choice=PostVote.UPVOTE)
+
+    post.refresh_from_db()
+    assert post.up_votes == 1
+    assert post.down_votes == 0
+    assert PostVote.objects.filter(post=post).count() == 1
+
+
+@pytest.mark.django_db()
+def test_post_vote_change_moves_tally(post: Post, user: User) -> None:
+    post.vote(user=user, choice=PostVote.UPVOTE)
+    post.vote(user=user, choice=PostVote.DOWNVOTE)
+
+    post.refresh_from_db()
+    assert post.up_votes == 0
+    assert post.down_votes == 1
+
+
+@pytest.mark.django_db()
+def test_post_vote_delete_removes_tally(post: Post, user: User, another_user: User) -> None:
+    post.vote(user=user, choice=PostVote.UPVOTE)
+    post.vote(user=another_user, choice=PostVote.DOWNVOTE)
+
+    PostVote.objects.get(post=post, user=user).delete()
+    PostVote.objects.filter(post=post, user=another_user).delete()
+
+    post.refresh_from_db()
+    assert post.up_votes == 0
+    assert post.down_votes == 0
+
+
+@pytest.mark.django_db()
+def test_post_vote_does_not_recount(post: Post, user: User, another_user: User) -> None:
+    post.vote(user=another_user, choice=PostVote.UPVOTE)
+
+    with CaptureQueriesContext(connection) as captured:
+        post.vote(user=user, choice=PostVote.DOWNVOTE)
+
+    assert not [query for query in captured.captured_queries if "COUNT(" in query["sql"].upper()]
+
+
+@pytest.mark.django_db()
+def test_attach_user_state(
+    post: Post, comment: Post, user: User, another_user: User, django_assert_num_queries: DjangoAssertNumQueries
+) -> None:
+    SavedPost.save_post(user=user, post=comment)
+    post.vote(user=user, choice=PostVote.DOWNVOTE)
+    comment.vote(user=another_user, choice=PostVote.UPVOTE)
+    posts = [post, comment]
+
+    with django_assert_num_queries(2):
+        Post.attach_user_state(posts, user)
+
+    assert [(item.saved_by_user, item.user_vote) for item in posts] == [(False, "down"), (True, None)]
+
+
+@pytest.mark.django_db()
+def test_attach_user_state_anonymous(post: Post, django_assert_num_queries: DjangoAssertNumQueries) -> None:
+    with django_assert_num_queries(0):
+        Post.attach_user_state([post], AnonymousUser())
+
+    assert post.saved_by_user is False
+    assert post.user_vote is None
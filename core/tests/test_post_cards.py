@@ -0,0 +1,101 @@
+import re
+from collections.abc import Generator
+
+import pytest
+from django.conf import Settings
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from core.models import Community, Post, PostVote, SavedPost
+from users.models import Profile, User
+
+pytestmark = pytest.mark.django_db
+
+CSRF_TOKEN_RE = re.compile(r'name="csrfmiddlewaretoken" value="[^"]*"')
+
+
+@pytest.fixture()
+def _post_card_cache(settings: Settings) -> Generator[None, None, None]:
+    settings.POST_CARD_CACHE_ENABLED = True
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture()
+def posts(user: User, community: Community) -> list[Post]:
+    return [
+        Post.objects.create(author=user, community=community, title=f"Post {i}", content=f"Content {i}")
+        for i in range(3)
+    ]
+
+
+def rendered(client: Client, name: str) -> list[str]:
+    response = client.get(reverse("post-list"))
+    return [template.name for template in response.templates if template.name == name]
+
+
+def page(client: Client) -> str:
+    # the CSRF token is masked differently on every request
+    return CSRF_TOKEN_RE.sub("", client.get(reverse("post-list")).content.decode())
+
+
+@pytest.mark.usefixtures("posts")
+def test_cached_cards_render_like_uncached(client: Client, settings: Settings, user: User) -> None:
+    client.force_login(user)
+    uncached = page(client)
+
+    settings.POST_CARD_CACHE_ENABLED = True
+    cache.clear()
+
+    assert page(client) == uncached
+    assert page(client) == uncached
+
+
+@pytest.mark.usefixtures("_post_card_cache", "posts")
+def test_warm_cards_are_not_rendered_again(client: Client) -> None:
+    assert len(rendered(client, "core/post-header.html")) == 3
+    assert rendered(client, "core/post-header.html") == []
+    assert rendered(client, "core/post-footer.html") == []
+    assert len(rendered(client, "core/post-vote.html")) == 6
+
+
+@pytest.mark.usefixtures("_post_card_cache")
+def test_per_user_state_is_rendered_per_request(posts: list[Post], user: User, another_user: User) -> None:
+    SavedPost.objects.create(user=user, post=posts[0])
+    posts[0].vote(user=user, choice=PostVote.UPVOTE)
+    client = Client()
+    client.force_login(user)
+    html = client.get(reverse("post-list")).content.decode()
+    assert "Unsave" in html
+    assert "btn-secondary-dark active" in html
+
+    client.force_login(another_user)
+    html = client.get(reverse("post-list")).content.decode()
+
+    assert "Unsave" not in html
+    assert "btn-secondary-dark active" not in html
+    assert "Edit" not in html
+
+
+@pytest.mark.usefixtures("_post_card_cache")
+def test_changes_invalidate_only_the_affected_card(client: Client, posts: list[Post], another_user: User) -> None:
+    rendered(client, "core/post-header.html")
+
+    posts[0].vote(user=another_user, choice=PostVote.UPVOTE)
+    assert len(rendered(client, "core/post-footer.html")) == 1
+
+    posts[1].title = "Edited"
+    posts[1].save()
+    assert len(rendered(client, "core/post-header.html")) == 1
+
+
+@pytest.mark.usefixtures("_post_card_cache")
+def test_avatar_change_invalidates_the_author_cards(client: Client, posts: list[Post], user: User) -> None:
+    rendered(client, "core/post-header.html")
+
+    Profile.objects.filter(user=user).update(avatar="users_avatars/new.jpg")
+
+    assert len(rendered(client, "core/post-header.html")) == len(posts)
+    assert 'src="/media/users_avatars/new.jpg"' in page(client)
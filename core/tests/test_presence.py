@@ -0,0 +1,155 @@
+from collections.abc import Generator
+from datetime import timedelta
+
+import pytest
+from django.conf import Settings
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from freezegun import freeze_time
+from freezegun.api import FrozenDateTimeFactory
+from pytest_django import DjangoAssertNumQueries
+
+from conftest import CommunityWithMembersFixture
+from core import presence
+from core.models import Community, CommunityMember
+from users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture()
+def frozen_time() -> Generator[FrozenDateTimeFactory, None, None]:
+    with freeze_time("2026-01-01 12:00:30") as frozen_time:
+        yield frozen_time
+
+
+@pytest.fixture()
+def _presence_index(settings: Settings, frozen_time: FrozenDateTimeFactory) -> Generator[None, None, None]:
+    settings.PRESENCE_INDEX_ENABLED = True
+    settings.PRESENCE_BUCKET_SECONDS = 60
+    settings.LAST_ACTIVITY_ONLINE_LIMIT_MINUTES = 15
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def members(community: Community) -> list[User]:
+    return list(community.members.order_by("pk"))
+
+
+@pytest.mark.usefixtures("_presence_index")
+def test_cold_index_is_rebuilt_from_last_activity(public_community_with_members: CommunityWithMembersFixture) -> None:
+    community = public_community_with_members(3)
+    User.objects.filter(pk=members(community)[0].pk).update(last_activity=timezone.now() - timedelta(minutes=16))
+
+    assert community.count_online_users() == 2
+    cache.clear()
+    assert community.count_online_users() == 2
+
+
+@pytest.mark.usefixtures("_presence_index")
+def test_warm_read_runs_no_queries(
+    public_community_with_members: CommunityWithMembersFixture, django_assert_num_queries: DjangoAssertNumQueries
+) -> None:
+    community = public_community_with_members(5)
+    with django_assert_num_queries(1):
+        assert community.count_online_users() == 5
+    with django_assert_num_queries(0):
+        assert community.count_online_users() == 5
+
+
+@pytest.mark.usefixtures("_presence_index")
+def test_members_go_offline_when_their_bucket_leaves_the_window(
+    public_community_with_members: CommunityWithMembersFixture, frozen_time: FrozenDateTimeFactory
+) -> None:
+    community = public_community_with_members(3)
+    assert community.count_online_users() == 3
+
+    frozen_time.tick(timedelta(minutes=10))
+    presence.record_activity(members(community)[0].pk)
+    frozen_time.tick(timedelta(minutes=5))
+    assert community.count_online_users() == 1
+
+    frozen_time.tick(timedelta(minutes=10))
+    assert community.count_online_users() == 0
+
+    presence.record_activity(members(community)[1].pk)
+    assert community.count_online_users() == 1
+
+
+@pytest.mark.usefixtures("_presence_index")
+def test_repeated_activity_is_counted_once(
+    public_community_with_members: CommunityWithMembersFixture, frozen_time: FrozenDateTimeFactory
+) -> None:
+    community = public_community_with_members(2)
+    member = members(community)[0]
+    assert community.count_online_users() == 2
+
+    for _ in range(20):
+        presence.record_activity(member.pk)
+        frozen_time.tick(timedelta(seconds=45))
+
+    assert community.count_online_users() == 1
+
+
+@pytest.mark.usefixtures("_presence_index")
+def test_activity_counts_in_every_community_of_the_user(
+    public_community_with_members: CommunityWithMembersFixture, community: Community, frozen_time: FrozenDateTimeFactory
+) -> None:
+    public_community = public_community_with_members(2)
+    member = members(public_community)[0]
+    CommunityMember.objects.create(community=community, user=member, role=CommunityMember.MEMBER)
+    assert (public_community.count_online_users(), community.count_online_users()) == (2, 1)
+
+    frozen_time.tick(timedelta(minutes=20))
+    presence.record_activity(member.pk)
+
+    assert (public_community.count_online_users(), community.count_online_users()) == (1, 1)
+
+
+@pytest.mark.usefixtures("_presence_index")
+def test_middleware_records_activity(
+    public_community_with_members: CommunityWithMembersFixture, client: Client, frozen_time: FrozenDateTimeFactory
+) -> None:
+    community = public_community_with_members(2)
+    member = members(community)[0]
+    frozen_time.tick(timedelta(minutes=20))
+    assert community.count_online_users() == 0
+
+    client.force_login(member)
+    client.get(reverse("home"))
+
+    assert community.count_online_users() == 1
+
+
+@pytest.mark.usefixtures("_presence_index")
+def test_joining_and_leaving(
+    public_community_with_members: CommunityWithMembersFixture, community: Community, another_user: User
+) -> None:
+    public_community = public_community_with_members(2)
+    member = members(public_community)[0]
+    assert community.count_online_users() == 0
+
+    CommunityMember.objects.create(community=community, user=member, role=CommunityMember.MEMBER)
+    community.members.add(another_user)
+    assert community.count_online_users() == 2
+
+    community.members.remove(another_user)
+    CommunityMember.objects.filter(community=community, user=member).delete()
+    assert community.count_online_users() == 0
+    assert public_community.count_online_users() == 2
+
+
+def test_disabled_index_counts_in_the_database(
+    public_community_with_members: CommunityWithMembersFixture,
+    settings: Settings,
+    django_assert_num_queries: DjangoAssertNumQueries,
+) -> None:
+    settings.PRESENCE_INDEX_ENABLED = False
+    community = public_community_with_members(2)
+
+    assert presence.online_count(community.pk) is None
+    with django_assert_num_queries(1):
+        assert community.count_online_users() == 2
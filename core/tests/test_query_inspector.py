@@ -0,0 +1,113 @@
+import logging
+
+import pytest
+from django.conf import Settings
+from django.test import Client
+from django.urls import reverse
+
+from core.middleware.query_inspector import QueryReport, RecordedQuery, fingerprint
+from core.models import Post, PostQuerySet
+from core.tests.query_budget import budget_violations
+
+pytestmark = pytest.mark.django_db
+
+POSTS = 10
+
+
+@pytest.fixture()
+def feed(post: Post) -> list[Post]:
+    return [
+        Post.objects.create(author=post.author, community=post.community, title=f"Post {i}", content=f"Post {i}")
+        for i in range(POSTS)
+    ]
+
+
+@pytest.fixture()
+def thread(post: Post) -> Post:
+    for i in range(POSTS):
+        Post.objects.create(author=post.author, community=post.community, parent=post, content=f"Comment {i}")
+    return post
+
+
+def test_fingerprint_collapses_parameters() -> None:
+    assert fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21") == (
+        "SELECT * FROM t WHERE id IN (...) AND name = %s LIMIT %s"
+    )
+    assert fingerprint('SELECT "t1"."id" FROM "t1" WHERE "t1"."id" IN (%s)') == (
+        'SELECT "t1"."id" FROM "t1" WHERE "t1"."id" IN (...)'
+    )
+
+
+@pytest.mark.usefixtures("feed")
+def test_middleware_logs_repeated_queries(
+    client: Client,
+    settings: Settings,
+    caplog: pytest.LogCaptureFixture,
+    query_reports: list[QueryReport],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    settings.QUERY_INSPECTOR_REPEAT_THRESHOLD = POSTS
+    # without the post card joins every header loads its author and community
+    monkeypatch.setattr(PostQuerySet, "cards", lambda queryset, **_kwargs: queryset)
+
+    with caplog.at_level(logging.WARNING, logger="core.middleware.query_inspector"):
+        client.get(reverse("post-list"))
+
+    assert [report.url_name for report in query_reports] == ["post-list"]
+    assert query_reports[0].repeated(POSTS)
+    assert f"Possible N+1 on post-list ({reverse('post-list')}): 11x from" in caplog.text
+    assert "core/post-header.html" in caplog.text
+
+
+@pytest.mark.usefixtures("feed")
+def test_middleware_disabled(client: Client, settings: Settings, query_reports: list[QueryReport]) -> None:
+    settings.QUERY_INSPECTOR_ENABLED = False
+    client.get(reverse("post-list"))
+    assert query_reports == []
+
+
+@pytest.mark.usefixtures("feed")
+@pytest.mark.query_budget("post-list", 7, max_repeats=1)
+def test_post_list_query_budget(client: Client, post: Post) -> None:
+    client.force_login(post.author)
+    client.get(reverse("post-list"))
+
+
+@pytest.mark.query_budget("post-detail", 8, max_repeats=1)
+def test_post_detail_query_budget(client: Client, thread: Post) -> None:
+    client.force_login(thread.author)
+    client.get(reverse("post-detail", kwargs={"pk": thread.pk}))
+
+
+@pytest.mark.query_budget("comment-replies", 7, max_repeats=1)
+def test_comment_replies_query_budget(client: Client, thread: Post) -> None:
+    client.force_login(thread.author)
+    client.get(reverse("comment-replies", kwargs={"pk": thread.pk}))
+
+
+@pytest.mark.query_budget("home", 7, max_repeats=1)
+@pytest.mark.usefixtures("feed")
+def test_home_query_budget(client: Client, thread: Post) -> None:
+    # joining puts the posts created so far into the home feed
+    thread.community.members.add(thread.author)
+    client.force_login(thread.author)
+    client.get(reverse("home"))
+
+
+def test_budget_violations() -> None:
+    query = RecordedQuery("SELECT 1", "SELECT %s", "core/views.py:1")
+    report = QueryReport(url_name="post-list", path="/post-list/", queries=[query, query, query])
+    budgets = {
+        "post-list": pytest.mark.query_budget("post-list", 2, max_repeats=2).mark,
+        "post-detail": pytest.mark.query_budget("post-detail", 10).mark,
+    }
+
+    assert budget_violations([report], budgets) == [
+        "No request to post-detail was made",
+        "post-list (/post-list/) ran 3 queries, the budget is 2",
+        "    core/views.py:1: SELECT 1",
+        "    core/views.py:1: SELECT 1",
+        "    core/views.py:1: SELECT 1",
+        "post-list (/post-list/) repeated a query 3x from core/views.py:1: SELECT %s",
+    ]
+    assert budget_violations([report], {"post-list": pytest.mark.query_budget("post-list", 3).mark}) == []
@@ -0,0 +1,133 @@
+import io
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from core import ranking
+from core.models import Community, Post, PostVote
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+def make_post(
+    community: Community, title: str, up_votes: int = 0, down_votes: int = 0, age: timedelta | None = None
+) -> Post:
+    post = Post.objects.create(
+        author=community.author,
+        community=community,
+        title=title,
+        content=title,
+        up_votes=up_votes,
+        down_votes=down_votes,
+    )
+    if age is not None:
+        post.created_at = timezone.now() - age
+        post.update_rank_fields()
+        Post.objects.filter(pk=post.pk).update(
+            created_at=post.created_at, hot_rank=post.hot_rank, top_rank=post.top_rank
+        )
+    return post
+
+
+def test_hot_rank_prefers_newer_posts_with_equal_score() -> None:
+    now = timezone.now()
+    assert ranking.hot_rank(10, 0, now) > ranking.hot_rank(10, 0, now - timedelta(hours=1))
+
+
+def test_hot_rank_score_is_logarithmic() -> None:
+    now = timezone.now()
+    day_old = now - timedelta(hours=12.5)
+    assert ranking.hot_rank(100, 0, day_old) == pytest.approx(ranking.hot_rank(10, 0, now))
+
+
+def test_controversial_rank() -> None:
+    assert ranking.controversial_rank(10, 0) == 0
+    assert ranking.controversial_rank(10, 10) == 20
+    assert ranking.controversial_rank(10, 10) > ranking.controversial_rank(19, 1)
+
+
+def test_rank_columns_follow_votes(post: Post, users: list[User]) -> None:
+    choices = [PostVote.UPVOTE, PostVote.DOWNVOTE, PostVote.UPVOTE]
+    for user, choice in zip(users, choices, strict=True):
+        post.vote(user, choice)
+    post.vote(users[1], PostVote.UPVOTE)
+
+    post.refresh_from_db()
+    assert (post.up_votes, post.down_votes) == (3, 0)
+    assert post.top_rank == 3
+    assert post.hot_rank == pytest.approx(ranking.hot_rank(3, 0, post.created_at))
+    assert post.controversial_rank == 0
+
+    post.vote(users[0], PostVote.DOWNVOTE)
+    post.refresh_from_db()
+    assert post.top_rank == 1
+    assert post.hot_rank == pytest.approx(ranking.hot_rank(2, 1, post.created_at))
+    assert post.controversial_rank == pytest.approx(ranking.controversial_rank(2, 1))
+
+
+def test_rank_posts_sorts(community: Community) -> None:
+    old_popular = make_post(community, "old popular", up_votes=500, age=timedelta(days=3))
+    fresh = make_post(community, "fresh", up_votes=2)
+    divisive = make_post(community, "divisive", up_votes=40, down_votes=38, age=timedelta(hours=2))
+    queryset = Post.objects.all()
+
+    assert list(ranking.rank_posts(queryset, ranking.HOT)) == [fresh, divisive, old_popular]
+    assert list(ranking.rank_posts(queryset, ranking.NEW)) == [fresh, divisive, old_popular]
+    assert list(ranking.rank_posts(queryset, ranking.TOP, "day")) == [divisive, fresh]
+    assert list(ranking.rank_posts(queryset, ranking.TOP, "all")) == [old_popular, divisive, fresh]
+    assert ranking.rank_posts(queryset, ranking.CONTROVERSIAL, "week").first() == divisive
+    assert list(ranking.rank_posts(queryset, "unknown", default=ranking.NEW)) == [fresh, divisive, old_popular]
+
+
+def test_rebuild_post_ranks(post: Post) -> None:
+    Post.objects.filter(pk=post.pk).update(up_votes=5, down_votes=2, hot_rank=0, top_rank=0)
+
+    call_command("rebuild_post_ranks", stdout=io.StringIO())
+
+    post.refresh_from_db()
+    assert post.top_rank == 3
+    assert post.hot_rank == pytest.approx(ranking.hot_rank(5, 2, post.created_at))
+
+
+def test_post_list_view_sort(client: Client, community: Community) -> None:
+    low = make_post(community, "low", up_votes=1, age=timedelta(hours=1))
+    high = make_post(community, "high", up_votes=50, age=timedelta(hours=2))
+
+    response = client.get(reverse("post-list"), {"sort": "top", "t": "day"})
+    assert response.status_code == 200
+    assert list(response.context["posts"]) == [high, low]
+    assert response.context["current_sort"] == ranking.TOP
+
+    response = client.get(reverse("post-list"), {"sort": "new"})
+    assert list(response.context["posts"]) == [low, high]
+
+
+def test_post_list_view_is_paginated(client: Client, community: Community) -> None:
+    for i in range(30):
+        make_post(community, f"post {i}")
+
+    response = client.get(reverse("post-list"))
+    assert len(response.context["posts"]) == 25
+    assert response.context["is_paginated"]
+
+
+def test_api_posts_sort(client: Client, public_community: Community) -> None:
+    low = make_post(public_community, "low", up_votes=1)
+    high = make_post(public_community, "high", up_votes=50)
+
+    response = client.get(reverse("api-posts-list-view"), {"sort": "top"})
+    assert [post["id"] for post in response.data["results"]] == [high.id, low.id]
+
+    response = client.get(reverse("api-posts-list-view"))
+    assert [post["id"] for post in response.data["results"]] == [high.id, low.id]
+
+    url = reverse("api-communities-posts-list", kwargs={"slug": public_community.slug})
+    response = client.get(url, {"sort": "top"})
+    assert [post["id"] for post in response.data["results"]] == [high.id, low.id]
@@ -0,0 +1,158 @@
+import pytest
+from django.conf import Settings
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import AnonymousUser
+from django.core import serializers
+from django.core.management import call_command
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import search
+from core.models import Community, CommunityMember, Post, SearchTerm
+from users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(params=["fts5", "inverted_index"], autouse=True)
+def backend(request: pytest.FixtureRequest, settings: Settings) -> str:
+    settings.SEARCH_BACKEND = request.param
+    return request.param
+
+
+@pytest.fixture()
+def posts(user: User, community: Community, private_community: Community) -> dict[str, Post]:
+    def create(community: Community, title: str, content: str) -> Post:
+        return Post.objects.create(author=user, community=community, title=title, content=content)
+
+    return {
+        "title": create(community, "Django performance", "Tips for faster pages"),
+        "content": create(community, "Tips", "Make Django faster with fewer queries and some caching"),
+        "other": create(community, "Gardening", "Tomatoes need sun"),
+        "private": create(private_community, "Private Django", "Only for members"),
+    }
+
+
+def titles(results: search.SearchResults) -> list[str]:
+    return [post.title for post in results[0:10]]
+
+
+def test_search_ranks_title_matches_first(posts: dict[str, Post]) -> None:
+    results = search.search("DJANGO", AnonymousUser())
+
+    assert titles(results) == ["Django performance", "Tips"]
+    assert results.count() == len(results) == 2
+    assert results[0:1][0].search_score > results[1:2][0].search_score > 0
+
+
+@pytest.mark.usefixtures("posts")
+def test_search_requires_every_term() -> None:
+    assert titles(search.search("django faster queries", AnonymousUser())) == ["Tips"]
+    assert titles(search.search("django tomatoes", AnonymousUser())) == []
+    assert titles(search.search('"django" OR NEAR(x', AnonymousUser())) == []
+    assert titles(search.search("   ", AnonymousUser())) == []
+
+
+def test_index_follows_post_changes(posts: dict[str, Post]) -> None:
+    gardening = posts["other"]
+    gardening.content = "Tomatoes and Django need sun"
+    gardening.save()
+    assert "Gardening" in titles(search.search("django", AnonymousUser()))
+
+    gardening.is_active = False
+    gardening.save()
+    assert "Gardening" not in titles(search.search("django", AnonymousUser()))
+
+    posts["title"].delete()
+    assert titles(search.search("django", AnonymousUser())) == ["Tips"]
+
+
+def test_bulk_created_posts_are_indexed(user: User, community: Community) -> None:
+    Post.objects.bulk_create(
+        [Post(author=user, community=community, title=f"Django {i}", content="x") for i in range(2)]
+    )
+
+    assert sorted(titles(search.search("django", AnonymousUser()))) == ["Django 0", "Django 1"]
+
+
+def test_loaded_fixtures_are_indexed_by_rebuild(posts: dict[str, Post]) -> None:
+    fixture = serializers.serialize("json", [posts["other"]])
+    posts["other"].delete()
+    for loaded in serializers.deserialize("json", fixture):
+        loaded.save()
+    assert titles(search.search("tomatoes", AnonymousUser())) == []
+
+    call_command("rebuild_search_index")
+    assert titles(search.search("tomatoes", AnonymousUser())) == ["Gardening"]
+
+
+def test_index_skips_terms_longer_than_the_column(user: User, community: Community) -> None:
+    long_term = "x" * (search.MAX_TERM_LENGTH + 1)
+    Post.objects.create(author=user, community=community, title="Django", content=long_term)
+
+    assert titles(search.search("django", AnonymousUser())) == ["Django"]
+    assert not SearchTerm.objects.filter(term=long_term).exists()
+
+
+def test_results_skip_posts_deactivated_after_ranking(posts: dict[str, Post], monkeypatch: pytest.MonkeyPatch) -> None:
+    results = search.search("django", AnonymousUser())
+    rank = results.backend.rank
+
+    def rank_then_deactivate(*args: object) -> list[tuple[int, float]]:
+        ranked = rank(*args)
+        Post.objects.filter(pk=posts["title"].pk).update(is_active=False)
+        return ranked
+
+    monkeypatch.setattr(results.backend, "rank", rank_then_deactivate)
+
+    assert titles(results) == ["Tips"]
+
+
+def test_search_follows_private_community_rules(
+    posts: dict[str, Post], another_user: User, private_community: Community, community: Community
+) -> None:
+    assert "Private Django" not in titles(search.search("django", another_user))
+
+    CommunityMember.objects.create(community=private_community, user=another_user)
+    assert "Private Django" in titles(search.search("django", another_user))
+    assert titles(search.search("django", another_user, private_community)) == ["Private Django"]
+    assert titles(search.search("django", AnonymousUser(), community)) == ["Django performance", "Tips"]
+    assert posts["private"].title not in titles(search.search("django", AnonymousUser()))
+
+
+@pytest.mark.usefixtures("posts")
+def test_search_api(private_community: Community) -> None:
+    client = APIClient()
+    response = client.get(reverse("api-search"), {"q": "django"})
+
+    assert response.status_code == 200
+    assert response.json()["count"] == 2
+    assert [post["title"] for post in response.json()["results"]] == ["Django performance", "Tips"]
+    assert response.json()["results"][0]["search_score"] > 0
+
+    response = client.get(reverse("api-search"), {"q": "django", "community": private_community.slug})
+    assert response.json()["count"] == 0
+    assert client.get(reverse("api-search"), {"q": "django", "community": "missing"}).status_code == 404
+    assert client.get(reverse("api-search"), {"q": "!!"}).status_code == 400
+
+
+@pytest.mark.usefixtures("posts")
+def test_rebuild_search_index(backend: str, capsys: pytest.CaptureFixture) -> None:
+    search.get_backend().clear()
+    assert titles(search.search("django", AnonymousUser())) == []
+
+    call_command("rebuild_search_index")
+
+    assert f"Indexed {Post.all_objects.count()} posts with the {backend} backend" in capsys.readouterr().out
+    assert titles(search.search("django", AnonymousUser())) == ["Django performance", "Tips"]
+
+
+def test_admin_searches_the_index(posts: dict[str, Post], admin_user: User) -> None:
+    request = RequestFactory().get("/")
+    request.user = admin_user
+    post_admin = site._registry[Post]  # noqa: SLF001
+
+    results, _ = post_admin.get_search_results(request, post_admin.get_queryset(request), "django")
+
+    assert set(results) == {posts["title"], posts["content"], posts["private"]}
@@ -0,0 +1,135 @@
+from collections.abc import Generator
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from freezegun import freeze_time
+from freezegun.api import FrozenDateTimeFactory
+from rest_framework.test import APIClient
+
+from core import trending
+from core.models import Post, Tag, TagUsage
+
+pytestmark = pytest.mark.django_db
+
+NOW = datetime(2026, 1, 15, 12, 2, tzinfo=UTC)
+
+
+@pytest.fixture()
+def frozen_time() -> Generator[FrozenDateTimeFactory, None, None]:
+    with freeze_time(NOW) as frozen_time:
+        yield frozen_time
+
+
+def usage(name: str, ago: timedelta, posts: int = 1) -> None:
+    TagUsage.objects.create(name=name, bucket=TagUsage.bucket_of(NOW - ago), posts=posts)
+
+
+def totals() -> dict[str, int]:
+    counts = {}
+    for name, posts in TagUsage.objects.values_list("name", "posts"):
+        counts[name] = counts.get(name, 0) + posts
+    return counts
+
+
+@pytest.mark.usefixtures("frozen_time")
+def test_usage_is_recorded_for_added_tags(post: Post) -> None:
+    post.content = "#python #django"
+    post.save()
+    post.content = "#python #rust"
+    post.save()
+    Post.objects.create(author=post.author, community=post.community, title="Post", content="#python")
+
+    assert totals() == {"python": 2, "django": 1, "rust": 1}
+    assert set(TagUsage.objects.values_list("bucket", flat=True)) == {datetime(2026, 1, 15, 12, 0, tzinfo=UTC)}
+
+
+def test_only_added_tags_are_counted(post: Post) -> None:
+    content_type = post.get_content_type()
+    # a concurrent save tagged the post first
+    Tag.objects.create(name="django", content_type=content_type, object_id=post.pk)
+
+    assert Tag.objects.add(["django", "python"], content_type, post.pk) == ["python"]
+    assert Tag.objects.filter(object_id=post.pk).count() == 2
+
+
+@pytest.mark.usefixtures("frozen_time")
+def test_trending_tags_scores_velocity_against_the_baseline() -> None:
+    usage("steady", timedelta(minutes=10), posts=5)
+    for day in range(1, 8):
+        usage("steady", timedelta(days=day, hours=1), posts=5)
+    usage("burst", timedelta(minutes=10), posts=4)
+    usage("burst", timedelta(days=3))
+    usage("fading", timedelta(days=2), posts=20)
+
+    tags = trending.trending_tags("24h")
+
+    assert [(tag.name, tag.posts, tag.expected) for tag in tags] == [("burst", 4, 1 / 7), ("steady", 5, 5.0)]
+    assert tags[0].score == pytest.approx((4 - 1 / 7) / (1 + 1 / 7) ** 0.5)
+    assert tags[1].score == 0
+    assert trending.trending_tags("24h", limit=1)[0].name == "burst"
+
+
+@pytest.mark.usefixtures("frozen_time")
+def test_trending_windows() -> None:
+    usage("hour", timedelta(minutes=30))
+    usage("day", timedelta(hours=5))
+    usage("week", timedelta(days=5))
+
+    assert [tag.name for tag in trending.trending_tags("1h")] == ["hour"]
+    assert [tag.name for tag in trending.trending_tags("24h")] == ["day", "hour"]
+    assert [tag.name for tag in trending.trending_tags("7d")] == ["day", "hour", "week"]
+
+
+def test_compact_merges_aging_buckets(frozen_time: FrozenDateTimeFactory) -> None:
+    for minutes in range(5, 125, 5):
+        usage("python", timedelta(days=2, minutes=minutes))
+    for hours in range(1, 48, 6):
+        usage("python", timedelta(days=10, hours=hours), posts=2)
+    usage("python", timedelta(hours=2, minutes=10))
+    usage("expired", timedelta(days=60))
+    before = trending.trending_tags("7d")
+
+    removed, written = trending.compact()
+
+    assert totals() == {"python": 24 + 16 + 1}
+    assert (removed, written) == (1 + 24 + 8, 3 + 2)
+    assert TagUsage.objects.count() == 1 + 3 + 2
+    assert trending.trending_tags("7d") == before
+    assert trending.compact() == (0, 0)
+
+    frozen_time.tick(timedelta(days=2))
+    assert trending.compact() == (1, 1)
+
+
+@pytest.mark.usefixtures("frozen_time")
+def test_compact_tag_usage_command(capsys: pytest.CaptureFixture) -> None:
+    usage("python", timedelta(days=2, minutes=10))
+    usage("python", timedelta(days=2, minutes=15))
+
+    call_command("compact_tag_usage")
+
+    assert "Compacted tag usage: removed 2 rows, wrote 1 rows" in capsys.readouterr().out
+
+
+@pytest.mark.usefixtures("frozen_time")
+def test_trending_tags_api() -> None:
+    client = APIClient()
+    usage("python", timedelta(minutes=10), posts=3)
+    usage("django", timedelta(minutes=10))
+    usage("rust", timedelta(hours=3))
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse("api-trending-tags"), {"window": "1h", "limit": 1})
+
+    assert response.status_code == 200
+    assert response.json() == [{"name": "python", "posts": 3, "expected": 0.0, "score": 3.0}]
+    assert len(queries) == 1
+    assert '"core_tag"' not in queries[0]["sql"]
+
+    assert [tag["name"] for tag in client.get(reverse("api-trending-tags")).json()] == ["python", "django", "rust"]
+    assert client.get(reverse("api-trending-tags"), {"window": "1y"}).status_code == 400
+    assert client.get(reverse("api-trending-tags"), {"limit": "many"}).status_code == 400
@@ -0,0 +1,116 @@
+from collections.abc import Generator
+
+import pytest
+from django.conf import Settings
+from django.test import Client
+from django.urls import reverse
+from freezegun import freeze_time
+from pytest_django import DjangoAssertNumQueries
+
+from core.models import Post
+from core.view_counter import ViewCounter, view_counter
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture()
+def counter(settings: Settings) -> ViewCounter:
+    settings.DISPLAY_COUNTER_FLUSH_THRESHOLD = 100
+    settings.DISPLAY_COUNTER_FLUSH_INTERVAL_SECONDS = 60
+    return ViewCounter()
+
+
+@pytest.fixture()
+def buffered_views(settings: Settings) -> Generator[ViewCounter, None, None]:
+    settings.DISPLAY_COUNTER_BUFFERING_ENABLED = True
+    settings.DISPLAY_COUNTER_FLUSH_THRESHOLD = 100
+    settings.DISPLAY_COUNTER_FLUSH_INTERVAL_SECONDS = 60
+    view_counter.flush()
+    yield view_counter
+    view_counter.pending.clear()
+
+
+def display_counters(*posts: Post) -> list[int]:
+    return [Post.all_objects.get(pk=post.pk).display_counter for post in posts]
+
+
+def test_flush_writes_all_posts_in_one_query(
+    counter: ViewCounter, post: Post, post2: Post, django_assert_num_queries: DjangoAssertNumQueries
+) -> None:
+    with django_assert_num_queries(0):
+        for _ in range(3):
+            counter.add(post.pk)
+        counter.add(post2.pk)
+
+    with django_assert_num_queries(1):
+        assert counter.flush() == 2
+
+    assert display_counters(post, post2) == [3, 1]
+    assert counter.flush() == 0
+
+
+def test_flush_on_threshold(counter: ViewCounter, settings: Settings, post: Post) -> None:
+    settings.DISPLAY_COUNTER_FLUSH_THRESHOLD = 3
+    counter.add(post.pk)
+    counter.add(post.pk)
+    assert display_counters(post) == [0]
+
+    counter.add(post.pk)
+
+    assert display_counters(post) == [3]
+    assert not counter.pending
+
+
+def test_flush_on_interval(post: Post, settings: Settings) -> None:
+    settings.DISPLAY_COUNTER_FLUSH_THRESHOLD = 100
+    settings.DISPLAY_COUNTER_FLUSH_INTERVAL_SECONDS = 10
+    with freeze_time() as frozen_time:
+        counter = ViewCounter()
+        counter.add(post.pk)
+        assert display_counters(post) == [0]
+
+        frozen_time.tick(11)
+        counter.add(post.pk)
+
+    assert display_counters(post) == [2]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_idle_worker_flushes_on_interval(post: Post, settings: Settings) -> None:
+    settings.DISPLAY_COUNTER_FLUSH_THRESHOLD = 100
+    settings.DISPLAY_COUNTER_FLUSH_INTERVAL_SECONDS = 0.2
+    counter = ViewCounter()
+    counter.add(post.pk)
+    timer = counter.timer
+
+    # no further view arrives, the background timer writes the count
+    timer.join(timeout=5)
+
+    assert display_counters(post) == [1]
+    assert counter.timer is None
+
+
+def test_post_detail_buffers_views(client: Client, post: Post, buffered_views: ViewCounter) -> None:
+    client.get(reverse("post-detail", kwargs={"pk": post.pk}))
+    client.get(reverse("post-detail", kwargs={"pk": post.pk}))
+    assert display_counters(post) == [0]
+
+    buffered_views.flush()
+
+    assert display_counters(post) == [2]
+
+
+def test_post_detail_dedupes_session_views(client: Client, settings: Settings, post: Post, post2: Post) -> None:
+    settings.DISPLAY_COUNTER_SESSION_DEDUPE_SECONDS = 60
+    with freeze_time() as frozen_time:
+        for _ in range(3):
+            client.get(reverse("post-detail", kwargs={"pk": post.pk}))
+        client.get(reverse("post-detail", kwargs={"pk": post2.pk}))
+        assert display_counters(post, post2) == [1, 1]
+
+        frozen_time.tick(61)
+        client.get(reverse("post-detail", kwargs={"pk": post.pk}))
+
+    assert display_counters(post, post2) == [2, 1]
+    assert Client().get(reverse("post-detail", kwargs={"pk": post.pk})).status_code == 200
+    assert display_counters(post) == [3]
@@ -12,7 +12,19 @@ from django.urls import reverse, reverse_lazy
 from faker import Faker
 from PIL import Image
 
-from core.models import BAN, DELETE, DISMISS_REPORT, WARN, Community, CommunityMember, Post, PostReport
+from core.models import (
+    BAN,
+    DELETE,
+    DISMISS_REPORT,
+    WARN,
+    BufferedVote,
+    Community,
+    CommunityMember,
+    Post,
+    PostReport,
+    PostVote,
+    SavedPost,
+)
 
 from .test_utils import generate_random_password
 
@@ -198,9 +210,9 @@ def test_add_comment_valid(client: Client, user: User, post: Post) -> None:
     assert post.get_comments().count() == 0
     response = client.post(reverse("post-detail", kwargs={"pk": post.pk}), data=data, follow=True)
     assert response.status_code == 200
+    post.refresh_from_db()
     assert post.children_count == 1
     assert post.get_comments().count() == 1
-    post.refresh_from_db()
     assert response.context["comments"][0].author == user
     assert response.context["comments"][0].content == data["content"]
 
@@ -338,6 +350,7 @@ def test_add_nested_comment_valid(client: Client, user: User, post: Post, commen
         "content": "This is a test nested comment content.",
     }
     client.force_login(user)
+    post.refresh_from_db()
     assert post.children_count == 1
     assert post.get_comments().count() == 1
     assert comment.children_count == 0
@@ -573,3 +586,60 @@ def test_remove_non_existing_moderator(client: Client, community: Community, use
 
     messages = list(response.context["messages"])
     assert any("User is not a moderator of this community." in message.message for message in messages)
+
+
+def test_vote_view_applies_vote(client: Client, user: User, post: Post) -> None:
+    client.force_login(user)
+    response = client.post(reverse("post-vote", kwargs={"pk": post.pk, "vote_type": "up"}))
+    assert response.status_code == 302
+    post.refresh_from_db()
+    assert post.up_votes == 1
+    assert not BufferedVote.objects.exists()
+
+
+def test_vote_view_buffers_vote(client: Client, user: User, post: Post, settings: Settings) -> None:
+    settings.VOTE_BUFFERING_ENABLED = True
+    client.force_login(user)
+    response = client.post(reverse("post-vote", kwargs={"pk": post.pk, "vote_type": "down"}))
+    assert response.status_code == 302
+    post.refresh_from_db()
+    assert post.down_votes == 0
+    assert BufferedVote.objects.get().choice == PostVote.DOWNVOTE
+
+
+def test_post_list_shows_saved_and_voted_state(client: Client, user: User, post: Post) -> None:
+    SavedPost.save_post(user=user, post=post)
+    post.vote(user=user, choice=PostVote.UPVOTE)
+    client.force_login(user)
+
+    response = client.get(reverse("post-list"))
+
+    listed = response.context["posts"][0]
+    assert (listed.saved_by_user, listed.user_vote) == (True, "up")
+    assert f'id="unsave-form-{post.pk}"' in response.content.decode()
+    assert "up-vote btn-left-circular btn-sm btn-secondary-dark active" in response.content.decode()
+
+
+def test_tag_post_list(client: Client, user: User, post: Post) -> None:
+    tagged = Post.objects.create(author=user, community=post.community, title="Tagged", content="About #django")
+    Post.objects.create(author=user, community=post.community, parent=post, content="A #django comment")
+    Post.objects.create(author=user, community=post.community, title="Other", content="About #python")
+
+    response = client.get(reverse("tag-posts", kwargs={"name": "django"}))
+
+    assert list(response.context["posts"]) == [tagged]
+    assert "#django" in response.content.decode()
+
+
+def test_post_detail_shows_comment_saved_state(client: Client, user: User, post: Post) -> None:
+    comment = Post.objects.create(author=user, community=post.community, parent=post, content="Comment")
+    reply = Post.objects.create(author=user, community=post.community, parent=comment, content="Reply")
+    SavedPost.save_post(user=user, post=reply)
+    client.force_login(user)
+
+    response = client.get(reverse("post-detail", kwargs={"pk": post.pk}))
+
+    content = response.content.decode()
+    assert f'id="save-form-{post.pk}"' in content
+    assert f'id="save-form-{comment.pk}"' in content
+    assert f'id="unsave-form-{reply.pk}"' in content
@@ -0,0 +1,94 @@
+"""Trending hashtags over sliding windows, read from the ``TagUsage`` aggregates instead of the ``Tag`` table.
+
+A tag trends when it was added to more posts in the window than expected from its baseline, the average of
+``TRENDING_TAGS_BASELINE_WINDOWS`` windows of the same length before it. Tags are ranked by
+``(posts - expected) / sqrt(expected + 1)``, so both a burst of a rare tag and a rise of a common one count.
+Windows are exact to the ``TRENDING_TAGS_BUCKET_MINUTES`` bucket for the first day and to the compacted
+buckets (see ``compact``) after that.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, FloatField, Q, Sum
+from django.db.models.functions import Cast, Coalesce, Sqrt
+from django.utils import timezone
+
+from core.models import TagUsage
+
+WINDOWS = {
+    "1h": timedelta(hours=1),
+    "24h": timedelta(days=1),
+    "7d": timedelta(days=7),
+}
+DEFAULT_WINDOW = "24h"
+
+# (age, bucket size): rows older than the age are merged into buckets of the size, coarse enough for the
+# windows whose baseline reaches that far back
+ROLLUPS = (
+    (timedelta(days=1), timedelta(hours=1)),
+    (timedelta(days=8), timedelta(days=1)),
+)
+
+
+@dataclass
+class TrendingTag:
+    name: str
+    posts: int
+    expected: float
+    score: float
+
+
+def retention() -> timedelta:
+    return max(WINDOWS.values()) * (1 + settings.TRENDING_TAGS_BASELINE_WINDOWS)
+
+
+def trending_tags(window: str = DEFAULT_WINDOW, limit: int = 10, now: datetime | None = None) -> list[TrendingTag]:
+    now = now or timezone.now()
+    length = WINDOWS[window]
+    baseline_windows = settings.TRENDING_TAGS_BASELINE_WINDOWS
+    start = TagUsage.bucket_of(now - length)
+    in_window = Q(bucket__gte=start)
+    expected = Cast(Coalesce(Sum("posts", filter=~in_window), 0), FloatField()) / baseline_windows
+    rows = (
+        TagUsage.objects.filter(bucket__gte=TagUsage.bucket_of(now - length * (1 + baseline_windows)))
+        .values("name")
+        .annotate(posts_in_window=Coalesce(Sum("posts", filter=in_window), 0), expected=expected)
+        .filter(posts_in_window__gt=0)
+        .annotate(score=(F("posts_in_window") - F("expected")) / Sqrt(F("expected") + 1))
+        .order_by("-score", "-posts_in_window", "name")[:limit]
+    )
+    return [TrendingTag(row["name"], row["posts_in_window"], row["expected"], row["score"]) for row in rows]
+
+
+def compact(now: datetime | None = None, batch_size: int = 1000) -> tuple[int, int]:
+    """Drop rows past the retention and merge aging rows per tag and coarser bucket.
+
+    Return the number of rows removed and of merged rows written.
+    """
+    now = now or timezone.now()
+    removed = written = 0
+    with transaction.atomic():
+        removed += TagUsage.objects.filter(bucket__lt=now - retention()).delete()[0]
+        for age, size in ROLLUPS:
+            merged = defaultdict(list)
+            for row in TagUsage.objects.filter(bucket__lt=now - age).values_list("id", "name", "bucket", "posts"):
+                merged[row[1], TagUsage.bucket_of(row[2], size)].append(row)
+            # a single row already at the start of its coarser bucket is left alone
+            merged = {key: rows for key, rows in merged.items() if len(rows) > 1 or rows[0][2] != key[1]}
+            ids = [row[0] for rows in merged.values() for row in rows]
+            for offset in range(0, len(ids), batch_size):
+                removed += TagUsage.objects.filter(id__in=ids[offset : offset + batch_size]).delete()[0]
+            written += len(
+                TagUsage.objects.bulk_create(
+                    [
+                        TagUsage(name=name, bucket=bucket, posts=sum(row[3] for row in rows))
+                        for (name, bucket), rows in merged.items()
+                    ],
+                    batch_size=batch_size,
+                )
+            )
+    return removed, written
@@ -1,6 +1,7 @@
 from django.urls import include, path
 
 from .views import (
+    CommentRepliesView,
     CommunityCreateView,
     CommunityDetailView,
     CommunityListView,
@@ -14,11 +15,14 @@ from .views import (
     PostReportView,
     PostSaveView,
     PostVoteView,
+    TagPostListView,
 )
 
 urlpatterns = [
     path("post-list/", PostListView.as_view(), name="post-list"),
+    path("tag/<str:name>/", TagPostListView.as_view(), name="tag-posts"),
     path("post-detail/<int:pk>/", PostDetailView.as_view(), name="post-detail"),
+    path("post/<int:pk>/comments/", CommentRepliesView.as_view(), name="comment-replies"),
     path("post-create/", PostCreateView.as_view(), name="post-create"),
     path("post/<int:pk>/vote/<str:vote_type>/", PostVoteView.as_view(), name="post-vote"),
     path("post/<int:pk>/award/", PostAwardCreateView.as_view(), name="post-award"),
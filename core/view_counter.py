@@ -0,0 +1,72 @@
+"""Coalesced ``Post.display_counter`` writes.
+
+With ``DISPLAY_COUNTER_BUFFERING_ENABLED`` post views are counted in process memory and written as one
+``UPDATE`` for all pending posts once ``DISPLAY_COUNTER_FLUSH_THRESHOLD`` views piled up or
+``DISPLAY_COUNTER_FLUSH_INTERVAL_SECONDS`` passed, instead of one write of the hottest rows per page view, see
+``core.write_buffer``. Every worker process keeps its own counts, increments are additive so they flush
+independently. Counts still pending when a process is killed are lost, which is acceptable for a view counter.
+"""
+
+import atexit
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Case, F, IntegerField, Value, When
+from django.http import HttpRequest
+
+from core.models import Post
+from core.write_buffer import WriteBuffer
+
+VIEWED_POSTS_SESSION_KEY = "viewed_posts"
+
+
+class ViewCounter(WriteBuffer):
+    threshold_setting = "DISPLAY_COUNTER_FLUSH_THRESHOLD"
+    interval_setting = "DISPLAY_COUNTER_FLUSH_INTERVAL_SECONDS"
+
+    def empty(self: "ViewCounter") -> Counter:
+        return Counter()
+
+    def record(self: "ViewCounter", post_id: int) -> None:
+        self.pending[post_id] += 1
+
+    def size(self: "ViewCounter") -> int:
+        return self.pending.total()
+
+    def write(self: "ViewCounter", pending: Counter) -> None:
+        """Write the pending increments of every post in one statement."""
+        increment = Case(
+            *(When(pk=post_id, then=Value(views)) for post_id, views in pending.items()),
+            output_field=IntegerField(),
+        )
+        Post.all_objects.filter(pk__in=pending).update(display_counter=F("display_counter") + increment)
+
+
+view_counter = ViewCounter()
+atexit.register(view_counter.flush)
+
+
+def is_repeat_view(request: HttpRequest, post_id: int) -> bool:
+    """Remember the view in the session, a view of the same post within the dedupe window is a repeat."""
+    window = settings.DISPLAY_COUNTER_SESSION_DEDUPE_SECONDS
+    if not window or not hasattr(request, "session"):
+        return False
+    now = time.time()
+    stored = request.session.get(VIEWED_POSTS_SESSION_KEY, {})
+    viewed = {key: viewed_at for key, viewed_at in stored.items() if now - viewed_at < window}
+    repeat = str(post_id) in viewed
+    if not repeat:
+        viewed[str(post_id)] = now
+    if viewed != stored:
+        request.session[VIEWED_POSTS_SESSION_KEY] = viewed
+    return repeat
+
+
+def record_view(request: HttpRequest, post: Post) -> None:
+    if is_repeat_view(request, post.pk):
+        return
+    if settings.DISPLAY_COUNTER_BUFFERING_ENABLED:
+        view_counter.add(post.pk)
+    else:
+        post.update_display_counter()
@@ -1,6 +1,8 @@
+from collections.abc import Iterator
 from typing import Any
 
 from django import forms
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
@@ -8,13 +10,14 @@ from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
 from django.db import models
 from django.db.models import Exists, OuterRef, QuerySet
 from django.http import Http404, HttpRequest, HttpResponse, HttpResponseRedirect
-from django.shortcuts import get_object_or_404, redirect
+from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.urls import reverse_lazy
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.generic import CreateView, DetailView, ListView, UpdateView
 
+from . import comment_tree, community_cache, ranking
 from .forms import (
     AddModeratorForm,
     AdminActionForm,
@@ -25,16 +28,63 @@ from .forms import (
     PostReportForm,
     RemoveModeratorForm,
 )
-from .models import AdminAction, Community, CommunityMember, Post, PostAward, PostReport, PostVote, SavedPost
+from .models import (
+    AdminAction,
+    BufferedVote,
+    Community,
+    CommunityMember,
+    Post,
+    PostAward,
+    PostReport,
+    PostVote,
+    SavedPost,
+)
 from .services import handle_admin_action
+from .view_counter import record_view
+
+
+def walk_comment_tree(comments: list[Post]) -> Iterator[Post]:
+    stack = list(reversed(comments))
+    while stack:
+        comment = stack.pop()
+        yield comment
+        stack.extend(reversed(comment.replies))
 
 
 class PostListView(ListView):
     template_name = "core/post-list.html"
     context_object_name = "posts"
+    paginate_by = 25
+
+    def get_sort(self: "PostListView") -> str:
+        sort = self.request.GET.get("sort")
+        return sort if sort in ranking.SORTS else ranking.HOT
 
     def get_queryset(self: "PostListView") -> models.QuerySet:
-        return Post.objects.filter(parent=None, is_active=True)
+        queryset = Post.objects.filter(parent=None, is_active=True).cards(preview=True)
+        return ranking.rank_posts(queryset, self.get_sort(), self.request.GET.get("t"))
+
+    def get_context_data(self: "PostListView", **kwargs: dict[str, Any]) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context["sorts"] = ranking.SORTS
+        context["current_sort"] = self.get_sort()
+        context["current_window"] = self.request.GET.get("t", "")
+        Post.attach_user_state(context["posts"], self.request.user)
+        Post.attach_awards(context["posts"])
+        return context
+
+
+class TagPostListView(PostListView):
+    """Posts tagged with a hashtag, sorted like the front page."""
+
+    def get_queryset(self: "TagPostListView") -> models.QuerySet:
+        queryset = Post.objects.tagged(self.kwargs["name"]).filter(parent=None).cards(preview=True)
+        return ranking.rank_posts(queryset, self.get_sort(), self.request.GET.get("t"))
+
+    def get_context_data(self: "TagPostListView", **kwargs: dict[str, Any]) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context["tag"] = self.kwargs["name"]
+        return context
 
 
 @method_decorator(login_required, name="post")
@@ -43,24 +93,30 @@ class PostDetailView(DetailView):
     template_name = "core/post-detail.html"
     context_object_name = "post"
 
+    def get_queryset(self: "PostDetailView") -> QuerySet[Post]:
+        return super().get_queryset().cards()
+
     def get_object(self: "Post", queryset: QuerySet[Post] | None = None) -> Post:
         obj = super().get_object(queryset=queryset)
         if not obj.is_active:
             self.template_name = "core/post-inactive.html"
         else:
-            obj.update_display_counter()
+            record_view(self.request, obj)
         return obj
 
     def get_context_data(self: "PostDetailView", **kwargs: dict[str, Any]) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        comments = self.object.get_comments()
+        comments = comment_tree.load(self.object)
+        posts = [self.object, *walk_comment_tree(comments)]
+        Post.attach_user_state(posts, self.request.user)
+        Post.attach_awards(posts)
 
         context["comments"] = comments
         context["form"] = self.object.get_comment_form()
         return context
 
     def post(self: "PostDetailView", request: HttpRequest, pk: int) -> HttpResponse:
-        post = get_object_or_404(Post, id=pk)
+        post = get_object_or_404(Post.objects.cards(), id=pk)
         form = CommentForm(request.POST)
         if form.is_valid():
             parent_id = form.cleaned_data.get("parent_id")
@@ -68,7 +124,10 @@ class PostDetailView(DetailView):
             Post.objects.create(parent_id=parent_id, community=post.community, content=content, author=request.user)
             return redirect(reverse_lazy("post-detail", kwargs={"pk": pk}))
 
-        comments = post.get_comments()
+        comments = comment_tree.load(post)
+        posts = [post, *walk_comment_tree(comments)]
+        Post.attach_user_state(posts, request.user)
+        Post.attach_awards(posts)
         context = {
             "post": post,
             "comments": comments,
@@ -78,6 +137,28 @@ class PostDetailView(DetailView):
         return HttpResponse(html_content)
 
 
+class CommentRepliesView(View):
+    """The next slice of the comments below a post or comment, as a fragment for the "load more replies" links."""
+
+    template_name = "core/comments_tree.html"
+
+    def get(self: "CommentRepliesView", request: HttpRequest, pk: int) -> HttpResponse:
+        parent = get_object_or_404(Post.objects.select_related("community"), pk=pk)
+        community = parent.community
+        if community.privacy == Community.PRIVATE and community_cache.get_role(community.pk, request.user.id) is None:
+            raise PermissionDenied
+        try:
+            comments = comment_tree.load(parent, request.GET.get("after"))
+        except ValueError:
+            raise Http404 from None
+        Post.attach_user_state(walk_comment_tree(comments), request.user)
+        Post.attach_awards(walk_comment_tree(comments))
+        # the fragment lands on the post detail page, votes and saves return there and not to the fragment
+        root_id = parent.ancestor_ids[0] if parent.parent_id is not None else parent.pk
+        next_url = reverse_lazy("post-detail", kwargs={"pk": root_id})
+        return render(request, self.template_name, {"comments": comments, "parent": parent, "next_url": next_url})
+
+
 class PostCreateView(LoginRequiredMixin, CreateView):
     model = Post
     form_class = PostForm
@@ -105,10 +186,11 @@ class PostCreateView(LoginRequiredMixin, CreateView):
 class PostVoteView(LoginRequiredMixin, View):
     def post(self: "PostVoteView", request: HttpRequest, pk: int, vote_type: str) -> HttpResponse:
         post = get_object_or_404(Post, pk=pk)
-        if vote_type == "up":
-            post.vote(request.user, PostVote.UPVOTE)
-        elif vote_type == "down":
-            post.vote(request.user, PostVote.DOWNVOTE)
+        choice = PostVote.VOTE_TYPES.get(vote_type)
+        if choice and settings.VOTE_BUFFERING_ENABLED:
+            BufferedVote.objects.create(user=request.user, post=post, choice=choice)
+        elif choice:
+            post.vote(request.user, choice)
 
         next_url = request.POST.get("next") or request.GET.get("next")
         if next_url:
@@ -216,18 +298,19 @@ class CommunityDetailView(DetailView):
     def get_object(self: "CommunityDetailView") -> Community:
         error_message = "Community does not exist"
         try:
-            community = Community.objects.get(slug=self.kwargs["slug"])
+            community = community_cache.get_community(self.kwargs["slug"])
         except ObjectDoesNotExist:
             raise Http404(error_message) from None
-        if community.privacy == "30_PRIVATE" and not community.members.filter(id=self.request.user.id).exists():
+        if community.privacy == "30_PRIVATE" and community_cache.get_role(community.pk, self.request.user.id) is None:
             raise PermissionDenied
         return community
 
     def get_context_data(self: "CommunityDetailView", **kwargs: any) -> dict[str, any]:
         context = super().get_context_data(**kwargs)
-        community = self.get_object()
+        community = self.object
         user = self.request.user
 
+        context["is_member"] = community_cache.get_role(community.pk, user.pk) is not None
         if user.is_authenticated:
             context["is_admin_or_moderator"] = community.is_admin_or_moderator(user)
             if context["is_admin_or_moderator"]:
@@ -0,0 +1,76 @@
+"""Process local buffer of pending writes, written in one go instead of one statement per request.
+
+A buffer is flushed once the threshold setting is reached or the interval setting passed. The interval is checked
+by the next ``add`` and by a background timer started with the first pending entry, so a worker that goes idle
+writes its entries too. Whatever is still pending is written when the process exits, where the owning module
+registers ``flush`` with ``atexit``.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Hashable, Sized
+
+from django.conf import settings
+from django.db import connections
+
+
+class WriteBuffer(ABC):
+    threshold_setting: str
+    interval_setting: str
+
+    def __init__(self: "WriteBuffer") -> None:
+        self.lock = threading.Lock()
+        self.pending = self.empty()
+        self.last_flush = time.monotonic()
+        self.timer = None
+
+    @abstractmethod
+    def empty(self: "WriteBuffer") -> Sized:
+        """Return the container collecting the pending entries."""
+
+    @abstractmethod
+    def record(self: "WriteBuffer", key: Hashable) -> None:
+        """Store the entry in ``self.pending``, called with the lock held."""
+
+    @abstractmethod
+    def write(self: "WriteBuffer", pending: Sized) -> None:
+        """Write the flushed entries to the database."""
+
+    def size(self: "WriteBuffer") -> int:
+        return len(self.pending)
+
+    def add(self: "WriteBuffer", key: Hashable) -> None:
+        interval = getattr(settings, self.interval_setting)
+        with self.lock:
+            self.record(key)
+            due = (
+                self.size() >= getattr(settings, self.threshold_setting)
+                or time.monotonic() - self.last_flush >= interval
+            )
+            if not due and self.timer is None:
+                # an idle worker gets no later add to notice that the interval passed
+                self.timer = threading.Timer(interval, self.flush_in_background)
+                self.timer.daemon = True
+                self.timer.start()
+        if due:
+            self.flush()
+
+    def flush_in_background(self: "WriteBuffer") -> None:
+        try:
+            self.flush()
+        finally:
+            connections.close_all()
+
+    def flush(self: "WriteBuffer") -> int:
+        """Write every pending entry, return their number."""
+        with self.lock:
+            pending, self.pending = self.pending, self.empty()
+            self.last_flush = time.monotonic()
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if not pending:
+            return 0
+        self.write(pending)
+        return len(pending)
@@ -53,6 +53,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.query_inspector.QueryInspectorMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -150,6 +151,41 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 
 LAST_ACTIVITY_ONLINE_LIMIT_MINUTES = 15
+# last_activity is written at most once per interval per user, requests in between skip the write
+LAST_ACTIVITY_UPDATE_INTERVAL_SECONDS = 60
+# Batched last activity writes, see users/middleware/update_last_activity.py
+LAST_ACTIVITY_BUFFERING_ENABLED = config("LAST_ACTIVITY_BUFFERING_ENABLED", default=False, cast=bool)
+LAST_ACTIVITY_FLUSH_INTERVAL_SECONDS = 10
+LAST_ACTIVITY_FLUSH_THRESHOLD = 500
+# Per community online counts kept in the cache in time buckets, see core/presence.py
+PRESENCE_INDEX_ENABLED = config("PRESENCE_INDEX_ENABLED", default=False, cast=bool)
+PRESENCE_BUCKET_SECONDS = 60
+
+# Read-through cache of community rows and member roles, see core/community_cache.py
+COMMUNITY_CACHE_ENABLED = config("COMMUNITY_CACHE_ENABLED", default=False, cast=bool)
+COMMUNITY_CACHE_TIMEOUT_SECONDS = 60
+COMMUNITY_CACHE_MAX_ENTRIES = 10000
+
+# Trending hashtags, see core/trending.py. Velocity is measured against the average of this many windows
+# before the requested one.
+TRENDING_TAGS_BUCKET_MINUTES = 5
+TRENDING_TAGS_BASELINE_WINDOWS = 7
+
+# Post search, see core/search.py: "fts5" (SQLite only), "inverted_index" or "auto" for FTS5 when available
+SEARCH_BACKEND = config("SEARCH_BACKEND", default="auto")
+
+# Comments shown per post detail page and "load more replies" slice, see core/comment_tree.py
+COMMENT_TREE_MAX_COMMENTS = 200
+COMMENT_TREE_MAX_DEPTH = 5
+
+# Rendered post headers and footers cached per post state, see core/templatetags/post_cards.py
+POST_CARD_CACHE_ENABLED = config("POST_CARD_CACHE_ENABLED", default=False, cast=bool)
+POST_CARD_CACHE_TIMEOUT_SECONDS = 3600
+
+# Fan-out-on-write home feeds, see core/home_feed.py
+HOME_FEED_MAX_ITEMS = 500
+HOME_FEED_FANOUT_MAX_MEMBERS = 10000
+HOME_FEED_BACKFILL_ITEMS = 50
 
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = config("EMAIL_HOST", default="smtp.gmail.com")
@@ -159,7 +195,30 @@ EMAIL_HOST_USER = config("EMAIL_HOST_USER", default="default@email.com")
 EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD", default="password")
 
 LIMIT_WARNINGS = 5
+
+# Buffered vote ingestion: votes land in core.BufferedVote and are applied by `manage.py flush_votes`
+VOTE_BUFFERING_ENABLED = config("VOTE_BUFFERING_ENABLED", default=False, cast=bool)
+VOTE_BUFFER_FLUSH_INTERVAL_SECONDS = config("VOTE_BUFFER_FLUSH_INTERVAL_SECONDS", default=5, cast=float)
+VOTE_BUFFER_FLUSH_BATCH_SIZE = 5000
+
+# Coalesced post view counting, see core/view_counter.py
+DISPLAY_COUNTER_BUFFERING_ENABLED = config("DISPLAY_COUNTER_BUFFERING_ENABLED", default=False, cast=bool)
+DISPLAY_COUNTER_FLUSH_INTERVAL_SECONDS = config("DISPLAY_COUNTER_FLUSH_INTERVAL_SECONDS", default=10, cast=float)
+DISPLAY_COUNTER_FLUSH_THRESHOLD = 1000
+# repeat views of a post from the same session within this many seconds are not counted, 0 counts every view
+DISPLAY_COUNTER_SESSION_DEDUPE_SECONDS = config("DISPLAY_COUNTER_SESSION_DEDUPE_SECONDS", default=0, cast=int)
+
+# Per request SQL recording, logs query shapes repeated more than the threshold (likely N+1 queries)
+QUERY_INSPECTOR_ENABLED = config("QUERY_INSPECTOR_ENABLED", default=False, cast=bool)
+QUERY_INSPECTOR_REPEAT_THRESHOLD = 5
 LOGIN_URL = reverse_lazy("login")
 
 REST_FRAMEWORK = {"DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination", "PAGE_SIZE": 10}
+# API responses encoded with orjson when the fast-json extra is installed, see core/renderers.py
+API_FAST_JSON_RENDERER = config("API_FAST_JSON_RENDERER", default=False, cast=bool)
+if API_FAST_JSON_RENDERER:
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = [
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ]
 DEFAULT_AVATAR_URL = "/media/users_avatars/default.png"
@@ -1,16 +1,61 @@
+import atexit
 from collections.abc import Callable
+from datetime import datetime
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.http import HttpRequest, HttpResponse
+from django.utils import timezone
+
+from core import presence
+from core.write_buffer import WriteBuffer
 
 User = get_user_model()
 
 
+class LastActivityBuffer(WriteBuffer):
+    """Process local last activity of users, written for all of them in one statement, see ``core.write_buffer``."""
+
+    threshold_setting = "LAST_ACTIVITY_FLUSH_THRESHOLD"
+    interval_setting = "LAST_ACTIVITY_FLUSH_INTERVAL_SECONDS"
+
+    def empty(self: "LastActivityBuffer") -> dict[int, datetime]:
+        return {}
+
+    def record(self: "LastActivityBuffer", user_id: int) -> None:
+        self.pending[user_id] = timezone.now()
+
+    def get(self: "LastActivityBuffer", user_id: int) -> datetime | None:
+        """Return the activity of the user waiting for the flush, if any."""
+        with self.lock:
+            return self.pending.get(user_id)
+
+    def write(self: "LastActivityBuffer", pending: dict[int, datetime]) -> None:
+        User.bulk_update_last_activity(pending)
+
+
+last_activity_buffer = LastActivityBuffer()
+atexit.register(last_activity_buffer.flush)
+
+
 class UpdateLastActivityMiddleware:
     def __init__(self: "UpdateLastActivityMiddleware", get_response: Callable) -> None:
         self.get_response = get_response
 
     def __call__(self: "UpdateLastActivityMiddleware", request: HttpRequest) -> HttpResponse:
-        if request.user.is_authenticated:
-            request.user.update_last_activity()
+        user = request.user
+        if not user.is_authenticated:
+            return self.get_response(request)
+        buffering = settings.LAST_ACTIVITY_BUFFERING_ENABLED
+        if buffering:
+            # the row stays stale until the flush, the buffered activity tells whether it is recent
+            user.last_activity = last_activity_buffer.get(user.pk) or user.last_activity
+        # the user row is already loaded for authentication, so a recent last_activity costs no query to skip
+        if user.is_last_activity_stale:
+            if buffering:
+                last_activity_buffer.add(user.pk)
+                user.last_activity = timezone.now()
+            else:
+                user.update_last_activity()
+            presence.record_activity(user.pk)
         return self.get_response(request)
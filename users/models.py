@@ -1,5 +1,5 @@
 import io
-from datetime import timedelta
+from datetime import datetime, timedelta
 from typing import ClassVar
 
 from django.apps import apps
@@ -9,10 +9,13 @@ from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.core.files.base import ContentFile
 from django.db import models
+from django.db.models import Case, Value, When
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from PIL import Image
 
+from core import community_cache
+
 from .choices import GENDER_CHOICES, LANGUAGE_CHOICES, get_locations
 
 
@@ -160,15 +163,10 @@ class User(AbstractUser):
         except Post.DoesNotExist:
             return False
 
-        if self == post.author:
+        if self.pk == post.author_id:
             return True
 
-        try:
-            community_member = CommunityMember.objects.get(community=post.community, user=self)
-        except CommunityMember.DoesNotExist:
-            return False
-
-        return community_member.role in {
+        return community_cache.get_role(post.community_id, self.pk) in {
             CommunityMember.MODERATOR,
             CommunityMember.ADMIN,
         }
@@ -176,6 +174,23 @@ class User(AbstractUser):
     def update_last_activity(self: "User") -> None:
         User.objects.filter(pk=self.pk).update(last_activity=timezone.now())
 
+    @property
+    def is_last_activity_stale(self: "User") -> bool:
+        interval = timedelta(seconds=settings.LAST_ACTIVITY_UPDATE_INTERVAL_SECONDS)
+        return self.last_activity is None or timezone.now() - self.last_activity >= interval
+
+    @staticmethod
+    def bulk_update_last_activity(last_activity: dict[int, datetime]) -> None:
+        """Write the last activity of many users in one statement."""
+        if not last_activity:
+            return
+        User.objects.filter(pk__in=last_activity).update(
+            last_activity=Case(
+                *(When(pk=user_id, then=Value(active_at)) for user_id, active_at in last_activity.items()),
+                output_field=models.DateTimeField(),
+            )
+        )
+
     @property
     def is_online(self: "User") -> bool:
         online_limit = timezone.now() - timedelta(minutes=settings.LAST_ACTIVITY_ONLINE_LIMIT_MINUTES)
@@ -1,10 +1,14 @@
 from datetime import timedelta
 
 import pytest
+from django.conf import Settings
 from django.test import Client
 from django.urls import reverse
 from django.utils import timezone
+from pytest_django import DjangoAssertNumQueries
 
+from core import presence
+from users.middleware.update_last_activity import LastActivityBuffer, last_activity_buffer
 from users.models import User
 
 
@@ -54,3 +58,74 @@ def test_last_activity_ago(user: User) -> None:
     user.last_activity = timezone.now() - timedelta(days=3)
     user.save()
     assert user.last_activity_ago == "3 days ago"
+
+
+@pytest.mark.django_db()
+def test_recent_last_activity_is_not_rewritten(user: User, client: Client) -> None:
+    recent = timezone.now() - timedelta(seconds=10)
+    User.objects.filter(pk=user.pk).update(last_activity=recent)
+    client.force_login(user)
+
+    client.get(reverse("home"))
+
+    user.refresh_from_db()
+    assert user.last_activity == recent
+
+
+@pytest.mark.django_db()
+def test_buffered_last_activity(
+    users: list[User], settings: Settings, django_assert_num_queries: DjangoAssertNumQueries
+) -> None:
+    settings.LAST_ACTIVITY_BUFFERING_ENABLED = True
+    settings.LAST_ACTIVITY_FLUSH_THRESHOLD = 100
+    settings.LAST_ACTIVITY_FLUSH_INTERVAL_SECONDS = 60
+    stale = timezone.now() - timedelta(hours=1)
+    User.objects.update(last_activity=stale)
+    last_activity_buffer.flush()
+
+    for user in users:
+        client = Client()
+        client.force_login(user)
+        client.get(reverse("home"))
+    assert set(User.objects.values_list("last_activity", flat=True)) == {stale}
+
+    with django_assert_num_queries(1):
+        assert last_activity_buffer.flush() == len(users)
+
+    assert all(user.is_online for user in User.objects.all())
+
+
+@pytest.mark.django_db()
+def test_buffered_last_activity_is_recorded_once(
+    user: User, client: Client, settings: Settings, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    settings.LAST_ACTIVITY_BUFFERING_ENABLED = True
+    settings.LAST_ACTIVITY_FLUSH_THRESHOLD = 100
+    settings.LAST_ACTIVITY_FLUSH_INTERVAL_SECONDS = 60
+    User.objects.update(last_activity=timezone.now() - timedelta(hours=1))
+    last_activity_buffer.flush()
+    recorded = []
+    monkeypatch.setattr(presence, "record_activity", recorded.append)
+    client.force_login(user)
+
+    for _ in range(3):
+        client.get(reverse("home"))
+
+    # the row is only written on flush, the buffered activity keeps the later requests from recording again
+    assert recorded == [user.pk]
+    assert last_activity_buffer.flush() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_idle_worker_flushes_last_activity(user: User, settings: Settings) -> None:
+    settings.LAST_ACTIVITY_FLUSH_THRESHOLD = 100
+    settings.LAST_ACTIVITY_FLUSH_INTERVAL_SECONDS = 0.2
+    User.objects.update(last_activity=timezone.now() - timedelta(hours=1))
+    buffer = LastActivityBuffer()
+    buffer.add(user.pk)
+    timer = buffer.timer
+
+    timer.join(timeout=5)
+
+    user.refresh_from_db()
+    assert user.is_online
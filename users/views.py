@@ -16,7 +16,8 @@ from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 from django.views import View
 from django.views.generic import DetailView, FormView
 
-from core.models import User
+from core import home_feed
+from core.models import Post, User
 
 from .forms import UserForm, UserProfileForm, UserRegistrationForm, UserSettingsForm
 from .models import Profile, UserSettings
@@ -36,6 +37,16 @@ class UserProfileView(LoginRequiredMixin, DetailView):
 class HomeView(TemplateView):
     template_name = "users/home.html"
 
+    def get_context_data(self: "HomeView", **kwargs: dict[str, Any]) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        if self.request.user.is_authenticated:
+            posts, next_cursor = home_feed.read(self.request.user, self.request.GET.get("cursor"))
+            Post.attach_user_state(posts, self.request.user)
+            Post.attach_awards(posts)
+            context["posts"] = posts
+            context["next_cursor"] = next_cursor
+        return context
+
 
 class LoginUserView(LoginView):
     redirect_authenticated_user = True